@@ -0,0 +1,161 @@
+"""Pre-aggregated cube for the Sector & Cleantech and Start-Year & Cost tabs.
+
+Built once per dataset load: row counts and `project_cost` sums for every
+observed combination of the sidebar dimensions (province x sector x group x
+cleantech x end_status x start_year x end_year) and an equal-count cost
+bucket. A filter combination selects cells instead of rows; the tab
+groupbys then run over the selected cells, so their cost depends on the
+number of cells, not rows.
+
+Cost ranges are exact: buckets entirely inside the range come from the cube,
+buckets entirely outside are dropped, and only the rows of the (at most two)
+buckets straddling a bound are checked individually. Company/project
+selections are not cube dimensions; `query` returns None for those and the
+caller groups the filtered rows as before.
+"""
+
+import numpy as np
+import pandas as pd
+
+CUBE_DIMS = ["province", "sector", "group", "cleantech", "end_status", "start_year", "end_year"]
+COST_COLUMN = "project_cost"
+N_COST_BUCKETS = 32
+
+def group_counts(df, by, dropna=False):
+    """Row count and cost sum per group of `df` (observed groups only)."""
+    g = df.groupby(by, dropna=dropna, observed=True)
+    out = g.size().to_frame("count")
+    out[COST_COLUMN] = g[COST_COLUMN].sum()
+    return out.reset_index()
+
+class FrameGroups:
+    """`CubeSlice` interface over already filtered rows."""
+
+    def __init__(self, df):
+        self.df, self.n = df, len(df)
+
+    def agg(self, by, dropna=False):
+        return group_counts(self.df, by, dropna)
+
+class AggCube:
+    def __init__(self, df, index, n_buckets=N_COST_BUCKETS):
+        self.index = index
+        self.dims = [c for c in CUBE_DIMS if c in df.columns]
+        n = len(df)
+
+        # Per-row codes of the raw values (charts group by these), and per raw
+        # value its filter code (the sidebar matches on str(value), see FilterIndex)
+        self.row_codes, self.uniques, self.filter_codes, self.range_values = {}, {}, {}, {}
+        for col in self.dims:
+            codes, uniques = pd.factorize(df[col], use_na_sentinel=False)
+            self.row_codes[col] = codes.astype(np.int32)
+            self.uniques[col] = uniques
+            if col in index.codes:
+                _, first = np.unique(codes, return_index=True)
+                self.filter_codes[col] = index.codes[col][first]
+            if col in index.sorted:
+                self.range_values[col] = pd.to_numeric(pd.Series(uniques), errors="coerce").to_numpy(dtype=np.float64)
+
+        # Equal-count cost buckets over the sorted non-missing costs; the last
+        # bucket (id = n_buckets) holds missing costs
+        if COST_COLUMN in index.sorted:
+            values, order = index.sorted[COST_COLUMN]
+            self.n_buckets = min(n_buckets, len(order))
+            sorted_bucket = (np.arange(len(order)) * self.n_buckets) // max(len(order), 1)
+            self.bucket_offsets = np.searchsorted(sorted_bucket, np.arange(self.n_buckets + 1))
+            self.bucket_min = values[self.bucket_offsets[:-1]]
+            self.bucket_max = values[self.bucket_offsets[1:] - 1]
+            self.cost_order = order
+            row_bucket = np.full(n, self.n_buckets, dtype=np.int32)
+            row_bucket[order] = sorted_bucket
+            self.row_cost = np.nan_to_num(index.values[COST_COLUMN])
+        else:
+            self.n_buckets = None
+            row_bucket = np.zeros(n, dtype=np.int32)
+            self.row_cost = np.zeros(n)
+
+        # Cells: one per observed combination of dimension codes + bucket
+        stacked = [self.row_codes[c] for c in self.dims] + [row_bucket]
+        sizes = [len(self.uniques[c]) for c in self.dims] + [(self.n_buckets or 0) + 1]
+        try:
+            keys, inverse = np.unique(np.ravel_multi_index(stacked, sizes), return_inverse=True)
+            cell_codes = np.unravel_index(keys, sizes)
+        except ValueError:
+            # Too many combinations for one int64 key
+            cell_codes, inverse = np.unique(np.stack(stacked, axis=1), axis=0, return_inverse=True)
+            cell_codes = cell_codes.T
+        inverse = inverse.ravel()
+        self.cell_codes = {c: np.asarray(cell_codes[i], dtype=np.int32) for i, c in enumerate(self.dims)}
+        self.cell_bucket = np.asarray(cell_codes[-1], dtype=np.int32)
+        self.cell_count = np.bincount(inverse, minlength=len(self.cell_bucket))
+        self.cell_cost = np.bincount(inverse, weights=self.row_cost, minlength=len(self.cell_bucket))
+
+    @property
+    def n_cells(self):
+        return len(self.cell_bucket)
+
+    def _raw_lut(self, col, selected):
+        lookup = self.index.lookup[col]
+        wanted = [lookup[str(s)] for s in selected if str(s) in lookup]
+        return np.isin(self.filter_codes[col], wanted)
+
+    def query(self, in_filters=(), ranges=()):
+        """CubeSlice for the `FilterIndex.select` arguments, or None if a filter
+        is not a cube dimension."""
+        keep = np.ones(self.n_cells, dtype=bool)
+        for col, selected in in_filters:
+            if selected is None or len(selected) == 0:
+                continue
+            if col not in self.filter_codes:
+                return None
+            keep &= self._raw_lut(col, selected)[self.cell_codes[col]]
+
+        partial = []
+        for col, lo, hi in ranges:
+            if col == COST_COLUMN and self.n_buckets is not None:
+                inside = np.ones(self.n_buckets, dtype=bool)
+                outside = np.zeros(self.n_buckets, dtype=bool)
+                if lo is not None:
+                    inside &= self.bucket_min >= lo
+                    outside |= self.bucket_max < lo
+                if hi is not None:
+                    inside &= self.bucket_max <= hi
+                    outside |= self.bucket_min > hi
+                # Missing costs never match a range
+                keep &= np.append(inside, False)[self.cell_bucket]
+                for b in np.flatnonzero(~inside & ~outside):
+                    partial.append(self.cost_order[self.bucket_offsets[b]:self.bucket_offsets[b + 1]])
+            elif col in self.range_values:
+                values = self.range_values[col]
+                ok = ~np.isnan(values)
+                if lo is not None:
+                    ok &= values >= lo
+                if hi is not None:
+                    ok &= values <= hi
+                keep &= ok[self.cell_codes[col]]
+            else:
+                return None
+
+        rows = np.concatenate(partial) if partial else np.empty(0, dtype=np.intp)
+        if len(rows):
+            rows = rows[self.index.subset_mask(rows, in_filters, ranges)]
+        return CubeSlice(self, np.flatnonzero(keep), rows)
+
+class CubeSlice:
+    """Selected cells (+ rows from straddling cost buckets) of an AggCube."""
+
+    def __init__(self, cube, cells, rows):
+        self.cube, self.cells, self.rows = cube, cells, rows
+        self.n = int(cube.cell_count[cells].sum()) + len(rows)
+
+    def agg(self, by, dropna=False):
+        """Same result as `group_counts(filtered_rows, by, dropna)`."""
+        cube = self.cube
+        frame = pd.DataFrame({
+            col: cube.uniques[col].take(np.concatenate([cube.cell_codes[col][self.cells], cube.row_codes[col][self.rows]]))
+            for col in by
+        })
+        frame["count"] = np.concatenate([cube.cell_count[self.cells], np.ones(len(self.rows), dtype=np.int64)])
+        frame[COST_COLUMN] = np.concatenate([cube.cell_cost[self.cells], cube.row_cost[self.rows]])
+        g = frame.groupby(by, dropna=dropna, observed=True)
+        return g[["count", COST_COLUMN]].sum().reset_index()
@@ -1,14 +1,32 @@
 
+import json
 import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
-from dash import Dash, dcc, html, Input, Output, State, ctx as dash_ctx
+from dash import Dash, dcc, html, dash_table, Input, Output, State, ctx as dash_ctx, no_update
 import dash_bootstrap_components as dbc
+from flask import Response, request
+
+from agg_cube import AggCube, FrameGroups
+from basemap import offline_style, resolve_style
+from datastore import DatasetCache, file_key
+from downsample import grid_downsample
+from export_stream import export_schema, stream_csv, stream_parquet
+from figure_cache import FigureCache
+from filter_index import FilterIndex
+from ranking import TopNRanker, top_positions
+from search_index import NameIndex
+from shared_frame import load_shared
+from spatial_index import SpatialIndex
+from state_store import FilteredStateStore, backend_from_spec
+from table_pages import SortedPages
 
 # ============================================================
-# Default data loading (auto-discover *.xlsx beside app.py; ignore /data)
+# Default data loading (auto-discover data files beside app.py; ignore /data)
+# Columnar formats (Parquet, Feather/Arrow IPC) are preferred; *.xlsx is
+# still read as a fallback but is otherwise an export-only format.
 # ============================================================
 from pathlib import Path
 import os
@@ -17,25 +35,32 @@ HERE = Path(__file__).parent
 LAST_SOURCE = None
 LAST_ERRORS = []
 
-def _xlsx_in_here():
+# Supported input formats, in order of preference
+DATA_SUFFIXES = [".parquet", ".feather", ".arrow", ".xlsx"]
+
+def _data_files_here():
     # Ignore temporary Excel files like "~$foo.xlsx"
-    return sorted([p for p in HERE.glob("*.xlsx") if not p.name.startswith("~$")])
+    files = [p for p in HERE.iterdir() if p.suffix.lower() in DATA_SUFFIXES and not p.name.startswith("~$")]
+    return sorted(files, key=lambda p: (DATA_SUFFIXES.index(p.suffix.lower()), p.name))
 
-# Optional override via env var: DATAFILE=mpi_2024_scored.xlsx
+# Optional override via env var: DATAFILE=mpi_2024_scored.parquet
 _ENV_CHOICE = os.getenv("DATAFILE")
 
-# Preference order: env var (if provided), then these names if present, then any other *.xlsx
-_PREFERRED_NAMES = ["mpi_2024_scored.xlsx", "sample_mpi.xlsx"]
+# Preference order: env var (if provided), then these names if present, then any other data file
+_PREFERRED_NAMES = [
+    "mpi_2024_scored.parquet", "mpi_2024_scored.feather", "mpi_2024_scored.xlsx",
+    "sample_mpi.xlsx",
+]
 
 def _candidate_paths():
-    files_here = _xlsx_in_here()
+    files_here = _data_files_here()
     by_name = {p.name: p for p in files_here}
 
     ordered = []
     if _ENV_CHOICE:
         # If DATAFILE points to a file name or absolute/relative path
         env_path = (HERE / _ENV_CHOICE) if not os.path.isabs(_ENV_CHOICE) else Path(_ENV_CHOICE)
-        if env_path.exists() and env_path.suffix.lower() == ".xlsx":
+        if env_path.exists() and env_path.suffix.lower() in DATA_SUFFIXES:
             ordered.append(env_path)
 
     # Add preferred names if present
@@ -43,7 +68,7 @@ def _candidate_paths():
         if name in by_name:
             ordered.append(by_name[name])
 
-    # Add any remaining discovered *.xlsx not already included
+    # Add any remaining discovered files not already included
     for pth in files_here:
         if pth not in ordered:
             ordered.append(pth)
@@ -53,23 +78,59 @@ def _candidate_paths():
 CANDIDATES = _candidate_paths()
 
 def _read_any(path: Path) -> pd.DataFrame:
+    suffix = path.suffix.lower()
+    if suffix == ".parquet":
+        return pd.read_parquet(path)
+    if suffix in (".feather", ".arrow"):
+        return pd.read_feather(path)
     return pd.read_excel(path, engine="openpyxl")
 
-def _load_default_or_raise() -> pd.DataFrame:
+# DATASET_MMAP_DIR=/dev/shm/mpi-dataset keeps the display-ready frame as a
+# memory-mapped Arrow file there, shared by all gunicorn workers on the host
+DATASET_MMAP_DIR = os.getenv("DATASET_MMAP_DIR")
+
+def _load_display_frame(path: Path) -> pd.DataFrame:
+    # RangeIndex: index labels of any filtered slice are row positions in the
+    # cached frame (used to slice the precomputed hover customdata)
+    def build():
+        return add_display_columns(_coerce_types(_read_any(path))).reset_index(drop=True)
+    if DATASET_MMAP_DIR:
+        return load_shared(DATASET_MMAP_DIR, file_key(path), build)
+    return build()
+
+# Coerced, display-ready frames keyed by (path, mtime, size); shared, read-only.
+# DATA_WATCH_SECONDS > 0 reloads changed files in a background thread.
+# A new version is indexed before it is published (prepare_entry, below).
+DATA_CACHE = DatasetCache(_load_display_frame, watch_interval=float(os.getenv("DATA_WATCH_SECONDS", "0")),
+                          prepare=lambda entry: prepare_entry(entry))
+
+# Filtered row sets, keyed by a token of (dataset key, filter values). The
+# browser-side Store only carries the filter values and the token.
+# FILTER_STATE_BACKEND=disk:/tmp/mpi-state shares them between workers.
+STATE_STORE = FilteredStateStore(backend_from_spec(os.getenv("FILTER_STATE_BACKEND", "memory")))
+
+# Rendered tab content, keyed by (state token, tab, tab inputs); see /_stats/cache
+FIGURE_CACHE = FigureCache(max_entries=int(os.getenv("FIGURE_CACHE_ENTRIES", "128")),
+                           max_bytes=int(float(os.getenv("FIGURE_CACHE_MB", "64")) * 2**20))
+
+def _load_default_entry_or_raise():
     global LAST_SOURCE, LAST_ERRORS
     LAST_SOURCE, LAST_ERRORS = None, []
     for pth in CANDIDATES:
         try:
             if pth.exists():
-                df = _read_any(pth)
+                entry = DATA_CACHE.entry(pth)
                 LAST_SOURCE = str(pth)
-                return df
+                return entry
             else:
                 LAST_ERRORS.append(f"missing: {pth}")
         except Exception as e:
             LAST_ERRORS.append(f"error reading {pth}: {e}")
     raise FileNotFoundError("; ".join(LAST_ERRORS) if LAST_ERRORS else "No candidates found.")
 
+def _load_default_or_raise() -> pd.DataFrame:
+    return _load_default_entry_or_raise().frame
+
 # ============================================================
 # Helpers
 # ============================================================
@@ -83,6 +144,9 @@ REQUIRED_COLUMNS = [
     "blended_prob","priority_index","power_ranking"
 ]
 
+# Low-cardinality columns held as pandas categoricals (kept as-is from Parquet/Feather)
+CATEGORICAL_COLUMNS = ["province","sector","group","start_status","end_status"]
+
 COLORBLIND = px.colors.qualitative.Safe
 
 def _coerce_types(df: pd.DataFrame) -> pd.DataFrame:
@@ -96,6 +160,9 @@ def _coerce_types(df: pd.DataFrame) -> pd.DataFrame:
         df["end_success"] = pd.to_numeric(df["end_success"], errors="coerce").fillna(0).astype(int)
     if "cleantech" in df.columns:
         df["cleantech"] = df["cleantech"].astype(str).str.strip().str.title().replace({"Yes":"Yes","No":"No"})
+    for c in CATEGORICAL_COLUMNS:
+        if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype("category")
     return df
 
 def _validate_schema(df: pd.DataFrame) -> list:
@@ -142,18 +209,37 @@ def normalize_power_score(series: pd.Series) -> pd.Series:
         return s.fillna(1.0)
     return (s - s.min()) / (s.max() - s.min())
 
-def attach_customdata_by_trace(fig, df, color_col):
+def attach_customdata_by_trace(fig, df, color_col, customdata=None):
+    # customdata: the cached frame's array, indexed by df's index labels (row
+    # positions); default: built from df. Rows are grouped by trace value once,
+    # with a single gather; each trace gets a contiguous slice (a view) in the
+    # original row order, i.e. the rows of df[df[color_col] == name].
+    if customdata is None:
+        customdata, positions = build_common_customdata(df), np.arange(len(df))
+    else:
+        positions = df.index.to_numpy()
+    codes, uniques = pd.factorize(df[color_col])
+    codes = codes + 1                      # 0 = missing values, never a trace name
+    order = np.argsort(codes, kind="stable")
+    offsets = np.zeros(len(uniques) + 2, dtype=np.int64)
+    np.cumsum(np.bincount(codes, minlength=len(uniques) + 1), out=offsets[1:])
+    grouped = customdata[positions[order]]
+    slot = {u: i + 1 for i, u in enumerate(uniques)}
     for tr in fig.data:
         val = getattr(tr, "name", None)
         if val is None:
-            tr.customdata = build_common_customdata(df)
-            tr.hovertemplate = COMMON_HOVER_TMPL
-            continue
-        mask = (df[color_col] == val)
-        subdf = df[mask] if mask.any() else df.iloc[0:0]
-        tr.customdata = build_common_customdata(subdf)
+            tr.customdata = customdata[positions]
+        else:
+            i = slot.get(val)
+            tr.customdata = grouped[offsets[i]:offsets[i + 1]] if i is not None else grouped[0:0]
         tr.hovertemplate = COMMON_HOVER_TMPL
 
+def customdata_rows(customdata, df):
+    """Rows of the dataset-wide customdata for `df`, a row subset of the cached frame."""
+    if customdata is None:
+        return build_common_customdata(df)
+    return customdata[df.index.to_numpy()]
+
 def build_year_marks(min_year, max_year, step=1):
     return {int(y): str(int(y)) for y in range(int(min_year), int(max_year)+1, step)}
 
@@ -162,29 +248,56 @@ def _unique_sorted(df, col):
         return []
     return sorted([v for v in df[col].dropna().astype(str).unique().tolist() if str(v).strip() != "" ])
 
+def _safe_int(x, d): 
+    try: return int(x)
+    except: return d
+def _safe_float(x, d): 
+    try: return float(x)
+    except: return d
+
+def sidebar_options(df):
+    """Sidebar option lists and Year/Cost slider ranges for one dataset version
+    (company/project names are searched server-side: see `_name_index`)."""
+    min_year = _safe_int(df["start_year"].min() if "start_year" in df else 2000, 2000)
+    max_year = _safe_int(df["end_year"].max() if "end_year" in df else 2025, 2025)
+    if min_year > max_year: min_year, max_year = 2000, 2025
+
+    min_cost = _safe_float(df["project_cost"].min() if "project_cost" in df else 0.0, 0.0)
+    max_cost = _safe_float(df["project_cost"].max() if "project_cost" in df else 1.0, 1.0)
+    if not np.isfinite(min_cost) or not np.isfinite(max_cost) or min_cost > max_cost:
+        min_cost, max_cost = 0.0, 1.0
+
+    return {
+        "provinces": _unique_sorted(df, "province"),
+        "sectors":   _unique_sorted(df, "sector"),
+        "groups":    _unique_sorted(df, "group"),
+        "statuses":  _unique_sorted(df, "end_status"),
+        "years":     [min_year, max_year],
+        "costs":     [min_cost, max_cost],
+    }
+
+def _sidebar(entry):
+    return entry.derived("sidebar", sidebar_options)
+
+def _name_index(entry, col):
+    return entry.derived("names:" + col, lambda df: NameIndex(df[col] if col in df.columns else []))
+
+def _current_sidebar():
+    """(entry, sidebar options) of the published dataset version; entry is None if there is none."""
+    try:
+        entry = _load_default_entry_or_raise()
+    except Exception:
+        return None, sidebar_options(pd.DataFrame(columns=REQUIRED_COLUMNS))
+    return entry, _sidebar(entry)
+
 # ============================================================
-# App init & sidebar defaults (static)
+# App init & sidebar defaults
 # ============================================================
 app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 app.config.suppress_callback_exceptions = True
 server = app.server
 
-try:
-    INIT_DF = add_display_columns(_coerce_types(_load_default_or_raise()))
-    SCHEMA_INIT_MSG = ""
-except Exception as e:
-    INIT_DF = pd.DataFrame(columns=REQUIRED_COLUMNS)
-    SCHEMA_INIT_MSG = str(e)
-
-# Sidebar option lists (static; from initial data)
-PROVINCES = _unique_sorted(INIT_DF, "province")
-SECTORS   = _unique_sorted(INIT_DF, "sector")
-GROUPS    = _unique_sorted(INIT_DF, "group")
-COMPANIES = _unique_sorted(INIT_DF, "company")
-PROJECTS  = _unique_sorted(INIT_DF, "project")
-STATUSES  = _unique_sorted(INIT_DF, "end_status")
-
-# Defaults (static)
+# Defaults
 COMPANY_DEFAULT   = []          # no filter
 COMP_SEL_DEFAULT  = []          # no filter
 PROJ_SEL_DEFAULT  = []          # no filter
@@ -196,64 +309,54 @@ CLEAN_DEFAULT     = []          # All means no filter
 TOPN_DEFAULT      = 10
 AGG_DEFAULT       = "count"
 
-# Year/Cost ranges (static from initial data)
-def _safe_int(x, d): 
-    try: return int(x)
-    except: return d
-def _safe_float(x, d): 
-    try: return float(x)
-    except: return d
-
-MIN_YEAR = _safe_int(INIT_DF["start_year"].min() if "start_year" in INIT_DF else 2000, 2000)
-MAX_YEAR = _safe_int(INIT_DF["end_year"].max() if "end_year" in INIT_DF else 2025, 2025)
-if MIN_YEAR > MAX_YEAR: MIN_YEAR, MAX_YEAR = 2000, 2025
-
-MIN_COST = _safe_float(INIT_DF["project_cost"].min() if "project_cost" in INIT_DF else 0.0, 0.0)
-MAX_COST = _safe_float(INIT_DF["project_cost"].max() if "project_cost" in INIT_DF else 1.0, 1.0)
-if not np.isfinite(MIN_COST) or not np.isfinite(MAX_COST) or MIN_COST > MAX_COST:
-    MIN_COST, MAX_COST = 0.0, 1.0
+# Sidebar options follow the published dataset version: the page is built from
+# it, and a new version (DATA_WATCH_SECONDS) is pushed to open pages by polling
+# every DATA_POLL_SECONDS (default: the watch interval; 0 = off)
+DATA_POLL_SECONDS = float(os.getenv("DATA_POLL_SECONDS", os.getenv("DATA_WATCH_SECONDS", "0")))
 
 # ============================================================
-# Sidebar (STATIC) and Layout with Tabs
+# Sidebar and Layout with Tabs
 # ============================================================
-def sidebar_static():
+def sidebar_static(opts):
+    min_year, max_year = opts["years"]
+    min_cost, max_cost = opts["costs"]
     return dbc.Card([
         dbc.CardHeader("Filters"),
         dbc.CardBody([
-            html.Small(f"Loaded: {LAST_SOURCE or 'N/A'}", className="text-muted"),
+            html.Small(f"Loaded: {LAST_SOURCE or 'N/A'}", id="data-source", className="text-muted"),
             html.Hr(),
 
             html.Label("Company"),
-            dcc.Dropdown(options=COMPANIES, value=COMPANY_DEFAULT, id="f-company", multi=True, placeholder="All companies"),
+            dcc.Dropdown(options=[], value=COMPANY_DEFAULT, id="f-company", multi=True, placeholder="All companies (type to search)"),
 
             html.Label("Province", style={"marginTop":"8px"}),
-            dcc.Dropdown(options=PROVINCES, value=PROVINCE_DEFAULT, id="f-province", multi=True),
+            dcc.Dropdown(options=opts["provinces"], value=PROVINCE_DEFAULT, id="f-province", multi=True),
 
             html.Label("Sector", style={"marginTop":"8px"}),
-            dcc.Dropdown(options=SECTORS, value=SECTOR_DEFAULT, id="f-sector", multi=True),
+            dcc.Dropdown(options=opts["sectors"], value=SECTOR_DEFAULT, id="f-sector", multi=True),
 
             html.Label("Group", style={"marginTop":"8px"}),
-            dcc.Dropdown(options=GROUPS, value=GROUP_DEFAULT, id="f-group", multi=True),
+            dcc.Dropdown(options=opts["groups"], value=GROUP_DEFAULT, id="f-group", multi=True),
 
             html.Label("Cleantech (All / Yes / No)", style={"marginTop":"8px"}),
             dcc.Dropdown(options=["All","Yes","No"], value=CLEAN_DEFAULT, id="f-cleantech", multi=True),
 
             html.Label("Status (end_status)", style={"marginTop":"8px"}),
-            dcc.Dropdown(options=STATUSES, value=STATUS_DEFAULT, id="f-status", multi=True),
+            dcc.Dropdown(options=opts["statuses"], value=STATUS_DEFAULT, id="f-status", multi=True),
 
             html.Hr(),
             html.Label("Company / Project"),
             html.Label("Select by Company", style={"marginTop":"4px"}),
-            dcc.Dropdown(options=COMPANIES, value=COMP_SEL_DEFAULT, id="f-company-select", multi=True, placeholder="Optional"),
+            dcc.Dropdown(options=[], value=COMP_SEL_DEFAULT, id="f-company-select", multi=True, placeholder="Optional (type to search)"),
             html.Label("Select by Project Name", style={"marginTop":"8px"}),
-            dcc.Dropdown(options=PROJECTS, value=PROJ_SEL_DEFAULT, id="f-project-select", multi=True, placeholder="Optional"),
+            dcc.Dropdown(options=[], value=PROJ_SEL_DEFAULT, id="f-project-select", multi=True, placeholder="Optional (type to search)"),
 
             html.Hr(),
             html.Label("Year Range"),
-            dcc.RangeSlider(MIN_YEAR, MAX_YEAR, value=[MIN_YEAR, MAX_YEAR], id="f-year", tooltip={"placement":"bottom"}, step=1, marks=build_year_marks(MIN_YEAR, MAX_YEAR)),
+            dcc.RangeSlider(min_year, max_year, value=[min_year, max_year], id="f-year", tooltip={"placement":"bottom"}, step=1, marks=build_year_marks(min_year, max_year)),
 
             html.Label("Cost Range (CAD$ MM)", style={"marginTop":"8px"}),
-            dcc.RangeSlider(MIN_COST, MAX_COST, value=[MIN_COST, MAX_COST], id="f-cost", tooltip={"placement":"bottom"}),
+            dcc.RangeSlider(min_cost, max_cost, value=[min_cost, max_cost], id="f-cost", tooltip={"placement":"bottom"}),
 
             # hidden placeholder to preserve signature if used elsewhere
             dcc.Checklist(id="f-logcost", options=[{"label":"(hidden)","value":"log"}], value=[], style={"display":"none"}),
@@ -269,8 +372,14 @@ def sidebar_static():
 
             html.Div([
                 html.Button("Reset All", id="btn-reset", className="btn btn-outline-secondary", style={"marginTop":"10px","marginRight":"8px"}),
-                html.Button("Download filtered CSV", id="btn-download", className="btn btn-primary", style={"marginTop":"10px"}),
-                dcc.Download(id="download-dataframe-csv"),
+                # Plain form POST: the export streams from the server as a file download
+                html.Form([
+                    dcc.Input(id="export-filters", type="hidden", name="filters"),
+                    html.Button("Download filtered CSV", id="btn-download", type="submit", name="format", value="csv",
+                                className="btn btn-primary", style={"marginTop":"10px","marginRight":"8px"}),
+                    html.Button("Parquet", id="btn-download-parquet", type="submit", name="format", value="parquet",
+                                className="btn btn-outline-primary", style={"marginTop":"10px"}),
+                ], action=app.get_relative_path("/export/filtered"), method="POST", style={"display":"inline"}),
             ]),
         ])
     ], style={"height":"100%"} )
@@ -290,19 +399,35 @@ def tabs():
         dcc.Tab(label="Start-Year & Cost", value="tab-3"),
         dcc.Tab(label="Map", value="tab-4"),
         dcc.Tab(label="Stage Flow", value="tab-5"),
+        dcc.Tab(label="Projects", value="tab-6"),
     ])
 
-app.layout = dbc.Container([
-    dcc.Store(id="filtered"),
-    dbc.Row([
-        dbc.Col(html.H3("Canada Major Projects Inventory 2024 — Pre-Construction Dashboard"), width=9),
-        dbc.Col(html.Div(SCHEMA_INIT_MSG, id="schema-msg", className="text-danger"), width=3)
-    ], align="center", className="mt-2"),
-    dbc.Row([
-        dbc.Col(sidebar_static(), width=3),
-        dbc.Col([kpi_row(), html.Br(), tabs(), html.Div(id="tab-content")], width=9)
-    ], className="mt-2")
-], fluid=True)
+def _version_data(entry, opts):
+    return {"version": entry.version if entry is not None else None,
+            "years": opts["years"], "costs": opts["costs"]}
+
+def serve_layout():
+    # Built per page load, from the dataset version published at that time
+    try:
+        entry, schema_msg = _load_default_entry_or_raise(), ""
+    except Exception as e:
+        entry, schema_msg = None, str(e)
+    opts = _sidebar(entry) if entry is not None else sidebar_options(pd.DataFrame(columns=REQUIRED_COLUMNS))
+    return dbc.Container([
+        dcc.Store(id="filtered"),
+        dcc.Store(id="data-version", data=_version_data(entry, opts)),
+        dcc.Interval(id="data-poll", interval=max(DATA_POLL_SECONDS, 1) * 1000, disabled=DATA_POLL_SECONDS <= 0),
+        dbc.Row([
+            dbc.Col(html.H3("Canada Major Projects Inventory 2024 — Pre-Construction Dashboard"), width=9),
+            dbc.Col(html.Div(schema_msg, id="schema-msg", className="text-danger"), width=3)
+        ], align="center", className="mt-2"),
+        dbc.Row([
+            dbc.Col(sidebar_static(opts), width=3),
+            dbc.Col([kpi_row(), html.Br(), tabs(), html.Div(id="tab-content")], width=9)
+        ], className="mt-2")
+    ], fluid=True)
+
+app.layout = serve_layout
 
 # ============================================================
 # Reset All (no sidebar rebuild)
@@ -324,6 +449,7 @@ app.layout = dbc.Container([
     prevent_initial_call=True
 )
 def do_reset(n):
+    _, opts = _current_sidebar()
     return (
         COMPANY_DEFAULT,
         PROVINCE_DEFAULT,
@@ -333,15 +459,95 @@ def do_reset(n):
         STATUS_DEFAULT,
         COMP_SEL_DEFAULT,
         PROJ_SEL_DEFAULT,
-        [MIN_YEAR, MAX_YEAR],
-        [MIN_COST, MAX_COST],
+        list(opts["years"]),
+        list(opts["costs"]),
         AGG_DEFAULT,
         TOPN_DEFAULT,
     )
 
+# ============================================================
+# Live dataset refresh: sidebar options follow the published version
+# ============================================================
+OPTION_DROPDOWNS = [
+    ("f-province", "provinces"), ("f-sector", "sectors"), ("f-group", "groups"), ("f-status", "statuses"),
+]
+
+def _follow_range(value, old_full, new_full):
+    """Slider value on a new version: a full-range selection stays full,
+    anything else is clamped to the new range."""
+    if not value or old_full is None or list(value) == list(old_full):
+        return list(new_full)
+    lo, hi = max(value[0], new_full[0]), min(value[1], new_full[1])
+    return [lo, hi] if lo <= hi else list(new_full)
+
+@app.callback(
+    Output("data-version", "data"),
+    *[Output(cid, "options") for cid, _ in OPTION_DROPDOWNS],
+    Output("f-year", "min"),
+    Output("f-year", "max"),
+    Output("f-year", "marks"),
+    Output("f-year", "value", allow_duplicate=True),
+    Output("f-cost", "min"),
+    Output("f-cost", "max"),
+    Output("f-cost", "value", allow_duplicate=True),
+    Output("data-source", "children"),
+    Input("data-poll", "n_intervals"),
+    State("data-version", "data"),
+    State("f-year", "value"),
+    State("f-cost", "value"),
+    prevent_initial_call=True
+)
+def refresh_dataset(_, known, years, costs):
+    entry, opts = _current_sidebar()
+    known = known or {}
+    if entry is None or entry.version == known.get("version"):
+        return (no_update,) * (len(OPTION_DROPDOWNS) + 9)
+    (min_year, max_year), (min_cost, max_cost) = opts["years"], opts["costs"]
+    return (
+        _version_data(entry, opts),
+        *[opts[key] for _, key in OPTION_DROPDOWNS],
+        min_year, max_year, build_year_marks(min_year, max_year),
+        _follow_range(years, known.get("years"), opts["years"]),
+        min_cost, max_cost,
+        _follow_range(costs, known.get("costs"), opts["costs"]),
+        f"Loaded: {LAST_SOURCE or 'N/A'}",
+    )
+
+# ============================================================
+# Company / project type-ahead: options come from a server-side name search
+# instead of shipping every name to the browser
+# ============================================================
+SEARCH_DROPDOWNS = [("f-company", "company"), ("f-company-select", "company"), ("f-project-select", "project")]
+SEARCH_LIMIT = 50
+
+def search_options(col, search, selected):
+    """Dropdown options for a search: the selected names (so they stay shown),
+    then up to SEARCH_LIMIT matches."""
+    if not search:
+        return no_update
+    entry, _ = _current_sidebar()
+    selected = list(selected or [])
+    if entry is None:
+        return selected
+    matches = _name_index(entry, col).search(search, SEARCH_LIMIT + len(selected))
+    chosen = set(selected)
+    return selected + [m for m in matches if m not in chosen][:SEARCH_LIMIT]
+
+def _register_search(cid, col):
+    @app.callback(Output(cid, "options"), Input(cid, "search_value"), State(cid, "value"))
+    def _search(search, selected):
+        return search_options(col, search, selected)
+
+for _cid, _col in SEARCH_DROPDOWNS:
+    _register_search(_cid, _col)
+
 # ============================================================
 # Filtering (no sidebar rebuild)
 # ============================================================
+# Keys of the filter dict in the Store state (compute_filtered's arguments)
+FILTER_KEYS = ["companies", "provinces", "sectors", "groups", "cleantechs", "statuses", "comp_sel", "proj_sel",
+               "years", "costs"]
+
 @app.callback(
     Output("filtered", "data"),
     Output("schema-msg", "children"),
@@ -355,39 +561,66 @@ def do_reset(n):
     Input("f-project-select", "value"),
     Input("f-year", "value"),
     Input("f-cost", "value"),
+    Input("data-version", "data"),
 )
-def compute_filtered(companies, provinces, sectors, groups, cleantechs, statuses, comp_sel, proj_sel, years, costs):
+def compute_filtered(companies, provinces, sectors, groups, cleantechs, statuses, comp_sel, proj_sel, years, costs,
+                     data_version=None):
+    # data_version: only a trigger, so open pages re-filter on a new dataset version
+    filters = dict(companies=companies, provinces=provinces, sectors=sectors, groups=groups,
+                   cleantechs=cleantechs, statuses=statuses, comp_sel=comp_sel, proj_sel=proj_sel,
+                   years=years, costs=costs)
     try:
-        df = add_display_columns(_coerce_types(_load_default_or_raise()))
-        schema_msg = ""
+        entry = _load_default_entry_or_raise()
     except Exception as e:
-        empty = pd.DataFrame(columns=REQUIRED_COLUMNS)
-        return empty.to_json(date_format="iso", orient="split"), str(e)
-
-    def _apply_in(frame, col, selected):
-        if selected is None or len(selected) == 0:
-            return frame
-        return frame[frame[col].astype(str).isin([str(s) for s in selected])]
-
-    # Apply filters (Company/Project first)
-    df = _apply_in(df, "company", companies)
-    df = _apply_in(df, "company", comp_sel)
-    df = _apply_in(df, "project", proj_sel)
-    df = _apply_in(df, "province", provinces)
-    df = _apply_in(df, "sector", sectors)
-    df = _apply_in(df, "group", groups)
+        return {"error": True, "filters": filters}, str(e)
 
-    if cleantechs and "All" not in cleantechs:
-        df = _apply_in(df, "cleantech", cleantechs)
+    token, _ = _filtered_rows(entry, filters)
+    return {"token": token, "filters": filters, "version": entry.version}, ""
 
-    df = _apply_in(df, "end_status", statuses)
+def _filtered_rows(entry, filters):
+    index = entry.derived("filter_index", FilterIndex)
+    return STATE_STORE.rows(entry.key, filters, lambda: index.select(*_filter_spec(**filters)))
 
+def _resolve_rows(state):
+    """(entry, token, rows) for a Store state; entry is None if there is no data."""
+    if state.get("error"):
+        return None, None, None
+    try:
+        entry = _load_default_entry_or_raise()
+    except Exception:
+        return None, None, None
+    # Re-derived from the filter values, so a reloaded dataset or another
+    # worker's state resolves too
+    token, rows = _filtered_rows(entry, state["filters"])
+    return entry, token, rows
+
+def _resolve_filtered(state):
+    """Filtered frame for a Store state (shared with the cache: read-only)."""
+    entry, _, rows = _resolve_rows(state)
+    if entry is None:
+        return pd.DataFrame(columns=REQUIRED_COLUMNS)
+    return entry.frame if rows is None else entry.frame.iloc[rows]
+
+def _filter_spec(companies, provinces, sectors, groups, cleantechs, statuses, comp_sel, proj_sel, years, costs):
+    # Same filters as the sidebar, in the same order (Company/Project first)
+    in_filters = [
+        ("company", companies),
+        ("company", comp_sel),
+        ("project", proj_sel),
+        ("province", provinces),
+        ("sector", sectors),
+        ("group", groups),
+    ]
+    if cleantechs and "All" not in cleantechs:
+        in_filters.append(("cleantech", cleantechs))
+    in_filters.append(("end_status", statuses))
+
+    ranges = []
     if years:
-        df = df[(df["start_year"] >= years[0]) & (df["end_year"] <= years[1])]
+        ranges += [("start_year", years[0], None), ("end_year", None, years[1])]
     if costs is not None:
-        df = df[(df["project_cost"] >= costs[0]) & (df["project_cost"] <= costs[1])]
-
-    return df.to_json(date_format="iso", orient="split"), schema_msg
+        ranges.append(("project_cost", costs[0], costs[1]))
+    return in_filters, ranges
 
 
 # ============================================================
@@ -399,10 +632,10 @@ def compute_filtered(companies, provinces, sectors, groups, cleantechs, statuses
     Output("kpi-prob", "children"),
     Input("filtered", "data")
 )
-def update_kpis(filtered_json):
-    if not filtered_json:
+def update_kpis(filtered_state):
+    if not filtered_state:
         return "-", "-", "-"
-    df = pd.read_json(filtered_json, orient="split")
+    df = _resolve_filtered(filtered_state)
     if df.empty:
         return "0", "0", "0%"
     total_projects = len(df)
@@ -417,25 +650,21 @@ def update_kpis(filtered_json):
 # ============================================================
 # Hovers & shared customdata (unchanged visuals)
 # ============================================================
+CUSTOMDATA_COLUMNS = ["company","project","province","sector","group",
+                      "cost_mm","blended_prob_2dp","priority_index_2dp","power_ranking_2dp"]
+
 def build_common_customdata(df: pd.DataFrame):
-    cols = ["company","project","province","sector","group",
-            "cost_mm","blended_prob_2dp","priority_index_2dp","power_ranking_2dp"]
-    tmp = df.copy()
-    for c in cols:
-        if c not in tmp.columns:
-            tmp[c] = None
-    import numpy as _np
-    return _np.stack([
-        tmp["company"].astype(object).to_numpy(),
-        tmp["project"].astype(object).to_numpy(),
-        tmp["province"].astype(object).to_numpy(),
-        tmp["sector"].astype(object).to_numpy(),
-        tmp["group"].astype(object).to_numpy(),
-        tmp["cost_mm"].to_numpy(),
-        tmp["blended_prob_2dp"].to_numpy(),
-        tmp["priority_index_2dp"].to_numpy(),
-        tmp["power_ranking_2dp"].to_numpy()
-    ], axis=-1)
+    # One (rows x 9) object array, filled column by column (no frame copy).
+    # Built once per dataset load for the whole frame; figures slice it.
+    out = np.empty((len(df), len(CUSTOMDATA_COLUMNS)), dtype=object)
+    for j, c in enumerate(CUSTOMDATA_COLUMNS):
+        if c not in df.columns:
+            out[:, j] = None
+        elif j < 5:
+            out[:, j] = df[c].astype(object).to_numpy()
+        else:
+            out[:, j] = df[c].to_numpy()
+    return out
 
 COMMON_HOVER_TMPL = (
     "<b>%{customdata[1]}</b><br>"
@@ -469,6 +698,235 @@ def quadrant_labels_flushed(fig):
     ]
     fig.update_layout(annotations=ann, margin=dict(l=100, r=100, t=110, b=110))
 
+# ============================================================
+# Probability vs Priority scatter (tab 1)
+# ============================================================
+# Above SCATTER_WEBGL_ROWS points the scatter is drawn with WebGL (Scattergl);
+# above SCATTER_MAX_POINTS only a density-aware sample is sent (always
+# including the Top-N power-ranked projects) and zooming in re-queries the
+# zoomed window at full detail.
+SCATTER_WEBGL_ROWS = int(os.getenv("SCATTER_WEBGL_ROWS", "1000"))
+SCATTER_MAX_POINTS = int(os.getenv("SCATTER_MAX_POINTS", "20000"))
+
+def _top_power_positions(df, topn):
+    score = normalize_power_score(df["power_ranking"] if "power_ranking" in df.columns else pd.Series(dtype=float))
+    return top_positions(score.to_numpy(dtype=np.float64), topn if topn else 10)
+
+def build_priority_scatter(df, topn, customdata=None, cmap=None, xrange=None, yrange=None, means=None):
+    """Scatter of the filtered rows, optionally restricted to a zoom window.
+
+    means: (x, y) for the quadrant lines, from all filtered rows (default: df)."""
+    if means is None and len(df):
+        means = (df["priority_index"].mean(), df["blended_prob"].mean())
+    n_total = len(df)
+    view = df
+    if xrange is not None:
+        x = view["priority_index_2dp"]
+        view = view[(x >= xrange[0]) & (x <= xrange[1])]
+    if yrange is not None:
+        y = view["blended_prob_2dp"]
+        view = view[(y >= yrange[0]) & (y <= yrange[1])]
+    n_view = len(view)
+    if n_view > SCATTER_MAX_POINTS:
+        rows = grid_downsample(view["priority_index_2dp"], view["blended_prob_2dp"], SCATTER_MAX_POINTS,
+                               keep=_top_power_positions(view, topn), weight=view["project_cost"])
+        view = view.iloc[rows]
+
+    fig_scatter = px.scatter(
+        view,
+        x="priority_index_2dp",
+        y="blended_prob_2dp",
+        color="sector",
+        color_discrete_map=cmap if cmap is not None else sector_color_map(df),
+        size="project_cost",
+        size_max=22,
+        labels={
+            "priority_index_2dp": "Priority Index (Time to Event Urgency)",
+            "blended_prob_2dp": "Probability of Construction (≤ 3 Years)"
+        },
+        render_mode="webgl" if n_view > SCATTER_WEBGL_ROWS else "svg",
+        template="plotly",
+        height=700
+    )
+    attach_customdata_by_trace(fig_scatter, view, color_col="sector", customdata=customdata)
+    fig_scatter.update_layout(hoverlabel=dict(bgcolor="white", font_size=12))
+    fig_scatter.update_xaxes(tickformat=".2f")
+    fig_scatter.update_yaxes(tickformat=".2f")
+    if means is not None:
+        fig_scatter.add_vline(x=means[0], line_dash="dash", line_color="black")
+        fig_scatter.add_hline(y=means[1], line_dash="dash", line_color="black")
+        quadrant_labels_flushed(fig_scatter)
+    if xrange is not None:
+        fig_scatter.update_xaxes(range=list(xrange))
+    if yrange is not None:
+        fig_scatter.update_yaxes(range=list(yrange))
+    if len(view) < n_view:
+        fig_scatter.add_annotation(
+            xref="paper", yref="paper", x=0.5, y=-0.14, xanchor="center", yanchor="top", showarrow=False,
+            text=f"Showing {len(view):,} of {n_view:,} projects (density sample) — zoom in for full detail",
+            font=dict(size=11, color="#555"))
+    fig_scatter.update_layout(meta={"rows_total": n_total, "rows_in_view": n_view, "rows_sent": len(view)})
+    return fig_scatter
+
+def _relayout_ranges(relayout):
+    """(xrange, yrange, reset) from a Graph relayoutData event."""
+    def axis(name):
+        if f"{name}.range[0]" in relayout:
+            return (relayout[f"{name}.range[0]"], relayout[f"{name}.range[1]"])
+        return tuple(relayout[f"{name}.range"]) if f"{name}.range" in relayout else None
+    reset = bool(relayout.get("xaxis.autorange") or relayout.get("yaxis.autorange"))
+    return axis("xaxis"), axis("yaxis"), reset
+
+@app.callback(
+    Output("scatter-main", "figure"),
+    Input("scatter-main", "relayoutData"),
+    State("filtered", "data"),
+    State("top-n", "value"),
+    prevent_initial_call=True
+)
+def zoom_scatter(relayout, filtered_state, topn):
+    # Only needed when the overview is a sample; otherwise the browser has every point
+    if not relayout or not filtered_state:
+        return no_update
+    xrange, yrange, reset = _relayout_ranges(relayout)
+    if xrange is None and yrange is None and not reset:
+        return no_update
+    entry, _, rows = _resolve_rows(filtered_state)
+    if entry is None:
+        return no_update
+    df = entry.frame if rows is None else entry.frame.iloc[rows]
+    if len(df) <= SCATTER_MAX_POINTS:
+        return no_update
+    customdata = entry.derived("customdata", build_common_customdata)
+    if reset:
+        return build_priority_scatter(df, topn, customdata)
+    return build_priority_scatter(df, topn, customdata, xrange=xrange, yrange=yrange)
+
+# ============================================================
+# Project map (tab 4)
+# ============================================================
+# Up to MAP_MAX_POINTS geocoded projects in view are drawn individually, as
+# before; beyond that the map shows grid clusters (count, total cost,
+# dominant sector) for the current zoom/viewport, re-queried on pan/zoom.
+# MAP_STYLE=offline uses a self-contained basemap (see basemap.py).
+MAP_MAX_POINTS = int(os.getenv("MAP_MAX_POINTS", "2000"))
+MAP_STYLE = os.getenv("MAP_STYLE", "open-street-map")
+
+CLUSTER_HOVER_TMPL = (
+    "<b>%{customdata[0]:,} projects</b><br>"
+    "Total Cost (CAD$ MM): %{customdata[1]:,.0f}<br>"
+    "Dominant Sector: %{customdata[2]}<br>"
+    "<i>Zoom in to expand</i>"
+    "<extra></extra>"
+)
+
+def _spatial_index(entry):
+    return entry.derived("spatial_index", lambda df: SpatialIndex(df["latitude_1"], df["longitude_1"]))
+
+def _map_layout(fig, title="Project Map"):
+    fig.update_layout(mapbox_style=resolve_style(MAP_STYLE), title=title, hoverlabel=dict(bgcolor="white", font_size=12))
+
+def build_project_map(df, cmap, entry=None, view=None):
+    """Map of the filtered rows. view: None (initial overview, zoom 2) or a
+    dict(zoom=, center=dict(lat=, lon=), bbox=(west, south, east, north))."""
+    template = "plotly"
+    df = df.assign(**{col: pd.to_numeric(df[col], errors="coerce")
+                      for col in ["latitude_1", "longitude_1"] if col in df.columns})
+    dfm = df.dropna(subset=["latitude_1","longitude_1"])
+    if dfm.empty:
+        fig_map = px.scatter_mapbox(lat=[56], lon=[-96], zoom=2, height=600, template=template)
+        _map_layout(fig_map)
+        fig_map.add_annotation(text="No geocoded points in current filters", x=0.5, xref="paper", y=0.5, yref="paper", showarrow=False)
+        return fig_map
+
+    customdata = entry.derived("customdata", build_common_customdata) if entry is not None else None
+    # Clustering needs the cached frame's spatial index (df's index = positions in it)
+    if entry is not None and (len(dfm) > MAP_MAX_POINTS or view is not None):
+        index = _spatial_index(entry)
+        rows = index.window(dfm.index.to_numpy(), view["bbox"] if view else None)
+        if len(rows) > MAP_MAX_POINTS:
+            frame = entry.frame
+            clusters = index.clusters(rows, view["zoom"] if view else 2,
+                                      cost=frame["project_cost"].to_numpy()[rows] if "project_cost" in frame else None,
+                                      labels=frame["sector"].to_numpy()[rows])
+            center = view["center"] if view else dict(lat=float(dfm["latitude_1"].mean()), lon=float(dfm["longitude_1"].mean()))
+            return _cluster_map(clusters, cmap, view["zoom"] if view else 2, center, len(rows))
+        dfm = dfm.loc[rows]
+
+    dfm2 = dfm.copy()
+    dfm2["project_cost"] = pd.to_numeric(dfm2["project_cost"], errors="coerce")
+    fill_val = float(dfm2["project_cost"].median()) if dfm2["project_cost"].notna().any() else 1.0
+    dfm2["project_cost"] = dfm2["project_cost"].fillna(fill_val)
+
+    # Precompute pixel sizes to enforce a minimum of 8px (and ~22px max)
+    cmin = float(dfm2["project_cost"].min())
+    cmax = float(dfm2["project_cost"].max())
+    if not (cmax > cmin):
+        scale = (dfm2["project_cost"]*0 + 1.0)
+    else:
+        scale = (dfm2["project_cost"] - cmin) / (cmax - cmin)
+    dfm2["bubble_size"] = 8.0 + 14.0 * scale  # 8..22 px
+
+    fig_map = px.scatter_mapbox(
+        dfm2, lat="latitude_1", lon="longitude_1",
+        color="sector", color_discrete_map=cmap,
+        size="bubble_size",
+        zoom=view["zoom"] if view else 2, center=view["center"] if view else None,
+        height=600, template=template
+    )
+    _map_layout(fig_map)
+    attach_customdata_by_trace(fig_map, dfm2, color_col="sector", customdata=customdata)
+    return fig_map
+
+def _cluster_map(clusters, cmap, zoom, center, n_points):
+    fig = go.Figure()
+    for label, g in clusters.groupby("label", sort=True):
+        fig.add_trace(go.Scattermapbox(
+            lat=g["lat"], lon=g["lon"], mode="markers", name=str(label),
+            marker=dict(size=np.clip(8.0 + 5.0 * np.log2(g["count"].to_numpy(dtype=float)), 8, 40),
+                        color=cmap.get(label), opacity=0.75),
+            customdata=np.stack([g["count"].to_numpy(), g["cost"].to_numpy(), g["label"].to_numpy()], axis=-1),
+            hovertemplate=CLUSTER_HOVER_TMPL,
+        ))
+    fig.update_layout(height=600, template="plotly", margin=dict(t=60), legend_title_text="Dominant Sector",
+                      mapbox=dict(zoom=zoom, center=center))
+    _map_layout(fig, title=f"Project Map — {n_points:,} projects in {len(clusters):,} clusters (zoom in to expand)")
+    return fig
+
+def _map_view(relayout):
+    """dict(zoom, center, bbox) from a map relayoutData event, or None."""
+    if not relayout or ("mapbox.zoom" not in relayout and "mapbox.center" not in relayout):
+        return None
+    corners = (relayout.get("mapbox._derived") or {}).get("coordinates")
+    bbox = None
+    if corners:
+        lons, lats = [c[0] for c in corners], [c[1] for c in corners]
+        bbox = (min(lons), min(lats), max(lons), max(lats))
+    return dict(zoom=float(relayout.get("mapbox.zoom", 2)), center=relayout.get("mapbox.center"), bbox=bbox)
+
+@app.callback(
+    Output("map-main", "figure"),
+    Input("map-main", "relayoutData"),
+    State("filtered", "data"),
+    prevent_initial_call=True
+)
+def pan_zoom_map(relayout, filtered_state):
+    # Only needed when the overview is clustered; otherwise the browser has every point
+    view = _map_view(relayout)
+    if view is None or not filtered_state:
+        return no_update
+    entry, _, rows = _resolve_rows(filtered_state)
+    if entry is None:
+        return no_update
+    df = entry.frame if rows is None else entry.frame.iloc[rows]
+    if len(_spatial_index(entry).window(df.index.to_numpy())) <= MAP_MAX_POINTS:
+        return no_update
+    return build_project_map(df, sector_color_map(df), entry, view)
+
+@server.route("/basemap/style.json")
+def basemap_style():
+    return offline_style()
+
 # ============================================================
 # Tabs (preserved)
 # ============================================================
@@ -480,60 +938,137 @@ def quadrant_labels_flushed(fig):
     Input("top-n", "value"),
     Input("f-logcost", "value")
 )
-def render_tabs(filtered_json, active_tab, agg_mode, topn, logcost):
-    if not filtered_json:
+def render_tabs(filtered_state, active_tab, agg_mode, topn, logcost):
+    if not filtered_state:
         return html.Div("No data with current filters.", className="text-muted")
-    df = pd.read_json(filtered_json, orient="split")
-    if df.empty:
+    if active_tab == TABLE_TAB:
+        if dash_ctx.triggered_id not in (None, "tabs"):
+            return no_update    # the table follows the filters itself: keep its page/sort/search
+        return projects_table_shell()
+    entry, token, rows = _resolve_rows(filtered_state)
+    if entry is None:
+        return build_tab_content(pd.DataFrame(columns=REQUIRED_COLUMNS), active_tab, agg_mode, topn, logcost)
+
+    key = _tab_key(token, active_tab, agg_mode, topn, logcost)
+    content = FIGURE_CACHE.get(key)
+    if content is None:
+        groups = None
+        if active_tab in CUBE_TABS:
+            groups = _agg_cube(entry).query(*_filter_spec(**filtered_state["filters"]))
+        if groups is not None and active_tab == "tab-2":
+            df = None       # fully answered by the cube: no row slicing
+        else:
+            df = entry.frame if rows is None else entry.frame.iloc[rows]
+        ranked = None
+        if active_tab == "tab-1":
+            ranked = _ranker(entry).top(token, filtered_state["filters"], rows, topn if topn else 10)
+        content = build_tab_content(df, active_tab, agg_mode, topn, logcost, groups, entry, ranked)
+        FIGURE_CACHE.put(key, content)
+    return content
+
+# Tabs whose groupbys are answered from the aggregation cube
+CUBE_TABS = ("tab-2", "tab-3")
+
+def _agg_cube(entry):
+    return entry.derived("agg_cube", lambda df: AggCube(df, entry.derived("filter_index", FilterIndex)))
+
+# Filters whose one-value changes update the Tab-1 Top-N lists incrementally
+# (cleantech is left out: its "All" entry switches the filter off)
+RANK_FILTERS = {
+    "companies": "company", "comp_sel": "company", "proj_sel": "project", "provinces": "province",
+    "sectors": "sector", "groups": "group", "statuses": "end_status",
+}
+
+def _ranking_scores(df):
+    """Tab-1 ranking scores per row. "power" is the normalized power ranking,
+    only included when already on a 0–1 scale: otherwise its normalization
+    depends on the filtered rows and it is ranked per filter state."""
+    power = pd.to_numeric(df["power_ranking"], errors="coerce") if "power_ranking" in df.columns else None
+    scores = {
+        "prob": pd.to_numeric(df["blended_prob"], errors="coerce").round(2),
+        "priority": pd.to_numeric(df["priority_index"], errors="coerce"),
+    }
+    if power is None:
+        scores["power"] = pd.Series(0.0, index=df.index)
+    elif power.dropna().between(0, 1).all():
+        scores["power"] = power.fillna(0.0)
+    return scores
+
+def _ranker(entry):
+    def build(df):
+        codes, uniques = pd.factorize(df["project"], use_na_sentinel=False)
+        labels = np.array([truncate(u, 36) for u in uniques], dtype=object)[codes]
+        return TopNRanker(entry.derived("filter_index", FilterIndex), _ranking_scores(df), labels,
+                          RANK_FILTERS, lambda filters: _filter_spec(**filters))
+    return entry.derived("ranking", build)
+
+def _top_rows(df, n, ranker=None, ranked=None):
+    """{ranking: (rows of df, scores, bar labels)}, best first, for the Tab-1 bars.
+
+    ranked: {ranking: positions} from the dataset's ranker (df's index =
+    positions); rankings it does not hold are selected from df's own scores."""
+    ranked = ranked or {}
+    scores = {}
+    if ranker is None:
+        scores = {name: s.to_numpy(dtype=np.float64) for name, s in _ranking_scores(df).items()}
+    if "power" not in ranked:
+        power = df["power_ranking"] if "power_ranking" in df.columns else pd.Series(dtype=float)
+        scores["power"] = normalize_power_score(power).to_numpy(dtype=np.float64)
+    out = {}
+    for name in ("power", "prob", "priority"):
+        if name in ranked:
+            pos = ranked[name]
+            values = ranker.scores[name][pos]
+        else:
+            picked = top_positions(scores[name], n)
+            pos, values = df.index.to_numpy()[picked], scores[name][picked]
+        rows = df.loc[pos]
+        if ranker is not None:
+            labels = ranker.labels[pos]
+        else:
+            labels = rows["project"].map(lambda x: truncate(x, 36)).to_numpy(dtype=object)
+        out[name] = (rows, values, labels)
+    return out
+
+def _tab_key(token, active_tab, agg_mode, topn, logcost):
+    # Only the inputs a tab actually uses, so e.g. changing Top-N keeps tab 2-5 hits
+    if active_tab == "tab-1":
+        extra = (topn if topn else 10,)
+    elif active_tab == "tab-2":
+        extra = (agg_mode,)
+    else:
+        extra = ()
+    return (token, active_tab, tuple(sorted(logcost or []))) + extra
+
+def build_tab_content(df, active_tab, agg_mode, topn, logcost, groups=None, entry=None, ranked=None):
+    # groups: count/cost per group of the filtered rows (cube slice or the rows
+    # themselves); df may be None when groups alone answer the tab (tab-2).
+    # entry: CacheEntry of the cached frame df was sliced from (df's index =
+    # positions), for its precomputed hover customdata, spatial index and
+    # ranking labels; ranked: its TopNRanker's Top-N positions for df (tab-1)
+    customdata = entry.derived("customdata", build_common_customdata) if entry is not None else None
+    if groups is None:
+        groups = FrameGroups(df)
+    if groups.n == 0:
         return html.Div("No data with current filters.", className="text-muted")
 
-    cmap = sector_color_map(df)
+    cmap = sector_color_map(df if df is not None else groups.agg(["sector"]))
     template = "plotly"
 
     if active_tab == "tab-1":
-        fig_scatter = px.scatter(
-            df,
-            x="priority_index_2dp",
-            y="blended_prob_2dp",
-            color="sector",
-            color_discrete_map=cmap,
-            size="project_cost",
-            size_max=22,
-            labels={
-                "priority_index_2dp": "Priority Index (Time to Event Urgency)",
-                "blended_prob_2dp": "Probability of Construction (≤ 3 Years)"
-            },
-            template=template,
-            height=700
-        )
-        attach_customdata_by_trace(fig_scatter, df, color_col="sector")
-        fig_scatter.update_layout(hoverlabel=dict(bgcolor="white", font_size=12))
-        fig_scatter.update_xaxes(tickformat=".2f")
-        fig_scatter.update_yaxes(tickformat=".2f")
-        if len(df):
-            x_med = df["priority_index"].mean()
-            y_med = df["blended_prob"].mean()
-            fig_scatter.add_vline(x=x_med, line_dash="dash", line_color="black")
-            fig_scatter.add_hline(y=y_med, line_dash="dash", line_color="black")
-            quadrant_labels_flushed(fig_scatter)
-
-        score = normalize_power_score(df["power_ranking"] if "power_ranking" in df.columns else pd.Series(dtype=float))
-        tmp = df.copy()
-        tmp["score01"] = score
-        tmp["prob2dp"] = df["blended_prob"].round(2)
-        tmp["cost_mm"] = (df["project_cost"] * 1).round(0).astype("Int64")
-        tmp["label"] = tmp["project"].apply(lambda x: truncate(x, 36))
-
-        top = tmp.sort_values("score01", ascending=False).head(topn if topn else 10)
+        fig_scatter = build_priority_scatter(df, topn, customdata, cmap)
+
+        ranks = _top_rows(df, topn if topn else 10, _ranker(entry) if entry is not None else None, ranked)
+        top, score, labels = ranks["power"]
 
         fig_bar = go.Figure()
         fig_bar.add_trace(go.Bar(
-            x=top["score01"],
-            y=top["label"],
+            x=score,
+            y=labels,
             orientation="h",
-            text=top["score01"].map(lambda v: f"{v:.2f}"),
+            text=[f"{v:.2f}" for v in score],
             textposition="auto",
-            customdata=build_common_customdata(top),
+            customdata=customdata_rows(customdata, top),
             hovertemplate=COMMON_HOVER_TMPL
         ))
         fig_bar.update_layout(
@@ -544,24 +1079,16 @@ def render_tabs(filtered_json, active_tab, agg_mode, topn, logcost):
             template=template
         )
 
-        # Build Top‑N Probability and Priority
-        score = normalize_power_score(df["power_ranking"] if "power_ranking" in df.columns else pd.Series(dtype=float))
-        tmp2 = df.copy()
-        tmp2["score01"] = score
-        tmp2["prob2dp"] = pd.to_numeric(tmp2["blended_prob"], errors="coerce").round(2)
-        tmp2["cost_mm"] = pd.to_numeric(tmp2["project_cost"], errors="coerce").round(0).astype("Int64")
-        tmp2["label"] = tmp2["project"].apply(lambda x: truncate(x, 36))
-
         # Top‑N by Probability
-        prob_sorted = tmp2.sort_values('prob2dp', ascending=False).head(topn if topn else 10)
+        prob_sorted, prob2dp, labels = ranks["prob"]
         fig_prob = go.Figure()
         fig_prob.add_trace(go.Bar(
-            x=prob_sorted['prob2dp'],
-            y=prob_sorted['label'],
+            x=prob2dp,
+            y=labels,
             orientation='h',
-            text=prob_sorted['prob2dp'].map(lambda v: f"{v:.2f}"),
+            text=[f"{v:.2f}" for v in prob2dp],
             textposition='auto',
-            customdata=build_common_customdata(prob_sorted),
+            customdata=customdata_rows(customdata, prob_sorted),
             hovertemplate=COMMON_HOVER_TMPL
         ))
         fig_prob.update_layout(
@@ -573,15 +1100,15 @@ def render_tabs(filtered_json, active_tab, agg_mode, topn, logcost):
         )
 
         # Top‑N by Priority Index
-        prio_sorted = tmp2.sort_values('priority_index', ascending=False).head(topn if topn else 10)
+        prio_sorted, priority, labels = ranks["priority"]
         fig_prio = go.Figure()
         fig_prio.add_trace(go.Bar(
-            x=pd.to_numeric(prio_sorted['priority_index'], errors='coerce'),
-            y=prio_sorted['label'],
+            x=priority,
+            y=labels,
             orientation='h',
-            text=prio_sorted['priority_index'].map(lambda v: f"{float(v):.2f}" if pd.notna(v) else ""),
+            text=[f"{v:.2f}" if pd.notna(v) else "" for v in priority],
             textposition='auto',
-            customdata=build_common_customdata(prio_sorted),
+            customdata=customdata_rows(customdata, prio_sorted),
             hovertemplate=COMMON_HOVER_TMPL
         ))
         fig_prio.update_layout(
@@ -593,7 +1120,7 @@ def render_tabs(filtered_json, active_tab, agg_mode, topn, logcost):
         )
 
         content = html.Div([
-            dcc.Graph(figure=fig_scatter),
+            dcc.Graph(id="scatter-main", figure=fig_scatter),
             html.Br(),
             dcc.Graph(figure=fig_bar),
             html.Br(),
@@ -604,20 +1131,20 @@ def render_tabs(filtered_json, active_tab, agg_mode, topn, logcost):
 
     elif active_tab == "tab-2":
         if agg_mode == "cost":
-            dfg = df.groupby(["sector","group"], dropna=False)["project_cost"].sum().reset_index()
+            dfg = groups.agg(["sector","group"])[["sector","group","project_cost"]]
             ycol, ylab = "project_cost", "Total Cost (B)"
         else:
-            dfg = df.groupby(["sector","group"], dropna=False).size().reset_index(name="count")
+            dfg = groups.agg(["sector","group"])[["sector","group","count"]]
             ycol, ylab = "count", "Count"
         fig_stack = px.bar(dfg, x="sector", y=ycol, color="group", barmode="stack",
                            labels={ycol: ylab}, title="Projects by Sector (stacked by Group)", template=template)
 
-        dp = df.groupby(["province","sector"], dropna=False).size().reset_index(name="count")
+        dp = groups.agg(["province","sector"])[["province","sector","count"]]
         dp = dp.sort_values("province")
         fig_pxsec = px.bar(dp, x="province", y="count", color="sector", barmode="stack",
                            color_discrete_map=cmap, title="Projects by Province (stacked by Sector)", template=template)
 
-        dct = df.groupby("cleantech").size().reset_index(name="count")
+        dct = groups.agg(["cleantech"], dropna=True)[["cleantech","count"]]
         fig_donut = px.pie(dct, names="cleantech", values="count", hole=0.55, title="Cleantech vs Not", template=template)
 
         content = html.Div([
@@ -627,8 +1154,8 @@ def render_tabs(filtered_json, active_tab, agg_mode, topn, logcost):
         ])
 
     elif active_tab == "tab-3":
-        dsy = df.dropna(subset=["start_year"])
-        dsy = dsy.groupby(["start_year","sector"], dropna=False).size().reset_index(name="count")
+        dsy = groups.agg(["start_year","sector"])[["start_year","sector","count"]]
+        dsy = dsy.dropna(subset=["start_year"])
         fig_year = px.bar(dsy, x="start_year", y="count", color="sector", barmode="stack",
                           color_discrete_map=cmap, title="Projects Started by Year (stacked by Sector)", template=template)
 
@@ -646,43 +1173,11 @@ def render_tabs(filtered_json, active_tab, agg_mode, topn, logcost):
 
     
     elif active_tab == "tab-4":
-        for col in ["latitude_1", "longitude_1"]:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors="coerce")
-        dfm = df.dropna(subset=["latitude_1","longitude_1"])
-        if dfm.empty:
-            fig_map = px.scatter_mapbox(lat=[56], lon=[-96], zoom=2, height=600, template=template)
-            fig_map.update_layout(mapbox_style="open-street-map", title="Project Map", hoverlabel=dict(bgcolor="white", font_size=12))
-            fig_map.add_annotation(text="No geocoded points in current filters", x=0.5, xref="paper", y=0.5, yref="paper", showarrow=False)
-            content = dcc.Graph(figure=fig_map)
-        else:
-            dfm2 = dfm.copy()
-            dfm2["project_cost"] = pd.to_numeric(dfm2["project_cost"], errors="coerce")
-            fill_val = float(dfm2["project_cost"].median()) if dfm2["project_cost"].notna().any() else 1.0
-            dfm2["project_cost"] = dfm2["project_cost"].fillna(fill_val)
-
-            # Precompute pixel sizes to enforce a minimum of 8px (and ~22px max)
-            cmin = float(dfm2["project_cost"].min())
-            cmax = float(dfm2["project_cost"].max())
-            if not (cmax > cmin):
-                scale = (dfm2["project_cost"]*0 + 1.0)
-            else:
-                scale = (dfm2["project_cost"] - cmin) / (cmax - cmin)
-            dfm2["bubble_size"] = 8.0 + 14.0 * scale  # 8..22 px
-
-            fig_map = px.scatter_mapbox(
-                dfm2, lat="latitude_1", lon="longitude_1",
-                color="sector", color_discrete_map=cmap,
-                size="bubble_size",
-                zoom=2, height=600, template=template
-            )
-            fig_map.update_layout(mapbox_style="open-street-map", title="Project Map", hoverlabel=dict(bgcolor="white", font_size=12))
-            attach_customdata_by_trace(fig_map, dfm2, color_col="sector")
-            content = dcc.Graph(figure=fig_map)
+        content = dcc.Graph(id="map-main", figure=build_project_map(df, cmap, entry))
 
     else:
         try:
-            links = df.groupby(["start_status","end_status"]).size().reset_index(name="value")
+            links = df.groupby(["start_status","end_status"], observed=True).size().reset_index(name="value")
             nodes = pd.Index(sorted(set(links["start_status"]).union(set(links["end_status"])))).tolist()
             l2i = {l:i for i,l in enumerate(nodes)}
             src = [l2i[s] for s in links["start_status"]]
@@ -702,19 +1197,168 @@ def render_tabs(filtered_json, active_tab, agg_mode, topn, logcost):
     return content
 
 # ============================================================
-# Download filtered CSV (unchanged)
+# Projects table: sorted, searched and paged server-side; only the visible
+# page is sent to the browser
 # ============================================================
+TABLE_TAB = "tab-6"
+TABLE_PAGE_SIZE = 25
+TABLE_COLUMNS = [
+    ("project", "Project", "text"), ("company", "Company", "text"), ("province", "Province", "text"),
+    ("sector", "Sector", "text"), ("group", "Group", "text"), ("end_status", "Status", "text"),
+    ("start_year", "Start", "numeric"), ("end_year", "End", "numeric"), ("cost_mm", "Cost (CAD$ MM)", "numeric"),
+    ("blended_prob_2dp", "Probability", "numeric"), ("priority_index_2dp", "Priority", "numeric"),
+    ("power_ranking_2dp", "Power Ranking", "numeric"),
+]
+
+def projects_table_shell():
+    return html.Div([
+        dcc.Input(id="projects-search", type="search", debounce=True, placeholder="Search project or company",
+                  className="form-control", style={"maxWidth":"360px", "marginTop":"10px"}),
+        html.Small(id="projects-count", className="text-muted"),
+        dash_table.DataTable(
+            id="projects-table",
+            columns=[{"id": c, "name": name, "type": t} for c, name, t in TABLE_COLUMNS],
+            data=[], page_action="custom", page_current=0, page_size=TABLE_PAGE_SIZE,
+            sort_action="custom", sort_mode="single", sort_by=[],
+            style_table={"overflowX":"auto"}, style_cell={"fontSize":"13px", "textAlign":"left"},
+        ),
+    ])
+
+def _table_pages(entry):
+    return entry.derived("table_pages", SortedPages)
+
+def _search_rows(entry, rows, search):
+    """Filtered rows whose project or company name contains `search`."""
+    index = entry.derived("filter_index", FilterIndex)
+    mask = np.zeros(index.n, dtype=bool)
+    for col in ("project", "company"):
+        names = _name_index(entry, col).search(search)
+        if names and col in index.codes:
+            mask |= index.isin_mask(col, names)
+    return np.flatnonzero(mask) if rows is None else rows[mask[rows]]
+
+def table_page(filtered_state, page, size, sort_by, search):
+    """(page records, total rows) for the Projects table."""
+    entry, _, rows = _resolve_rows(filtered_state or {"error": True})
+    if entry is None:
+        return [], 0
+    if search and search.strip():
+        rows = _search_rows(entry, rows, search)
+    total = len(entry.frame) if rows is None else len(rows)
+    sort = (sort_by or [None])[0]
+    col = sort["column_id"] if sort and sort["column_id"] in entry.frame.columns else None
+    pos = _table_pages(entry).page(rows, page, size, col, bool(sort and sort.get("direction") == "desc"))
+    cols = [c for c, _, _ in TABLE_COLUMNS if c in entry.frame.columns]
+    page_df = entry.frame.iloc[pos][cols].astype(object)
+    return page_df.where(page_df.notna(), None).to_dict("records"), total
+
 @app.callback(
-    Output("download-dataframe-csv", "data"),
-    Input("btn-download", "n_clicks"),
-    State("filtered", "data"),
-    prevent_initial_call=True
+    Output("projects-table", "data"),
+    Output("projects-table", "page_count"),
+    Output("projects-table", "page_current"),
+    Output("projects-count", "children"),
+    Input("filtered", "data"),
+    Input("projects-table", "page_current"),
+    Input("projects-table", "page_size"),
+    Input("projects-table", "sort_by"),
+    Input("projects-search", "value"),
 )
-def download_csv(n, filtered_json):
-    if not n or not filtered_json:
-        return
-    df = pd.read_json(filtered_json, orient="split")
-    return dcc.send_data_frame(df.to_csv, "filtered_projects.csv", index=False)
+def update_projects_table(filtered_state, page, size, sort_by, search):
+    # Back to the first page on anything but a page change
+    page = (page or 0) if "projects-table.page_current" in dash_ctx.triggered_prop_ids else 0
+    size = size or TABLE_PAGE_SIZE
+    records, total = table_page(filtered_state, page, size, sort_by, search)
+    return records, max(1, -(-total // size)), page, f"{total:,} projects"
+
+# ============================================================
+# Dataset versions (prepared before publishing; gunicorn --preload: once in
+# the master, shared by the forked workers)
+# ============================================================
+def prepare_entry(entry):
+    """Build a dataset version's derived structures (indexes, cube, hover
+    customdata, rankings, sidebar options, name search); run by DATA_CACHE before the
+    version is published."""
+    _agg_cube(entry)
+    if {"latitude_1", "longitude_1"} <= set(entry.frame.columns):
+        _spatial_index(entry)
+    _ranker(entry)
+    entry.derived("customdata", build_common_customdata)
+    _sidebar(entry)
+    _name_index(entry, "company")
+    _name_index(entry, "project")
+
+def warm_caches():
+    """Load (and prepare) the default dataset so forked workers start with it."""
+    try:
+        return _load_default_entry_or_raise()
+    except Exception:
+        return None
+
+# ============================================================
+# Cache counters
+# ============================================================
+@server.route("/_stats/cache")
+def cache_stats():
+    entry, _ = _current_sidebar()
+    return {
+        "figures": FIGURE_CACHE.stats(),
+        "filtered_state": {"hits": STATE_STORE.hits, "misses": STATE_STORE.misses},
+        "dataset_loads": DATA_CACHE.loads,
+        "dataset_version": entry.version if entry is not None else None,
+    }
+
+# ============================================================
+# Download filtered rows: streamed in chunks from the cached frame (CSV or
+# Parquet), never built as one file in memory
+# ============================================================
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "20000"))
+EXPORT_FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+@app.callback(
+    Output("export-filters", "value"),
+    Input("filtered", "data"),
+)
+def update_export_filters(filtered_state):
+    return json.dumps(filtered_state["filters"]) if filtered_state else ""
+
+@server.route("/export/filtered", methods=["GET", "POST"])
+def export_filtered():
+    fmt = request.values.get("format", "csv")
+    try:
+        filters = json.loads(request.values.get("filters") or "{}")
+    except ValueError:
+        filters = None
+    if fmt not in EXPORT_FORMATS or not isinstance(filters, dict):
+        return Response("Bad export request", status=400, mimetype="text/plain")
+    # Same dict as compute_filtered builds, so the rows come from STATE_STORE
+    filters = {k: filters.get(k) for k in FILTER_KEYS}
+    entry, _, rows = _resolve_rows({"filters": filters})
+    if entry is None:
+        return Response("No dataset loaded", status=503, mimetype="text/plain")
+    if fmt == "csv":
+        body = stream_csv(entry.frame, rows, EXPORT_CHUNK_ROWS)
+    else:
+        body = stream_parquet(entry.frame, rows, EXPORT_CHUNK_ROWS, entry.derived("export_schema", export_schema))
+    return Response(body, mimetype=EXPORT_FORMATS[fmt],
+                    headers={"Content-Disposition": f'attachment; filename="filtered_projects.{fmt}"'})
+
+# ============================================================
+# Initial dataset (module constants for scripts; the page uses the live version)
+# ============================================================
+try:
+    INIT_DF = _load_default_or_raise()
+except Exception:
+    INIT_DF = pd.DataFrame(columns=REQUIRED_COLUMNS)
+
+_INIT_OPTIONS = sidebar_options(INIT_DF)
+PROVINCES = _INIT_OPTIONS["provinces"]
+SECTORS   = _INIT_OPTIONS["sectors"]
+GROUPS    = _INIT_OPTIONS["groups"]
+COMPANIES = _unique_sorted(INIT_DF, "company")
+PROJECTS  = _unique_sorted(INIT_DF, "project")
+STATUSES  = _INIT_OPTIONS["statuses"]
+MIN_YEAR, MAX_YEAR = _INIT_OPTIONS["years"]
+MIN_COST, MAX_COST = _INIT_OPTIONS["costs"]
 
 if __name__ == "__main__":
     app.run_server(host="0.0.0.0", port=7860, debug=False)
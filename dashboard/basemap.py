@@ -0,0 +1,39 @@
+"""Offline basemap for the Map tab.
+
+`MAP_STYLE=offline` replaces the OpenStreetMap tiles (fetched from the
+internet by the browser) with a self-contained Mapbox GL style: a plain
+background and a lat/lon graticule built here as inline GeoJSON, so the map
+renders with no network access at all. The same style is served at
+`/basemap/style.json` for other local clients; point `MAP_STYLE` at a local
+tile server's style URL for real geography.
+"""
+
+OFFLINE = "offline"
+
+def _graticule(step_lon=10, step_lat=5):
+    lines = []
+    for lon in range(-180, 181, step_lon):
+        lines.append([[lon, -85], [lon, 85]])
+    for lat in range(-85, 86, step_lat):
+        lines.append([[lon, lat] for lon in range(-180, 181, 5)])
+    return {
+        "type": "FeatureCollection",
+        "features": [{"type": "Feature", "properties": {}, "geometry": {"type": "LineString", "coordinates": c}}
+                     for c in lines],
+    }
+
+def offline_style():
+    return {
+        "version": 8,
+        "name": "offline",
+        "sources": {"graticule": {"type": "geojson", "data": _graticule()}},
+        "layers": [
+            {"id": "background", "type": "background", "paint": {"background-color": "#eef1f4"}},
+            {"id": "graticule", "type": "line", "source": "graticule",
+             "paint": {"line-color": "#c3ccd6", "line-width": 0.6}},
+        ],
+    }
+
+def resolve_style(name):
+    """Value for `layout.mapbox.style`: the inline offline style or `name` as is."""
+    return offline_style() if name == OFFLINE else name
@@ -0,0 +1,102 @@
+"""Tab 2/3 groupbys from the aggregation cube vs over the filtered rows.
+
+First checks, on random filter combinations, that every groupby the tabs use
+gives the same groups and counts from the cube as from the filtered rows
+(cost sums to float rounding), then times both on the dataset resampled to
+each --rows size. "rows" includes selecting the filtered rows (FilterIndex),
+as the tabs had to before the cube.
+
+    python dashboard/benchmarks/bench_agg_cube.py --rows 100000 1000000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DASHBOARD = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(DASHBOARD))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import app  # noqa: E402
+from agg_cube import AggCube, group_counts  # noqa: E402
+from bench_filter_index import random_args  # noqa: E402
+from filter_index import FilterIndex  # noqa: E402
+
+# (by, dropna) for every groupby in tabs 2 and 3
+TAB_GROUPBYS = [
+    (["sector", "group"], False),
+    (["province", "sector"], False),
+    (["cleantech"], True),
+    (["start_year", "sector"], False),
+    (["sector"], False),
+]
+
+def from_rows(df, index, spec):
+    rows = index.select(*spec)
+    sub = df if rows is None else df.iloc[rows]
+    return [group_counts(sub, by, dropna) for by, dropna in TAB_GROUPBYS]
+
+def from_cube(cube, spec):
+    groups = cube.query(*spec)
+    return [groups.agg(by, dropna) for by, dropna in TAB_GROUPBYS]
+
+def check_equivalence(df, index, cube, n_cases, seed=0):
+    rng = np.random.default_rng(seed)
+    checked = 0
+    for _ in range(n_cases):
+        args = random_args(df, rng)
+        # Company/project selections are not cube dimensions (the app groups rows instead)
+        args = ([], args[1], args[2], args[3], args[4], args[5], [], []) + args[8:]
+        spec = app._filter_spec(*args)
+        for expected, got in zip(from_rows(df, index, spec), from_cube(cube, spec)):
+            pd.testing.assert_frame_equal(got, expected, check_exact=False, rtol=1e-9)
+        checked += 1
+    return checked
+
+def median_time(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return sorted(times)[len(times) // 2]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    ap.add_argument("--cases", type=int, default=300)
+    args = ap.parse_args()
+
+    base = app._load_default_or_raise()
+    index = FilterIndex(base)
+    print(f"equivalence: {check_equivalence(base, index, AggCube(base, index), args.cases)} cases on {len(base):,} rows OK")
+
+    rng = np.random.default_rng(1)
+    provinces = base["province"].dropna().astype(str).unique().tolist()
+    sectors = base["sector"].dropna().astype(str).unique().tolist()
+    full = ([], [], [], [], [], [], [], [], [app.MIN_YEAR, app.MAX_YEAR], [app.MIN_COST, app.MAX_COST])
+    cases = {
+        "no filter": full,
+        "1 province": ([], provinces[:1]) + full[2:],
+        "sector+cost": ([], [], sectors[:2]) + full[3:9] + ([app.MIN_COST + 50, app.MAX_COST / 2],),
+    }
+    print(f"{'rows':>9} {'cells':>7} {'build (ms)':>11} {'case':<12} {'rows (ms)':>10} {'cube (ms)':>10} {'speedup':>8}")
+    for n in args.rows:
+        df = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+        index = FilterIndex(df)
+        t0 = time.perf_counter()
+        cube = AggCube(df, index)
+        build = time.perf_counter() - t0
+        for name, fargs in cases.items():
+            spec = app._filter_spec(*fargs)
+            t_rows = median_time(lambda: from_rows(df, index, spec))
+            t_cube = median_time(lambda: from_cube(cube, spec))
+            print(f"{n:>9,} {cube.n_cells:>7,} {build * 1e3:>11.0f} {name:<12} {t_rows * 1e3:>10.1f} "
+                  f"{t_cube * 1e3:>10.1f} {t_rows / t_cube:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""compute_filtered latency with and without the in-process dataset cache.
+
+"uncached" invalidates the cache before every call, which is what the
+callback did before the cache existed (full read + coerce + display columns).
+
+    python dashboard/benchmarks/bench_callback_latency.py --datafile mpi_2024_scored.xlsx
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+DASHBOARD = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(DASHBOARD))
+
+import app  # noqa: E402
+
+def filter_args(i):
+    provinces = [["ON"], ["QC", "BC"], [], ["AB"]][i % 4]
+    return ([], provinces, [], [], [], [], [], [],
+            [app.MIN_YEAR, app.MAX_YEAR], [app.MIN_COST, app.MAX_COST])
+
+def measure(n, cached, threads=1):
+    def one(i):
+        if not cached:
+            app.DATA_CACHE.invalidate()
+        t0 = time.perf_counter()
+        app.compute_filtered(*filter_args(i))
+        return time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        lat = list(pool.map(one, range(n)))
+    wall = time.perf_counter() - t0
+    lat.sort()
+    return statistics.median(lat), lat[int(0.95 * (len(lat) - 1))], n / wall
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--datafile", help="file next to app.py (default: app's own choice)")
+    ap.add_argument("--calls", type=int, default=40)
+    ap.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    args = ap.parse_args()
+
+    if args.datafile:
+        app.CANDIDATES = [DASHBOARD / args.datafile]
+    app._load_default_or_raise()
+    print(f"source: {app.LAST_SOURCE}")
+    print(f"{'mode':<9} {'threads':>7} {'p50 (ms)':>9} {'p95 (ms)':>9} {'calls/s':>8}")
+    for threads in args.threads:
+        for cached in (False, True):
+            p50, p95, tput = measure(args.calls, cached, threads)
+            mode = "cached" if cached else "uncached"
+            print(f"{mode:<9} {threads:>7} {p50 * 1e3:>9.1f} {p95 * 1e3:>9.1f} {tput:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Hover customdata for the tab-1 scatter: per-trace mask + frame copy (before)
+vs one pass over a customdata array precomputed at load (after).
+
+Synthetic dataset: the real rows resampled to --rows with the sector column
+replaced by --sectors distinct values, so the scatter has that many traces.
+Checks that every trace gets the same customdata, then times attaching it.
+
+    python dashboard/benchmarks/bench_customdata.py --rows 100000 --sectors 30
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+DASHBOARD = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(DASHBOARD))
+
+import app  # noqa: E402
+
+def reference_customdata(df):
+    """build_common_customdata before the one-pass builder."""
+    cols = app.CUSTOMDATA_COLUMNS
+    tmp = df.copy()
+    for c in cols:
+        if c not in tmp.columns:
+            tmp[c] = None
+    return np.stack([tmp[c].astype(object).to_numpy() if i < 5 else tmp[c].to_numpy()
+                     for i, c in enumerate(cols)], axis=-1)
+
+def reference_attach(fig, df, color_col):
+    for tr in fig.data:
+        val = getattr(tr, "name", None)
+        if val is None:
+            tr.customdata = reference_customdata(df)
+            continue
+        mask = (df[color_col] == val)
+        subdf = df[mask] if mask.any() else df.iloc[0:0]
+        tr.customdata = reference_customdata(subdf)
+
+def synthetic_frame(base, n, n_sectors, seed=0):
+    rng = np.random.default_rng(seed)
+    df = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+    names = [f"Sector {i:02d}" for i in range(n_sectors)]
+    df["sector"] = pd.Categorical(rng.choice(names, n))
+    return df
+
+def scatter(df):
+    return px.scatter(df, x="priority_index_2dp", y="blended_prob_2dp", color="sector", size="project_cost")
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return sorted(times)[len(times) // 2]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--sectors", type=int, default=30)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    df = synthetic_frame(app._load_default_or_raise(), args.rows, args.sectors)
+    t0 = time.perf_counter()
+    full = app.build_common_customdata(df)
+    t_load = time.perf_counter() - t0
+
+    # A filtered subset, as render_tabs sees it (index = positions in the full frame)
+    sub = df.iloc[np.flatnonzero(np.random.default_rng(1).random(len(df)) < 0.5)]
+    for frame in (df, sub):
+        old, new = scatter(frame), scatter(frame)
+        reference_attach(old, frame, "sector")
+        app.attach_customdata_by_trace(new, frame, "sector", full)
+        assert len(old.data) == len(new.data) == args.sectors
+        for a, b in zip(old.data, new.data):
+            pd.testing.assert_frame_equal(pd.DataFrame(a.customdata), pd.DataFrame(b.customdata))
+
+    print(f"rows: {args.rows:,}  sectors/traces: {args.sectors}  precompute at load: {t_load * 1e3:.0f} ms")
+    print(f"{'frame':<10} {'before (ms)':>12} {'after (ms)':>11} {'speedup':>8}")
+    for name, frame in (("all rows", df), ("50% rows", sub)):
+        fig = scatter(frame)
+        t_old = timed(lambda: reference_attach(fig, frame, "sector"), args.repeat)
+        t_new = timed(lambda: app.attach_customdata_by_trace(fig, frame, "sector", full),
+                      args.repeat)
+        print(f"{name:<10} {t_old * 1e3:>12.0f} {t_new * 1e3:>11.0f} {t_old / t_new:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Filtered-rows download: the whole CSV built in the callback response
+(before) vs the chunked `/export/filtered` route (after), CSV and Parquet.
+
+First checks, on random filter states of the real rows, that the streamed CSV
+is byte-for-byte `to_csv(index=False)` of the filtered frame and that the
+streamed Parquet reads back to it. Then, for each mode and --rows size,
+exports all rows in a fresh process serving the display-ready dataset
+resampled to that size (frame only: the tab indexes, which the export does
+not use, would not fit in memory at 5M rows): the peak memory of the export itself
+(peak RSS reset after the dataset is loaded) and its time, plus the time to
+the first byte for the streamed modes. The export runs under an address-space
+budget of --budget-gb on top of the loaded process, so a mode that would
+exhaust memory fails with MemoryError instead of triggering the OOM killer.
+
+    python dashboard/benchmarks/bench_export.py --rows 1000000 5000000
+"""
+
+import argparse
+import io
+import json
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DASHBOARD = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(DASHBOARD))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+MODES = ["before", "csv", "parquet"]
+
+def _status_kb(field):
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith(field + ":"):
+            return int(line.split()[1])
+    return 0
+
+def run_export(mode, n, budget, seed=0):
+    """In a fresh process serving the dataset resampled to `n` rows: export
+    all rows within `budget` bytes of extra address space, return stats."""
+    import app
+    from dash import dcc
+    from datastore import DatasetCache
+    from plotly.utils import PlotlyJSONEncoder
+
+    rng = np.random.default_rng(seed)
+    frame = app.INIT_DF.iloc[rng.integers(0, len(app.INIT_DF), n)].reset_index(drop=True)
+    app.DATA_CACHE = DatasetCache(lambda path: frame)     # no prepare hook: the frame only
+    client = app.server.test_client()
+    client.get("/")                                     # first-request setup + page layout
+
+    state, _ = app.compute_filtered([], [], [], [], [], [], [], [], None, None)
+    rss_loaded = _status_kb("VmRSS")
+    limit = _status_kb("VmSize") * 1024 + budget
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    Path("/proc/self/clear_refs").write_text("5")      # reset the peak RSS to the current RSS
+    t0 = time.perf_counter()
+    first = None
+    if mode == "before":
+        # The download_csv callback before: whole CSV string in the Dash response
+        df = app._resolve_filtered(state)
+        data = dcc.send_data_frame(df.to_csv, "filtered_projects.csv", index=False)
+        body = json.dumps({"response": {"download-dataframe-csv": {"data": data}}}, cls=PlotlyJSONEncoder)
+        size = len(body)
+        del data, body
+    else:
+        resp = client.post("/export/filtered", data={"filters": json.dumps(state["filters"]), "format": mode},
+                           buffered=False)
+        size = 0
+        for chunk in resp.response:
+            if first is None:
+                first = time.perf_counter() - t0
+            size += len(chunk)
+        resp.close()
+    seconds = time.perf_counter() - t0
+    return {"seconds": seconds, "first": first, "bytes": size, "rows": len(app.DATA_CACHE.get(app.LAST_SOURCE)),
+            "loaded_mb": rss_loaded / 1024, "peak_mb": (_status_kb("VmHWM") - rss_loaded) / 1024}
+
+def check_equivalence(n_cases, seed=0):
+    import app
+    from bench_filter_index import random_args
+
+    client = app.server.test_client()
+    rng = np.random.default_rng(seed)
+    base = app._load_default_or_raise()
+    for i in range(n_cases):
+        args = random_args(base, rng)
+        args = json.loads(json.dumps([v.tolist() if hasattr(v, "tolist") else v for v in args], default=str))
+        state, _ = app.compute_filtered(*args)
+        df = app._resolve_filtered(state)
+        filters = json.dumps(state["filters"])
+        csv = client.post("/export/filtered", data={"filters": filters, "format": "csv"}).data
+        assert csv.decode("utf-8") == df.to_csv(index=False), args
+        if len(df):
+            pq = client.post("/export/filtered", data={"filters": filters, "format": "parquet"}).data
+            pd.testing.assert_frame_equal(pd.read_parquet(io.BytesIO(pq)), df.reset_index(drop=True))
+    return n_cases
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 5_000_000])
+    ap.add_argument("--cases", type=int, default=40)
+    ap.add_argument("--budget-gb", type=float, default=2.0)
+    ap.add_argument("--child", nargs=2, metavar=("MODE", "ROWS"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        try:
+            mode, n = args.child
+            print(json.dumps(run_export(mode, int(n), int(args.budget_gb * 2**30))))
+        except MemoryError:
+            print(json.dumps({"error": "MemoryError"}))
+        return
+
+    print(f"equivalence: {check_equivalence(args.cases)} filter states, CSV + Parquet OK")
+    print(f"\n{'rows':>10} {'mode':<8} {'time (s)':>9} {'1st byte (ms)':>14} {'size (MB)':>10} "
+          f"{'dataset RSS (MB)':>17} {'export peak (MB)':>17}")
+    for n in args.rows:
+        for mode in MODES:
+            out = subprocess.run([sys.executable, __file__, "--child", mode, str(n), "--budget-gb", str(args.budget_gb)],
+                                 capture_output=True, text=True)
+            lines = out.stdout.strip().splitlines()
+            result = json.loads(lines[-1]) if lines else {"error": f"exit {out.returncode}: {out.stderr[-300:]}"}
+            if "error" in result:
+                print(f"{n:>10,} {mode:<8} failed: {result['error']}")
+                continue
+            first = "-" if result["first"] is None else f"{result['first'] * 1e3:.0f}"
+            print(f"{result['rows']:>10,} {mode:<8} {result['seconds']:>9.1f} {first:>14} "
+                  f"{result['bytes'] / 1e6:>10.0f} {result['loaded_mb']:>17,.0f} {result['peak_mb']:>17,.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""render_tabs latency with a cold vs warm figure cache, per tab.
+
+"cold" clears FIGURE_CACHE before each call (what every call cost before the
+cache existed); "warm" repeats the same inputs, e.g. switching back to a tab
+already rendered. Both include serializing the callback output, as Dash
+does for the response. Also checks that a hit serializes to the same JSON as a
+fresh render. The dataset is resampled to --rows.
+
+    python dashboard/benchmarks/bench_figure_cache.py --rows 100000
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from plotly.io.json import to_json_plotly
+
+DASHBOARD = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(DASHBOARD))
+
+import app  # noqa: E402
+
+TABS = ["tab-1", "tab-2", "tab-3", "tab-4", "tab-5"]
+
+def measure(state, tab, repeat, cold):
+    times = []
+    for _ in range(repeat):
+        if cold:
+            app.FIGURE_CACHE.clear()
+        t0 = time.perf_counter()
+        to_json_plotly(app.render_tabs(state, tab, "count", 10, []))
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    raw = app._read_any(Path(app._load_default_entry_or_raise().key[0]))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "resampled.parquet"
+        idx = np.random.default_rng(0).integers(0, len(raw), args.rows)
+        raw.iloc[idx].reset_index(drop=True).to_parquet(path)
+        app.CANDIDATES = [path]
+        app._load_default_or_raise()
+
+        state, _ = app.compute_filtered([], [], [], [], [], [], [], [], [app.MIN_YEAR, app.MAX_YEAR], None)
+        print(f"rows: {args.rows:,}")
+        print(f"{'tab':<6} {'cold (ms)':>10} {'warm (ms)':>10} {'speedup':>8} {'JSON (KB)':>10}")
+        for tab in TABS:
+            app.FIGURE_CACHE.clear()
+            fresh = to_json_plotly(app.render_tabs(state, tab, "count", 10, []))
+            assert to_json_plotly(app.render_tabs(state, tab, "count", 10, [])) == fresh
+            cold = measure(state, tab, args.repeat, cold=True)
+            warm = measure(state, tab, args.repeat, cold=False)
+            print(f"{tab:<6} {cold * 1e3:>10.1f} {warm * 1e3:>10.2f} {cold / warm:>7.0f}x {len(fresh) / 1024:>10,.0f}")
+        print("cache:", app.FIGURE_CACHE.stats())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""FilterIndex vs the original sequential `_apply_in` masks.
+
+First checks equivalence on random filter combinations (including the
+"All" cleantech special case, unknown values and empty selections), then
+times both paths on the dataset resampled to --rows.
+
+    python dashboard/benchmarks/bench_filter_index.py --rows 1000000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DASHBOARD = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(DASHBOARD))
+
+import app  # noqa: E402
+from filter_index import FilterIndex  # noqa: E402
+
+def reference_filter(df, companies, provinces, sectors, groups, cleantechs, statuses, comp_sel, proj_sel, years, costs):
+    """compute_filtered's filtering before the index existed."""
+    def _apply_in(frame, col, selected):
+        if selected is None or len(selected) == 0:
+            return frame
+        return frame[frame[col].astype(str).isin([str(s) for s in selected])]
+
+    df = _apply_in(df, "company", companies)
+    df = _apply_in(df, "company", comp_sel)
+    df = _apply_in(df, "project", proj_sel)
+    df = _apply_in(df, "province", provinces)
+    df = _apply_in(df, "sector", sectors)
+    df = _apply_in(df, "group", groups)
+    if cleantechs and "All" not in cleantechs:
+        df = _apply_in(df, "cleantech", cleantechs)
+    df = _apply_in(df, "end_status", statuses)
+    if years:
+        df = df[(df["start_year"] >= years[0]) & (df["end_year"] <= years[1])]
+    if costs is not None:
+        df = df[(df["project_cost"] >= costs[0]) & (df["project_cost"] <= costs[1])]
+    return df
+
+def indexed_filter(df, index, *args):
+    rows = index.select(*app._filter_spec(*args))
+    return df if rows is None else df.iloc[rows]
+
+def random_args(df, rng):
+    def pick(col, extra=()):
+        r = rng.random()
+        if r < 0.45:
+            return [] if rng.random() < 0.8 else None
+        vals = df[col].dropna().astype(str).unique().tolist() + list(extra)
+        return list(rng.choice(vals, size=min(len(vals), rng.integers(1, 4)), replace=False))
+
+    cleantech = [[], ["All"], ["Yes"], ["No"], ["All", "Yes"], ["Yes", "No"], ["maybe"]][rng.integers(0, 7)]
+    y0 = int(rng.integers(app.MIN_YEAR, app.MAX_YEAR + 1))
+    years = [y0, int(rng.integers(y0, app.MAX_YEAR + 1))] if rng.random() < 0.7 else None
+    c0 = float(rng.uniform(app.MIN_COST, app.MAX_COST / 4))
+    costs = [c0, float(rng.uniform(c0, app.MAX_COST))] if rng.random() < 0.7 else None
+    return (pick("company", ["No Such Co"]), pick("province", ["XX"]), pick("sector"), pick("group"),
+            cleantech, pick("end_status"), pick("company"), pick("project"), years, costs)
+
+def check_equivalence(df, n_cases, seed=0):
+    rng = np.random.default_rng(seed)
+    index = FilterIndex(df)
+    for _ in range(n_cases):
+        args = random_args(df, rng)
+        pd.testing.assert_frame_equal(indexed_filter(df, index, *args), reference_filter(df, *args))
+    # Full-range sliders and no selections: every row, untouched
+    full = ([], [], [], [], ["All"], [], [], [], [app.MIN_YEAR, app.MAX_YEAR], [app.MIN_COST, app.MAX_COST])
+    pd.testing.assert_frame_equal(indexed_filter(df, index, *full), reference_filter(df, *full))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--cases", type=int, default=500)
+    args = ap.parse_args()
+
+    base = app._load_default_or_raise()
+    check_equivalence(base, args.cases)
+    print(f"equivalent to the sequential masks on {args.cases} random filter combinations")
+
+    rng = np.random.default_rng(1)
+    df = base.iloc[rng.integers(0, len(base), args.rows)].reset_index(drop=True)
+    t0 = time.perf_counter()
+    index = FilterIndex(df)
+    t_build = time.perf_counter() - t0
+    check_equivalence(df, 20, seed=2)
+
+    cases = [random_args(df, rng) for _ in range(30)]
+    t_ref = t_idx = 0.0
+    for a in cases:
+        t0 = time.perf_counter(); reference_filter(df, *a); t_ref += time.perf_counter() - t0
+        t0 = time.perf_counter(); indexed_filter(df, index, *a); t_idx += time.perf_counter() - t0
+    print(f"rows={len(df):,}  index build: {t_build * 1e3:.0f} ms (once per dataset load)")
+    print(f"sequential masks: {t_ref / len(cases) * 1e3:8.1f} ms/filter")
+    print(f"filter index:     {t_idx / len(cases) * 1e3:8.1f} ms/filter  ({t_ref / t_idx:.1f}x)")
+
+if __name__ == "__main__":
+    main()
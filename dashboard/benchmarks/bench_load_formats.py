@@ -0,0 +1,64 @@
+"""Dataset load time: xlsx vs parquet vs feather.
+
+Converts data/mpi_dataset_all_2017-2024.xlsx (optionally replicated with
+--scale) to each format and times the dashboard's `_read_any` on it.
+
+    python dashboard/benchmarks/bench_load_formats.py --scale 1 10
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+DASHBOARD = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(DASHBOARD))
+
+from app import _read_any  # noqa: E402
+
+SOURCE = DASHBOARD.parent / "data" / "mpi_dataset_all_2017-2024.xlsx"
+CATEGORICAL = ["province_territory", "sector", "group", "status_current", "company_type", "cleantech"]
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scale", type=int, nargs="+", default=[1])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    base = pd.read_excel(SOURCE, engine="openpyxl")
+    base["project_name"] = base["project_name"].astype(str)
+    print(f"{'rows':>9} {'format':<8} {'size (KB)':>10} {'load (ms)':>10} {'vs xlsx':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for k in args.scale:
+            df = pd.concat([base] * k, ignore_index=True)
+            col = df.copy()
+            for c in CATEGORICAL:
+                col[c] = col[c].astype("category")
+            paths = {"xlsx": Path(tmp) / f"d{k}.xlsx", "parquet": Path(tmp) / f"d{k}.parquet",
+                     "feather": Path(tmp) / f"d{k}.feather"}
+            df.to_excel(paths["xlsx"], index=False)
+            col.to_parquet(paths["parquet"], index=False)
+            col.to_feather(paths["feather"])
+
+            loaded = _read_any(paths["parquet"])
+            assert all(isinstance(loaded[c].dtype, pd.CategoricalDtype) for c in CATEGORICAL)
+
+            t_xlsx = None
+            for fmt, path in paths.items():
+                t = best_of(lambda: _read_any(path), args.repeat)
+                t_xlsx = t_xlsx or t
+                print(f"{len(df):>9,} {fmt:<8} {path.stat().st_size / 1024:>10.0f} {t * 1e3:>10.1f} {t_xlsx / t:>7.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Map tab payload and build time: one marker per project (before) vs
+viewport clusters from the spatial index (after).
+
+Synthetic data: the real rows resampled to each --rows size with lat/lon
+jittered (~50 km) so points do not stack. Checks that the cluster counts add
+up to the projects in view. "build" includes JSON serialization.
+
+    python dashboard/benchmarks/bench_map_clusters.py --rows 10000 100000 1000000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from plotly.io.json import to_json_plotly
+
+DASHBOARD = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(DASHBOARD))
+
+import app  # noqa: E402
+from datastore import CacheEntry  # noqa: E402
+
+# Southern Ontario / Quebec at zoom 6
+ZOOMED = dict(zoom=6.0, center=dict(lat=45.0, lon=-76.0), bbox=(-82.0, 42.0, -70.0, 48.0))
+
+def synthetic_entry(base, n, seed=0):
+    rng = np.random.default_rng(seed)
+    df = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+    df["latitude_1"] = df["latitude_1"] + rng.normal(0, 0.5, n)
+    df["longitude_1"] = df["longitude_1"] + rng.normal(0, 0.7, n)
+    return CacheEntry(("synthetic", n, 0), df)
+
+def build(entry, max_points, view=None):
+    saved, app.MAP_MAX_POINTS = app.MAP_MAX_POINTS, max_points
+    try:
+        df = entry.frame
+        t0 = time.perf_counter()
+        fig = app.build_project_map(df, app.sector_color_map(df), entry, view)
+        size = len(to_json_plotly(fig))
+        return fig, size, time.perf_counter() - t0
+    finally:
+        app.MAP_MAX_POINTS = saved
+
+def check_clusters(entry, fig, view):
+    in_view = len(app._spatial_index(entry).window(entry.frame.index.to_numpy(), view and view["bbox"]))
+    clustered = sum(int(row[0]) for tr in fig.data for row in tr.customdata)
+    assert clustered == in_view, (clustered, in_view)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = ap.parse_args()
+
+    base = app._load_default_or_raise()
+    print(f"individual markers up to {app.MAP_MAX_POINTS:,} projects in view, clusters beyond")
+    print(f"{'rows':>9} {'view':<9} {'mode':<7} {'markers':>8} {'payload (KB)':>13} {'build (ms)':>11}")
+    for n in args.rows:
+        entry = synthetic_entry(base, n)
+        t0 = time.perf_counter()
+        app._spatial_index(entry)
+        t_index = time.perf_counter() - t0
+        runs = [("overview", "before", build(entry, 10**12)),
+                ("overview", "after", build(entry, app.MAP_MAX_POINTS)),
+                ("zoom 6", "after", build(entry, app.MAP_MAX_POINTS, ZOOMED))]
+        for (view_name, mode, (fig, size, secs)), view in zip(runs, (None, None, ZOOMED)):
+            if mode == "after" and fig.data and fig.data[0].hovertemplate == app.CLUSTER_HOVER_TMPL:
+                check_clusters(entry, fig, view)
+            markers = sum(len(tr.lat) for tr in fig.data)
+            print(f"{n:>9,} {view_name:<9} {mode:<7} {markers:>8,} {size / 1024:>13,.0f} {secs * 1e3:>11.0f}")
+        print(f"{'':>9} spatial index build: {t_index * 1e3:.0f} ms")
+
+if __name__ == "__main__":
+    main()
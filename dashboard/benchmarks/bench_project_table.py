@@ -0,0 +1,149 @@
+"""Projects tab and company/project type-ahead: shipping / sorting everything
+(before) vs server-side pages and a prefix/trigram name index (after).
+
+First checks, on random filter states, sort columns and pages, that
+SortedPages returns the same rows as a stable `sort_values` of the filtered
+rows (missing values last), and that NameIndex finds exactly the names
+containing the query (prefix matches first). Then, on the dataset resampled to
+each --rows size with every project name made distinct, times:
+
+  - a table page: full stable sort of the filtered rows + the whole table as
+    JSON (a client-side table) vs one page off the cached sort order,
+  - a type-ahead keystroke: every name as dropdown options vs up to 50
+    matches from the index (and vs a substring scan of all names).
+
+    python dashboard/benchmarks/bench_project_table.py --rows 100000 1000000
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DASHBOARD = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(DASHBOARD))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import app  # noqa: E402
+from bench_filter_index import random_args  # noqa: E402
+from filter_index import FilterIndex  # noqa: E402
+from search_index import NameIndex  # noqa: E402
+from table_pages import SortedPages  # noqa: E402
+
+PAGE = 25
+LIMIT = 50
+SORT_COLUMNS = [c for c, _, _ in app.TABLE_COLUMNS]
+QUERIES = ["w", "wi", "wind", "solar", "hydro", "lng", "mine", "ener", "xqz"]
+
+def reference_page(df, rows, col, descending, page):
+    sub = df if rows is None else df.iloc[rows]
+    key = sub[col]
+    if key.dtype.kind not in "fiub":
+        key = key.astype(str).where(key.notna(), None)
+    order = key.sort_values(ascending=not descending, kind="stable", na_position="last").index
+    return order.to_numpy()[page * PAGE:(page + 1) * PAGE]
+
+def reference_search(names, query):
+    q = query.casefold()
+    prefix = [n for n in names if n.casefold().startswith(q)]
+    inner = [n for n in names if q in n.casefold() and not n.casefold().startswith(q)] if len(q) >= 3 else []
+    return prefix + inner
+
+def check_equivalence(df, n_cases, seed=0):
+    rng = np.random.default_rng(seed)
+    index, pages = FilterIndex(df), SortedPages(df)
+    for _ in range(n_cases):
+        rows = index.select(*app._filter_spec(*random_args(df, rng)))
+        n = len(df) if rows is None else len(rows)
+        col, descending = str(rng.choice(SORT_COLUMNS)), bool(rng.random() < 0.5)
+        page = int(rng.integers(0, max(1, -(-n // PAGE)) + 1))
+        got = pages.page(rows, page, PAGE, col, descending)
+        assert np.array_equal(got, reference_page(df, rows, col, descending, page)), (col, descending, page)
+    for col in ("company", "project"):
+        names = app._unique_sorted(df, col)
+        index = NameIndex(df[col])
+        for q in QUERIES + [n[:k] for n in names[::17] for k in (2, 5)]:
+            assert index.search(q) == reference_search(names, q), (col, q)
+            assert index.search(q, LIMIT) == reference_search(names, q)[:LIMIT], (col, q)
+    return n_cases
+
+def synthetic_frame(base, n, seed=0):
+    rng = np.random.default_rng(seed)
+    df = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+    df["project"] = df["project"].astype(str) + " #" + pd.Series(np.arange(n)).astype(str)
+    for col in ("blended_prob", "priority_index", "power_ranking"):
+        df[col + "_2dp"] = np.clip(df[col] + rng.normal(0, 0.03, n), 0, 1).round(2)
+    return df
+
+def median_time(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return sorted(times)[len(times) // 2]
+
+def records(df):
+    page = df.astype(object)
+    return page.where(page.notna(), None).to_dict("records")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    ap.add_argument("--cases", type=int, default=300)
+    args = ap.parse_args()
+
+    base = app._load_default_or_raise()
+    for df in (base, synthetic_frame(base, 20_000)):
+        print(f"equivalence: {check_equivalence(df, args.cases)} pages + name searches on {len(df):,} rows OK")
+
+    cols = [c for c in SORT_COLUMNS if c in base.columns]
+    provinces = base["province"].dropna().astype(str).value_counts().index.tolist()
+    for n in args.rows:
+        df = synthetic_frame(base, n)
+        index, pages = FilterIndex(df), SortedPages(df)
+        t0 = time.perf_counter()
+        pages.order("cost_mm", True)
+        t_order = time.perf_counter() - t0
+        print(f"\n{n:,} rows (sort order of one column: {t_order * 1e3:.0f} ms, once per version and direction)")
+        print(f"  {'table page':<28} {'selected':>9} {'before (ms)':>12} {'after (ms)':>11} {'before (MB)':>12} {'after (KB)':>11}")
+        for name, provs, page in (("all rows, page 1", [], 0), ("all rows, page 1000", [], 999),
+                                  ("2 provinces, page 1", provinces[:2], 0),
+                                  ("1 small province, page 1", provinces[-1:], 0)):
+            rows = index.select(*app._filter_spec([], provs, [], [], [], [], [], [], None, None))
+            sub = df if rows is None else df.iloc[rows]
+            before_json = []
+            def before():
+                ordered = sub.sort_values("cost_mm", ascending=False, kind="stable", na_position="last")
+                before_json.append(json.dumps(records(ordered[cols]), default=str))
+            t_before = median_time(before, repeat=1)
+            after_json = []
+            def after():
+                pos = pages.page(rows, page, PAGE, "cost_mm", True)
+                after_json.append(json.dumps(records(df.iloc[pos][cols]), default=str))
+            t_after = median_time(after)
+            print(f"  {name:<28} {len(sub):>9,} {t_before * 1e3:>12.0f} {t_after * 1e3:>11.2f} "
+                  f"{len(before_json[0]) / 1e6:>12.1f} {len(after_json[0]) / 1e3:>11.1f}")
+
+        t0 = time.perf_counter()
+        names = NameIndex(df["project"])
+        t_index = time.perf_counter() - t0
+        all_names = names.names.tolist()
+        t_options = median_time(lambda: json.dumps(app._unique_sorted(df, "project")), repeat=1)
+        size_options = len(json.dumps(all_names))
+        print(f"  project type-ahead: {len(all_names):,} names; index built in {t_index:.1f} s per version; "
+              f"all names as options: {t_options * 1e3:.0f} ms, {size_options / 1e6:.1f} MB")
+        print(f"  {'query':<10} {'matches':>9} {'scan (ms)':>10} {'index (ms)':>11} {'payload (KB)':>13}")
+        for q in QUERIES:
+            t_scan = median_time(lambda: [m for m in all_names if q in m.casefold()][:LIMIT], repeat=1)
+            t_index = median_time(lambda: names.search(q, LIMIT))
+            found = names.search(q, LIMIT)
+            print(f"  {q:<10} {len(names.search(q)):>9,} {t_scan * 1e3:>10.0f} {t_index * 1e3:>11.2f} "
+                  f"{len(json.dumps(found)) / 1e3:>13.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Tab-1 scatter payload and build time: every point (before) vs the WebGL +
+density-sampled overview (after), plus a zoomed-in re-query.
+
+Synthetic data: the real rows resampled to each --rows size, with
+blended_prob / priority_index jittered so points do not stack exactly.
+"build" is figure construction + JSON serialization on the server (what the
+callback costs and what goes over the wire); browser rendering time is not
+measured here, but it scales with the points sent.
+
+    python dashboard/benchmarks/bench_scatter_modes.py --rows 10000 100000 1000000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from plotly.io.json import to_json_plotly
+
+DASHBOARD = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(DASHBOARD))
+
+import app  # noqa: E402
+
+def synthetic_frame(base, n, seed=0):
+    rng = np.random.default_rng(seed)
+    df = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+    for col in ("blended_prob", "priority_index"):
+        df[col] = np.clip(df[col] + rng.normal(0, 0.03, n), 0, 1)
+        df[col + "_2dp"] = df[col].round(2)
+    return df
+
+def build(df, customdata, max_points, **kw):
+    saved, app.SCATTER_MAX_POINTS = app.SCATTER_MAX_POINTS, max_points
+    try:
+        t0 = time.perf_counter()
+        fig = app.build_priority_scatter(df, 10, customdata, **kw)
+        payload = to_json_plotly(fig)
+        return fig, len(payload), time.perf_counter() - t0
+    finally:
+        app.SCATTER_MAX_POINTS = saved
+
+def check_sample(df, fig):
+    sent = sum(len(tr.x) for tr in fig.data)
+    assert sent == fig.layout.meta["rows_sent"] <= app.SCATTER_MAX_POINTS + 10
+    # Every Top-N power-ranked project is in the sample
+    top = df.iloc[app._top_power_positions(df, 10)]["project"].astype(str)
+    shown = {str(row[1]) for tr in fig.data for row in tr.customdata}
+    assert set(top) <= shown
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = ap.parse_args()
+
+    base = app._load_default_or_raise()
+    print(f"WebGL above {app.SCATTER_WEBGL_ROWS:,} points, sampled above {app.SCATTER_MAX_POINTS:,}")
+    print(f"{'rows':>9} {'mode':<9} {'points':>8} {'trace':<10} {'payload (MB)':>13} {'build (ms)':>11}")
+    for n in args.rows:
+        df = synthetic_frame(base, n)
+        customdata = app.build_common_customdata(df)
+        runs = [("before", build(df, customdata, max_points=10**12)),
+                ("after", build(df, customdata, max_points=app.SCATTER_MAX_POINTS))]
+        x = df["priority_index_2dp"]
+        lo, hi = x.quantile(0.45), x.quantile(0.55)
+        runs.append(("zoom 10%", build(df, customdata, max_points=app.SCATTER_MAX_POINTS, xrange=(lo, hi))))
+        if n > app.SCATTER_MAX_POINTS:
+            check_sample(df, runs[1][1][0])
+        for mode, (fig, size, secs) in runs:
+            points = sum(len(tr.x) for tr in fig.data)
+            print(f"{n:>9,} {mode:<9} {points:>8,} {fig.data[0].type:<10} {size / 2**20:>13.1f} {secs * 1e3:>11.0f}")
+            del fig
+
+if __name__ == "__main__":
+    main()
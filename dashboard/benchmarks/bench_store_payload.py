@@ -0,0 +1,105 @@
+"""Bytes on the wire and server time per filter interaction: the filtered frame
+as JSON in `dcc.Store` (before) vs the server-side filtered-state store (after).
+
+One interaction = compute_filtered's response (Store value sent to the browser)
+plus the Store value sent back as input to update_kpis and render_tabs. Sizes
+are the JSON-encoded Store values, as Dash puts them in the request/response
+bodies. The dataset is resampled to each --rows size (the "before" JSON of an
+unfiltered 1M-row frame is ~1 GB, hence the smaller default).
+
+    python dashboard/benchmarks/bench_store_payload.py --rows 4000 100000 250000
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DASHBOARD = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(DASHBOARD))
+
+import app  # noqa: E402
+
+# Store consumers per interaction (update_kpis, render_tabs)
+CONSUMERS = 2
+
+def interactions(df):
+    provinces = df["province"].dropna().astype(str).unique().tolist()
+    sectors = df["sector"].dropna().astype(str).unique().tolist()
+    full_years, full_costs = [app.MIN_YEAR, app.MAX_YEAR], [app.MIN_COST, app.MAX_COST]
+    return [
+        ("no filter", ([], [], [], [], [], [], [], [], full_years, full_costs)),
+        ("1 province", ([], provinces[:1], [], [], [], [], [], [], full_years, full_costs)),
+        ("2 sectors", ([], [], sectors[:2], [], [], [], [], [], full_years, full_costs)),
+        ("narrow", ([], provinces[:1], sectors[:1], [], ["Yes"], [], [], [], full_years, full_costs)),
+    ]
+
+def before(args):
+    """The previous callbacks: serialize once, parse once per consumer."""
+    entry = app._load_default_entry_or_raise()
+    rows = entry.derived("filter_index", app.FilterIndex).select(*app._filter_spec(*args))
+    df = entry.frame if rows is None else entry.frame.iloc[rows]
+    data = df.to_json(date_format="iso", orient="split")
+    for _ in range(CONSUMERS):
+        pd.read_json(StringIO(data), orient="split")
+    return data
+
+def after(args):
+    data, _ = app.compute_filtered(*args)
+    for _ in range(CONSUMERS):
+        app._resolve_filtered(json.loads(json.dumps(data)))
+    return data
+
+def timed(fn, args, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        data = fn(args)
+        times.append(time.perf_counter() - t0)
+    return data, statistics.median(times)
+
+def check_equivalence(args):
+    data, _ = app.compute_filtered(*args)
+    resolved = app._resolve_filtered(data)
+    roundtrip = pd.read_json(StringIO(before(args)), orient="split")
+    assert len(resolved) == len(roundtrip)
+    assert (resolved.index == roundtrip.index).all()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[4_000, 100_000, 250_000])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    base = app._load_default_or_raise()
+    raw = app._read_any(Path(app.LAST_SOURCE))
+    print(f"source: {app.LAST_SOURCE} ({len(base):,} rows)")
+    print(f"{'rows':>9} {'interaction':<11} {'matched':>9} {'before (KB)':>12} {'after (B)':>10} "
+          f"{'before (ms)':>12} {'after (ms)':>11}")
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.rows:
+            path = Path(tmp) / f"resampled_{n}.parquet"
+            raw.iloc[rng.integers(0, len(raw), n)].reset_index(drop=True).to_parquet(path)
+            app.CANDIDATES = [path]
+            df = app._load_default_or_raise()
+            for name, fargs in interactions(df):
+                check_equivalence(fargs)
+                old, t_old = timed(before, fargs, args.repeat)
+                new, t_new = timed(after, fargs, args.repeat)
+                b_old = (1 + CONSUMERS) * len(json.dumps(old))
+                b_new = (1 + CONSUMERS) * len(json.dumps(new))
+                matched = len(json.loads(old)["index"])
+                print(f"{n:>9,} {name:<11} {matched:>9,} {b_old / 1024:>12,.0f} {b_new:>10,} "
+                      f"{t_old * 1e3:>12.1f} {t_new * 1e3:>11.2f}")
+            app.DATA_CACHE.invalidate()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Tab-1 Top-N bars: copy + full sort of the filtered rows (before) vs partial
+selection on precomputed scores, and one-value filter changes derived from the
+cached Top-N of the previous state (after).
+
+First checks, on random walks of filter states (one value added to / removed
+from a multi-select per step, with occasional jumps), that TopNRanker returns
+the same rows as a stable descending sort of the filtered rows for every
+ranking. Then times one Top-20 query per state on the dataset resampled to
+each --rows size, with the scores jittered so that ties are rare.
+
+    python dashboard/benchmarks/bench_topn.py --rows 100000 1000000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DASHBOARD = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(DASHBOARD))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import app  # noqa: E402
+from bench_filter_index import random_args  # noqa: E402
+from datastore import CacheEntry  # noqa: E402
+from filter_index import FilterIndex  # noqa: E402
+from state_store import state_token  # noqa: E402
+
+TOPN = 20
+FILTER_KEYS = ["companies", "provinces", "sectors", "groups", "cleantechs", "statuses",
+               "comp_sel", "proj_sel", "years", "costs"]
+
+def old_top(df, topn):
+    """The Tab-1 code before: copies, full sorts, labels truncated on every row."""
+    score = app.normalize_power_score(df["power_ranking"])
+    tmp = df.copy()
+    tmp["score01"] = score
+    tmp["prob2dp"] = df["blended_prob"].round(2)
+    tmp["cost_mm"] = (df["project_cost"] * 1).round(0).astype("Int64")
+    tmp["label"] = tmp["project"].apply(lambda x: app.truncate(x, 36))
+    top = tmp.sort_values("score01", ascending=False).head(topn)
+    tmp2 = df.copy()
+    tmp2["score01"] = score
+    tmp2["prob2dp"] = pd.to_numeric(tmp2["blended_prob"], errors="coerce").round(2)
+    tmp2["cost_mm"] = pd.to_numeric(tmp2["project_cost"], errors="coerce").round(0).astype("Int64")
+    tmp2["label"] = tmp2["project"].apply(lambda x: app.truncate(x, 36))
+    prob_sorted = tmp2.sort_values("prob2dp", ascending=False).head(topn)
+    prio_sorted = tmp2.sort_values("priority_index", ascending=False).head(topn)
+    return top.index, prob_sorted.index, prio_sorted.index
+
+def stable_top(ranker, rows, name, n):
+    s = pd.Series(ranker.scores[name])
+    if rows is not None:
+        s = s.iloc[rows]
+    return s.sort_values(ascending=False, kind="stable").head(n).index.to_numpy()
+
+def one_value_step(df, filters, rng):
+    """filters with one value added to or removed from a random multi-select."""
+    key = str(rng.choice(list(app.RANK_FILTERS)))
+    current = list(filters.get(key) or [])
+    if current and (len(current) > 1 and rng.random() < 0.5):
+        current.pop(int(rng.integers(0, len(current))))
+    else:
+        values = df[app.RANK_FILTERS[key]].dropna().astype(str).unique().tolist()
+        unused = [v for v in values if v not in current]
+        if not unused:
+            return filters
+        current.append(str(rng.choice(unused)))
+    return {**filters, key: current}
+
+def check_equivalence(entry, n_walks, steps, seed=0):
+    rng = np.random.default_rng(seed)
+    df, index = entry.frame, entry.derived("filter_index", FilterIndex)
+    ranker = app._ranker(entry)
+    checked = 0
+    for _ in range(n_walks):
+        filters = dict(zip(FILTER_KEYS, random_args(df, rng)))
+        for _ in range(steps):
+            rows = index.select(*app._filter_spec(**filters))
+            got = ranker.top(state_token(entry.key, filters), filters, rows, TOPN)
+            for name, pos in got.items():
+                assert np.array_equal(pos, stable_top(ranker, rows, name, TOPN)), (name, filters)
+            checked += 1
+            filters = one_value_step(df, filters, rng)
+    return checked, ranker.incremental, ranker.full
+
+def synthetic_entry(base, n, seed=0):
+    rng = np.random.default_rng(seed)
+    df = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+    for col in ("power_ranking", "blended_prob", "priority_index"):
+        df[col] = np.clip(df[col] + rng.normal(0, 0.03, n), 0, 1)
+    return CacheEntry(("synthetic", n, 0), df)
+
+def median_time(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return sorted(times)[len(times) // 2]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    ap.add_argument("--walks", type=int, default=40)
+    ap.add_argument("--steps", type=int, default=15)
+    args = ap.parse_args()
+
+    base = app._load_default_or_raise()
+    # The real rows (short lists hold whole sets) and a resample (they do not)
+    for entry in (CacheEntry(("base", 0), base), synthetic_entry(base, 20_000)):
+        checked, incremental, full = check_equivalence(entry, args.walks, args.steps)
+        print(f"equivalence: {checked} states on {len(entry.frame):,} rows OK "
+              f"({incremental} incremental, {full} full)")
+
+    # Largest provinces first; then one small province added, one large removed
+    provinces = base["province"].dropna().astype(str).value_counts().index.tolist()
+    empty = {**{k: [] for k in FILTER_KEYS}, "years": None, "costs": None}
+    states = [("all rows", "selection", {**empty}),
+              ("4 prov.", "selection", {**empty, "provinces": provinces[:4]}),
+              (f"+{provinces[4]}", "incremental", {**empty, "provinces": provinces[:5]}),
+              (f"-{provinces[3]}", "incremental", {**empty, "provinces": provinces[:3] + provinces[4:5]})]
+
+    print(f"{'rows':>9} {'state':<10} {'selected':>9} {'before (ms)':>12} {'after (ms)':>11} {'path':<12}")
+    for n in args.rows:
+        entry = synthetic_entry(base, n)
+        index = entry.derived("filter_index", FilterIndex)
+        t0 = time.perf_counter()
+        ranker = app._ranker(entry)
+        t_build = time.perf_counter() - t0
+        for name, path, filters in states:
+            rows = index.select(*app._filter_spec(**filters))
+            sub = entry.frame if rows is None else entry.frame.iloc[rows]
+            before = median_time(lambda: old_top(sub, TOPN), repeat=3)
+            token = state_token(entry.key, filters)
+            # each state is one value away from the previous one, still cached
+            def after():
+                ranker._states.pop(token, None)
+                ranker.top(token, filters, rows, TOPN)
+            derived = ranker.incremental
+            t_after = median_time(after)
+            assert (ranker.incremental > derived) == (path == "incremental"), name
+            selected = n if rows is None else len(rows)
+            print(f"{n:>9,} {name:<10} {selected:>9,} {before * 1e3:>12.0f} {t_after * 1e3:>11.2f} {path:<12}")
+        print(f"{'':>9} ranker build (scores + labels, once per load): {t_build * 1e3:.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""Load test of the served dashboard for several gunicorn worker counts.
+
+For each --workers value, starts `gunicorn -c gunicorn.conf.py app:server`
+(preloaded, so the dataset is loaded once and memory-mapped for the workers),
+then runs --clients concurrent keep-alive HTTP clients (plain asyncio) for
+--duration seconds. Each client repeats what a filter change in the browser
+does: POST the `compute_filtered` callback with a random filter state (one of
+--states), then the tab and KPI callbacks with the returned state, on a
+random tab. Reports p50/p95/p99 latency per callback, overall throughput, and
+the memory (PSS: shared pages split between processes) of the server.
+
+--reload-every N serves a copy of the dataset with DATA_WATCH_SECONDS=1 and
+touches it every N seconds during the run, so each worker loads, indexes and
+swaps in a new dataset version under load (errors should stay at 0).
+
+Checks first that the memory-mapped frame (`DATASET_MMAP_DIR`) equals the
+in-process one, for the shipped dataset with a missing `project_cost` (a null
+in the nullable `cost_mm`) and a nullable boolean column with a missing value.
+
+    python dashboard/benchmarks/load_test.py --workers 1 4 8 --clients 16 --duration 30
+    python dashboard/benchmarks/load_test.py --workers 4 --reload-every 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DASHBOARD = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(DASHBOARD))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import app  # noqa: E402
+from bench_filter_index import random_args  # noqa: E402
+
+CALLBACK_URL = "/_dash-update-component"
+FILTER_INPUTS = ["f-company", "f-province", "f-sector", "f-group", "f-cleantech", "f-status",
+                 "f-company-select", "f-project-select", "f-year", "f-cost"]
+TABS = ["tab-1", "tab-2", "tab-3", "tab-4", "tab-5"]
+
+# ============================================================
+# Dash callback payloads
+# ============================================================
+def filter_payload(args):
+    return {
+        "output": "..filtered.data...schema-msg.children..",
+        "outputs": [{"id": "filtered", "property": "data"}, {"id": "schema-msg", "property": "children"}],
+        "inputs": [{"id": i, "property": "value", "value": v} for i, v in zip(FILTER_INPUTS, args)]
+                  + [{"id": "data-version", "property": "data", "value": None}],
+        "changedPropIds": ["f-sector.value"],
+        "state": [],
+    }
+
+def tab_payload(state, tab):
+    return {
+        "output": "tab-content.children",
+        "outputs": {"id": "tab-content", "property": "children"},
+        "inputs": [
+            {"id": "filtered", "property": "data", "value": state},
+            {"id": "tabs", "property": "value", "value": tab},
+            {"id": "agg-mode", "property": "value", "value": "count"},
+            {"id": "top-n", "property": "value", "value": 10},
+            {"id": "f-logcost", "property": "value", "value": []},
+        ],
+        "changedPropIds": ["filtered.data"],
+        "state": [],
+    }
+
+def kpi_payload(state):
+    return {
+        "output": "..kpi-total.children...kpi-invest.children...kpi-prob.children..",
+        "outputs": [{"id": k, "property": "children"} for k in ("kpi-total", "kpi-invest", "kpi-prob")],
+        "inputs": [{"id": "filtered", "property": "data", "value": state}],
+        "changedPropIds": ["filtered.data"],
+        "state": [],
+    }
+
+# ============================================================
+# Minimal keep-alive HTTP/1.1 client
+# ============================================================
+class Connection:
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def post(self, path, payload):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        body = json.dumps(payload).encode("utf-8")
+        self.writer.write(f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                          f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding") == "chunked":
+            data = b""
+            while True:
+                size = int((await self.reader.readline()).strip(), 16)
+                data += await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            data = await self.reader.readexactly(int(headers.get("content-length", 0)))
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, data
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+async def client(port, states, deadline, warmup_until, samples, errors, seed):
+    rng = random.Random(seed)
+    conn = Connection(port)
+    while time.perf_counter() < deadline:
+        args = rng.choice(states)
+        steps = [("compute_filtered", lambda _: filter_payload(args))]
+        tab = rng.choice(TABS)
+        steps += [(f"render_tabs {tab}", lambda s: tab_payload(s, tab)),
+                  ("update_kpis", kpi_payload)]
+        state = None
+        for name, make in steps:
+            t0 = time.perf_counter()
+            try:
+                status, data = await conn.post(CALLBACK_URL, make(state))
+            except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+                conn.close()
+                errors.append(name)
+                break
+            elapsed = time.perf_counter() - t0
+            if status != 200:
+                errors.append(name)
+                break
+            if name == "compute_filtered":
+                state = json.loads(data)["response"]["filtered"]["data"]
+            if t0 >= warmup_until:
+                samples.append((name, elapsed, t0))
+    conn.close()
+
+# ============================================================
+# Server process
+# ============================================================
+def start_server(workers, threads, port, env=None):
+    env = {**os.environ, **(env or {}), "WEB_CONCURRENCY": str(workers), "WEB_THREADS": str(threads), "PORT": str(port)}
+    log = tempfile.TemporaryFile()     # not a pipe: an unread pipe would block the server
+    proc = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:server"],
+                            cwd=DASHBOARD, env=env, stdout=subprocess.DEVNULL, stderr=log,
+                            start_new_session=True)
+    deadline = time.time() + 180
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            log.seek(0)
+            raise RuntimeError(log.read().decode(errors="replace")[-2000:])
+        try:
+            status, _ = asyncio.run(_get_root(port))
+            if status == 200 and _children(proc.pid) >= workers:
+                return proc
+        except OSError:
+            pass
+        time.sleep(0.5)
+    stop_server(proc)
+    raise TimeoutError("server did not start")
+
+async def _get_root(port):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET / HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    writer.close()
+    return status, None
+
+def _children(pid):
+    try:
+        return len(Path(f"/proc/{pid}/task/{pid}/children").read_text().split())
+    except OSError:
+        return 0
+
+def server_pss_mb(pid):
+    """Proportional set size of the master and its workers (Linux only)."""
+    pids = [pid]
+    try:
+        pids += [int(p) for p in Path(f"/proc/{pid}/task/{pid}/children").read_text().split()]
+        total = 0
+        for p in pids:
+            for line in Path(f"/proc/{p}/smaps_rollup").read_text().splitlines():
+                if line.startswith("Pss:"):
+                    total += int(line.split()[1])
+        return total / 1024
+    except OSError:
+        return float("nan")
+
+def stop_server(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=30)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(proc.pid, signal.SIGKILL)
+
+# ============================================================
+# Report
+# ============================================================
+def percentiles(values):
+    p50, p95, p99 = np.percentile(np.asarray(values) * 1e3, [50, 95, 99])
+    return p50, p95, p99
+
+def report(workers, samples, errors, seconds, pss):
+    print(f"\nworkers={workers}: {len(samples):,} requests in {seconds:.0f} s = {len(samples) / seconds:,.1f} req/s, "
+          f"{len(errors)} errors, server PSS {pss:,.0f} MB")
+    print(f"  {'callback':<22} {'n':>6} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}")
+    names = sorted({name for name, _, _ in samples})
+    for name in names + ["all"]:
+        values = [t for n, t, _ in samples if n == name or name == "all"]
+        p50, p95, p99 = percentiles(values)
+        print(f"  {name:<22} {len(values):>6} {p50:>9.1f} {p95:>9.1f} {p99:>9.1f}")
+
+async def touch_every(path, interval, deadline):
+    touched = 0
+    while time.perf_counter() + interval < deadline:
+        await asyncio.sleep(interval)
+        os.utime(path)      # new mtime: a new dataset version
+        touched += 1
+    return touched
+
+async def run_clients(port, states, n_clients, duration, warmup, reload_path=None, reload_every=0):
+    samples, errors = [], []
+    start = time.perf_counter()
+    tasks = [client(port, states, start + warmup + duration, start + warmup, samples, errors, i)
+             for i in range(n_clients)]
+    if reload_path is not None:
+        tasks.append(touch_every(reload_path, reload_every, start + warmup + duration))
+    results = await asyncio.gather(*tasks)
+    if reload_path is not None:
+        print(f"  dataset touched {results[-1]} times during the run")
+    return samples, errors
+
+def check_shared_frame():
+    df = app._read_any(Path(app.LAST_SOURCE))
+    df.loc[0, "project_cost"] = None
+    df["flag"] = pd.array([True, None] + [False] * (len(df) - 2), dtype="boolean")
+    mmap_dir = app.DATASET_MMAP_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / "missing_cost.parquet"
+        df.to_parquet(src)
+        try:
+            app.DATASET_MMAP_DIR = None
+            expected = app._load_display_frame(src)
+            app.DATASET_MMAP_DIR = str(Path(tmp) / "mmap")
+            built, mapped = app._load_display_frame(src), app._load_display_frame(src)
+        finally:
+            app.DATASET_MMAP_DIR = mmap_dir
+    assert expected["cost_mm"].isna().sum() == 1
+    for frame in (built, mapped):
+        pd.testing.assert_frame_equal(frame, expected, check_categorical=False)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    ap.add_argument("--threads", type=int, default=4)
+    ap.add_argument("--clients", type=int, default=16)
+    ap.add_argument("--duration", type=float, default=30.0)
+    ap.add_argument("--warmup", type=float, default=5.0)
+    ap.add_argument("--states", type=int, default=40, help="distinct filter states the clients pick from")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--reload-every", type=float, default=0.0, help="seconds between dataset version swaps (0 = off)")
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    base = app._load_default_or_raise()
+    check_shared_frame()
+    print("equivalence: memory-mapped frame = in-process frame (missing project_cost, nullable boolean NA)")
+    states = [[v.tolist() if hasattr(v, "tolist") else v for v in random_args(base, rng)]
+              for _ in range(args.states)]
+    states = json.loads(json.dumps(states, default=str))
+    print(f"{args.clients} clients, {args.states} filter states, {args.threads} threads/worker, "
+          f"{os.cpu_count()} CPUs, {len(base):,} rows")
+
+    env, reload_path = {}, None
+    if args.reload_every > 0:
+        tmp = Path(tempfile.mkdtemp(prefix="mpi-load-"))
+        reload_path = tmp / Path(app.LAST_SOURCE).name
+        shutil.copy(app.LAST_SOURCE, reload_path)
+        env = {"DATAFILE": str(reload_path), "DATA_WATCH_SECONDS": "1"}
+
+    for workers in args.workers:
+        proc = start_server(workers, args.threads, args.port, env)
+        try:
+            samples, errors = asyncio.run(run_clients(args.port, states, args.clients, args.duration, args.warmup,
+                                                      reload_path, args.reload_every))
+            report(workers, samples, errors, args.duration, server_pss_mb(proc.pid))
+        finally:
+            stop_server(proc)
+
+if __name__ == "__main__":
+    main()
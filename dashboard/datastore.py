@@ -0,0 +1,124 @@
+"""In-process dataset cache for the dashboard.
+
+Holds the coerced, display-ready frame for each source file, keyed by
+(path, mtime, size), so callbacks reuse it instead of re-reading the file on
+every filter change. A file is reloaded only when its mtime or size changes.
+Loads are serialized with a lock, and readers always get a fully built frame
+(the cached entry is swapped in one assignment), so one cache can be shared
+by all threads of a gunicorn worker.
+
+Each loaded file version is a CacheEntry with a short `version` id. An
+optional `prepare(entry)` hook (indexes, sidebar options, ...) runs before
+the entry is published, so the first requests on a new version do not pay
+for it. With a watch interval, changed files are loaded and prepared in a
+background thread and requests only ever see the published entry: they do
+not stat or load the file themselves, and a request that already holds the
+old entry finishes on it.
+
+Cached frames are shared: callers must treat them as read-only.
+"""
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+def file_key(path):
+    st = os.stat(path)
+    return (str(Path(path).resolve()), st.st_mtime_ns, st.st_size)
+
+class CacheEntry:
+    """One loaded file: its frame plus structures derived from it (indexes,
+    aggregates, ...), built lazily once and dropped with the entry."""
+
+    def __init__(self, key, frame):
+        self.key, self.frame = key, frame
+        self.version = hashlib.sha1(repr(tuple(key)).encode("utf-8")).hexdigest()[:12]
+        self._derived = {}
+        # Reentrant: a build may need another derived structure (e.g. the
+        # cube is built on the filter index)
+        self._lock = threading.RLock()
+
+    def derived(self, name, build):
+        value = self._derived.get(name)
+        if value is None:
+            with self._lock:
+                value = self._derived.get(name)
+                if value is None:
+                    value = build(self.frame)
+                    self._derived[name] = value
+        return value
+
+class DatasetCache:
+    def __init__(self, loader, watch_interval=0.0, prepare=None):
+        self._loader = loader
+        self._prepare = prepare
+        self._entries = {}          # resolved path -> CacheEntry
+        self._lock = threading.Lock()
+        self.watch_interval = watch_interval
+        self._watcher = None
+        self._watcher_pid = None
+        self.loads = 0
+
+    def entry(self, path):
+        """Return the CacheEntry for `path`, reloading it only if the file changed
+        (when watching: the version last published by the watcher)."""
+        self._ensure_watching()
+        if self.watch_interval > 0:
+            entry = self._entries.get(str(Path(path).resolve()))
+            if entry is not None:
+                return entry
+        return self._refresh(path)
+
+    def _refresh(self, path):
+        key = file_key(path)
+        entry = self._entries.get(key[0])
+        if entry is not None and entry.key == key:
+            return entry
+        with self._lock:
+            key = file_key(path)
+            entry = self._entries.get(key[0])
+            if entry is not None and entry.key == key:
+                return entry
+            entry = CacheEntry(key, self._loader(Path(path)))
+            if self._prepare is not None:
+                self._prepare(entry)
+            self._entries[key[0]] = entry
+            self.loads += 1
+            return entry
+
+    def get(self, path):
+        """Return the frame for `path`, reloading it only if the file changed."""
+        return self.entry(path).frame
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(Path(path).resolve()), None)
+
+    # ------------------------------------------------------------
+    # Optional background watching
+    # ------------------------------------------------------------
+    def _ensure_watching(self):
+        # Threads do not survive a fork, so (re)start the watcher per process
+        if self.watch_interval <= 0 or self._watcher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+            self._watcher = threading.Thread(target=self._watch, name="dataset-watcher", daemon=True)
+            self._watcher.start()
+
+    def _watch(self):
+        stop = threading.Event()
+        while not stop.wait(self.watch_interval):
+            for entry in list(self._entries.values()):
+                path = entry.key[0]
+                try:
+                    if file_key(path) != entry.key:
+                        self._refresh(path)     # load + prepare, then swap in
+                except Exception:
+                    pass                   # file missing or mid-write: keep the last good frame, retry next tick
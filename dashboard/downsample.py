@@ -0,0 +1,50 @@
+"""Density-aware downsampling for large scatter plots.
+
+Points are binned on a grid over the plotted x/y range; every occupied cell
+keeps at least one point and dense cells are capped, with the cap chosen as
+large as the point budget allows. Within a cell the points with the largest
+weight (e.g. project cost, i.e. the biggest bubbles) are kept first, and the
+rows in `keep` (e.g. the Top-N power-ranked projects) are always kept.
+"""
+
+import numpy as np
+
+def _largest_cap(counts, budget):
+    """Largest c >= 1 with sum(min(counts, c)) <= budget (1 if none fits)."""
+    lo, hi = 1, int(counts.max())
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if np.minimum(counts, mid).sum() <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+def grid_downsample(x, y, budget, keep=None, weight=None):
+    """Row positions (sorted) of at most ~`budget` points out of x/y.
+
+    Points with a missing coordinate are dropped (they are not plotted)."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    keep = np.asarray([] if keep is None else keep, dtype=np.intp)
+    valid = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    if len(valid) <= budget:
+        return valid
+
+    # ~budget cells, so one point per occupied cell never exceeds the budget
+    bins = max(1, int(np.sqrt(budget)))
+    def _bin(v):
+        lo, hi = v.min(), v.max()
+        if not hi > lo:
+            return np.zeros(len(v), dtype=np.int64)
+        return np.minimum(((v - lo) / (hi - lo) * bins).astype(np.int64), bins - 1)
+    cell = _bin(x[valid]) * bins + _bin(y[valid])
+
+    w = np.zeros(len(valid)) if weight is None else np.nan_to_num(np.asarray(weight, dtype=np.float64)[valid], nan=-np.inf)
+    order = np.lexsort((-w, cell))                      # by cell, heaviest first
+    counts = np.bincount(cell)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rank = np.arange(len(order)) - starts[cell[order]]
+    cap = _largest_cap(counts[counts > 0], max(budget - len(keep), 1))
+    chosen = valid[order[rank < cap]]
+    return np.union1d(chosen, keep)
@@ -0,0 +1,71 @@
+"""Chunked CSV / Parquet export of selected rows of the cached frame.
+
+The rows are sliced, encoded and handed to the response `chunk_rows` at a
+time, so an export holds one chunk (plus the encoder's buffers) in memory
+instead of the whole filtered frame and its encoded file. The CSV output is
+byte-for-byte `df.iloc[rows].to_csv(index=False)`; the Parquet output is one
+row group per chunk and reads back to the same frame.
+"""
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+def _chunks(frame, rows, chunk_rows):
+    n = len(frame) if rows is None else len(rows)
+    # At least one (possibly empty) chunk, for the header / schema
+    for lo in range(0, max(n, 1), chunk_rows):
+        part = slice(lo, lo + chunk_rows)
+        yield frame.iloc[part] if rows is None else frame.iloc[rows[part]]
+
+def stream_csv(frame, rows, chunk_rows=20000):
+    """CSV text of `frame` rows `rows` (None = all), in chunks."""
+    header = True
+    for chunk in _chunks(frame, rows, chunk_rows):
+        yield chunk.to_csv(index=False, header=header)
+        header = False
+
+class _Sink:
+    """Write-only file for the Parquet writer; `take()` returns (and drops)
+    what was written since the last call."""
+
+    def __init__(self):
+        self.parts, self.size, self.closed = [], 0, False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.size
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+def export_schema(frame):
+    """Arrow schema of the whole frame, so every chunk is written with the
+    same column types (an all-missing chunk would otherwise infer null).
+
+    Inferred on the first row plus each column's first non-missing row:
+    inferring on the whole frame would convert every text column."""
+    valid = (frame[c].first_valid_index() for c in frame.columns)
+    first = {0} | {frame.index.get_loc(i) for i in valid if i is not None}
+    return pa.Schema.from_pandas(frame.iloc[sorted(first)] if len(frame) else frame, preserve_index=False)
+
+def stream_parquet(frame, rows, chunk_rows=20000, schema=None):
+    """Parquet file of `frame` rows `rows` (None = all), in chunks."""
+    schema = schema if schema is not None else export_schema(frame)
+    sink = _Sink()
+    writer = pq.ParquetWriter(sink, schema)
+    for chunk in _chunks(frame, rows, chunk_rows):
+        writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        yield sink.take()
+    writer.close()
+    yield sink.take()
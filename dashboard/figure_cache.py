@@ -0,0 +1,57 @@
+"""Memoized tab content for `render_tabs`.
+
+Rendered tab content (Dash components with their Plotly figures) is kept as
+serialized JSON, keyed by the filtered-state token and the tab inputs, in an
+LRU bounded by entry count and total bytes. A hit parses the JSON back into
+the plain component dict Dash sends to the browser, skipping the groupbys
+and figure building entirely. Cached values are immutable strings, so one
+cache can be shared by all threads of a worker.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+from plotly.io.json import to_json_plotly
+
+class FigureCache:
+    def __init__(self, max_entries=128, max_bytes=64 * 2**20):
+        self.max_entries, self.max_bytes = max_entries, max_bytes
+        self._items = OrderedDict()     # key -> serialized JSON
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+        return json.loads(data)
+
+    def put(self, key, content):
+        data = to_json_plotly(content)
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.nbytes -= len(old)
+            self._items[key] = data
+            self.nbytes += len(data)
+            while len(self._items) > self.max_entries or self.nbytes > self.max_bytes:
+                _, dropped = self._items.popitem(last=False)
+                self.nbytes -= len(dropped)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        return {"entries": len(self._items), "bytes": self.nbytes, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
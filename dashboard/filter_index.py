@@ -0,0 +1,135 @@
+"""Precomputed filter index for `compute_filtered`.
+
+Built once per dataset load. Categorical filter columns are factorized to
+integer codes (on their `astype(str)` form, which is what the sidebar values
+are compared against) with a row-id posting list per value; range columns
+keep their non-missing values in sorted order. Any filter combination is then
+a few boolean ANDs plus binary searches, producing one array of row
+positions; the frame itself is only sliced once, at the end.
+"""
+
+import numpy as np
+import pandas as pd
+
+FILTER_COLUMNS = ["company", "project", "province", "sector", "group", "cleantech", "end_status"]
+RANGE_COLUMNS = ["start_year", "end_year", "project_cost"]
+
+# Below this selected-row fraction, posting lists beat a full code lookup
+_POSTINGS_FRACTION = 1 / 16
+
+def _factorize_as_str(col: pd.Series):
+    """Codes/uniques of `col.astype(str)` without converting every row.
+
+    Each distinct raw value is converted once (through the same dtype, via its
+    first row), and raw values that share a string form are merged. Values
+    that stay missing after astype(str) are kept as non-str uniques, which no
+    selected string can match, just like `astype(str).isin([...])`."""
+    if col.dtype == object:
+        # Mixed-type columns can hash 1 and 1.0 together but print them differently
+        codes, uniques = pd.factorize(col.astype(str), use_na_sentinel=False)
+        return codes.astype(np.int32), list(uniques)
+    raw_codes, _ = pd.factorize(col, use_na_sentinel=False)
+    _, first = np.unique(raw_codes, return_index=True)
+    as_str = col.iloc[first].astype(str).to_numpy(dtype=object)
+    str_codes, uniques = pd.factorize(as_str, use_na_sentinel=False)
+    return str_codes.astype(np.int32)[raw_codes], list(uniques)
+
+class FilterIndex:
+    def __init__(self, df: pd.DataFrame, columns=FILTER_COLUMNS, ranges=RANGE_COLUMNS):
+        self.n = len(df)
+        self.codes, self.lookup, self.postings = {}, {}, {}
+        for col in columns:
+            if col not in df.columns:
+                continue
+            codes, uniques = _factorize_as_str(df[col])
+            order = np.argsort(codes, kind="stable")
+            offsets = np.zeros(len(uniques) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(codes, minlength=len(uniques)), out=offsets[1:])
+            self.codes[col] = codes
+            self.lookup[col] = {u: i for i, u in enumerate(uniques) if isinstance(u, str)}
+            self.postings[col] = (order, offsets)
+
+        self.values, self.sorted = {}, {}
+        for col in ranges:
+            if col not in df.columns:
+                continue
+            values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64)
+            valid = np.flatnonzero(~np.isnan(values))
+            order = valid[np.argsort(values[valid], kind="stable")]
+            self.values[col] = values
+            self.sorted[col] = (values[order], order)
+
+    # ------------------------------------------------------------
+    # Single-column masks
+    # ------------------------------------------------------------
+    def isin_mask(self, col, selected):
+        if col not in self.codes:
+            raise KeyError(col)
+        lookup = self.lookup[col]
+        wanted = sorted({lookup[str(s)] for s in selected if str(s) in lookup})
+        order, offsets = self.postings[col]
+        mask = np.zeros(self.n, dtype=bool)
+        if not wanted:
+            return mask
+        n_rows = int(sum(offsets[c + 1] - offsets[c] for c in wanted))
+        if n_rows < self.n * _POSTINGS_FRACTION:
+            for c in wanted:
+                mask[order[offsets[c]:offsets[c + 1]]] = True
+        else:
+            lut = np.zeros(len(offsets) - 1, dtype=bool)
+            lut[wanted] = True
+            mask = lut[self.codes[col]]
+        return mask
+
+    def range_mask(self, col, lo=None, hi=None):
+        """Rows with lo <= col <= hi (either bound optional); missing values never match."""
+        if col not in self.sorted:
+            raise KeyError(col)
+        values, order = self.sorted[col]
+        start = 0 if lo is None else np.searchsorted(values, lo, side="left")
+        stop = len(values) if hi is None else np.searchsorted(values, hi, side="right")
+        mask = np.zeros(self.n, dtype=bool)
+        mask[order[start:stop]] = True
+        return mask
+
+    # ------------------------------------------------------------
+    # Combined selection
+    # ------------------------------------------------------------
+    def select(self, in_filters=(), ranges=()):
+        """Row positions matching every filter, in frame order.
+
+        in_filters: iterable of (column, selected values); empty/None selections are skipped.
+        ranges:     iterable of (column, lo, hi).
+        Returns None when no filter applies (i.e. all rows).
+        """
+        mask = None
+        for col, selected in in_filters:
+            if selected is None or len(selected) == 0:
+                continue
+            m = self.isin_mask(col, selected)
+            mask = m if mask is None else np.logical_and(mask, m, out=mask)
+        for col, lo, hi in ranges:
+            m = self.range_mask(col, lo, hi)
+            mask = m if mask is None else np.logical_and(mask, m, out=mask)
+        return None if mask is None else np.flatnonzero(mask)
+
+    def subset_mask(self, rows, in_filters=(), ranges=()):
+        """`select()` restricted to the row positions `rows`: a boolean mask over
+        them, in O(len(rows)) instead of O(n)."""
+        keep = np.ones(len(rows), dtype=bool)
+        for col, selected in in_filters:
+            if selected is None or len(selected) == 0:
+                continue
+            lookup = self.lookup[col]
+            lut = np.zeros(len(self.postings[col][1]) - 1, dtype=bool)
+            lut[[lookup[str(s)] for s in selected if str(s) in lookup]] = True
+            keep &= lut[self.codes[col][rows]]
+        for col, lo, hi in ranges:
+            values = self.values[col][rows]
+            ok = ~np.isnan(values)
+            if lo is not None:
+                ok &= values >= lo
+            if hi is not None:
+                ok &= values <= hi
+            keep &= ok
+        return keep
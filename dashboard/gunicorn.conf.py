@@ -0,0 +1,27 @@
+"""Gunicorn settings for serving the dashboard: `gunicorn -c gunicorn.conf.py app:server`.
+
+Defaults match the single-worker Space (one worker, 4 threads). For a
+multi-core host set WEB_CONCURRENCY (workers) and WEB_THREADS; the app is
+preloaded in the master, which loads the dataset once into a memory-mapped
+file (DATASET_MMAP_DIR) and builds its indexes before the workers fork, so
+workers share them instead of each re-reading and re-indexing the file.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '7860')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+threads = int(os.getenv("WEB_THREADS", "4"))
+worker_class = "gthread"
+timeout = int(os.getenv("WEB_TIMEOUT", "120"))
+preload_app = os.getenv("PRELOAD_APP", "1") != "0"
+
+if workers > 1:
+    # Read by app.py at import; /dev/shm keeps the mapped file in RAM
+    os.environ.setdefault("DATASET_MMAP_DIR", "/dev/shm/mpi-dataset" if os.path.isdir("/dev/shm") else "/tmp/mpi-dataset")
+
+def when_ready(server):
+    # Runs in the master after the app is loaded (preload_app)
+    if preload_app:
+        import app
+        app.warm_caches()
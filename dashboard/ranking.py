@@ -0,0 +1,149 @@
+"""Top-N rankings for Tab 1 by partial selection.
+
+Scores are precomputed once per dataset load (one float array per ranking,
+NaN = unranked), as are the truncated bar labels. A Top-N query is a linear
+selection of the N-th largest score plus a sort of the N winners, instead of
+copying and fully sorting the filtered rows. The order is that of a stable
+descending sort: ties by row position, NaN last.
+
+TopNRanker also keeps the Top-DEPTH rows of recent filter states. A state
+that differs from a cached one by a single value added to or removed from one
+multi-select filter is derived from it without touching the other rows:
+    added:    merge the cached list with the Top-DEPTH of the rows that value
+              brings in (its posting list, checked against the other filters)
+    removed:  drop the rows with that value from the cached list
+A cached list is a correct prefix of the full ranking; a derived one is only
+kept while it still holds MIN_DEPTH rows (or the whole filtered set), else
+the state is ranked from its rows again.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DEPTH = 64
+MIN_DEPTH = 20  # the largest Top-N shown (slider max)
+
+def top_positions(values, n):
+    """Indices of the n largest `values`, best first (stable: ties by index, NaN last)."""
+    values = np.asarray(values, dtype=np.float64)
+    n = min(int(n), len(values))
+    if n <= 0:
+        return np.empty(0, dtype=np.intp)
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid) <= n:
+        v = values[valid]
+        return np.concatenate([valid[np.lexsort((valid, -v))],
+                               np.flatnonzero(np.isnan(values))[: n - len(valid)]])
+    v = values[valid]
+    kth = np.partition(v, len(v) - n)[len(v) - n]       # n-th largest
+    above = np.flatnonzero(v > kth)
+    chosen = np.concatenate([above, np.flatnonzero(v == kth)[: n - len(above)]])
+    return valid[chosen[np.lexsort((chosen, -v[chosen]))]]
+
+def _one_value_change(old, new, columns):
+    """(filter key, value, added) if `new` differs from `old` by one value
+    added to / removed from one multi-select in `columns`, else None."""
+    changed = [k for k in set(old) | set(new) if old.get(k) != new.get(k)]
+    if len(changed) != 1 or changed[0] not in columns:
+        return None
+    key = changed[0]
+    before = {str(v) for v in old.get(key) or []}
+    after = {str(v) for v in new.get(key) or []}
+    # An empty selection means "no filter": adding the first value narrows
+    # the set and removing the last one widens it to everything
+    if not before or not after:
+        return None
+    if len(after - before) == 1 and before <= after:
+        return key, (after - before).pop(), True
+    if len(before - after) == 1 and after <= before:
+        return key, (before - after).pop(), False
+    return None
+
+class TopNRanker:
+    """Top-N row positions per ranking for the filter states of one dataset.
+
+    index:    the dataset's FilterIndex (codes and posting lists)
+    scores:   {name: per-row score array}, higher is better
+    labels:   per-row bar labels (already truncated)
+    columns:  {filter key: column} for the multi-select filters eligible for
+              one-value updates
+    spec:     filters dict -> (in_filters, ranges), as for FilterIndex.select
+    """
+
+    def __init__(self, index, scores, labels, columns, spec, depth=DEPTH, min_depth=MIN_DEPTH, max_states=64):
+        self.index = index
+        self.scores = {name: np.asarray(s, dtype=np.float64) for name, s in scores.items()}
+        self.labels = np.asarray(labels, dtype=object)
+        self.columns = columns
+        self.spec = spec
+        self.depth = depth
+        self.min_depth = min_depth
+        self.max_states = max_states
+        self._states = OrderedDict()    # token -> (filters, {name: positions}, complete)
+        self._lock = threading.Lock()
+        self.full = self.incremental = 0
+
+    def top(self, token, filters, rows, n):
+        """{name: the n (<= min_depth) best row positions} for the state `token` (= filters).
+
+        rows: the state's row positions (None = all), or a callable returning
+        them; only needed when the state cannot be derived from a cached one."""
+        with self._lock:
+            state = self._states.get(token)
+            if state is not None:
+                self._states.move_to_end(token)
+        if state is None:
+            state = self._derive(filters)
+            if state is None:
+                self.full += 1
+                rows = rows() if callable(rows) else rows
+                state = (filters, self._select(rows), rows is None or len(rows) <= self.depth)
+            else:
+                self.incremental += 1
+            with self._lock:
+                self._states[token] = state
+                while len(self._states) > self.max_states:
+                    self._states.popitem(last=False)
+        return {name: pos[:n] for name, pos in state[1].items()}
+
+    def _select(self, rows):
+        if rows is None:
+            return {name: top_positions(s, self.depth) for name, s in self.scores.items()}
+        return {name: rows[top_positions(s[rows], self.depth)] for name, s in self.scores.items()}
+
+    def _derive(self, filters):
+        with self._lock:
+            cached = list(reversed(self._states.values()))
+        for old, tops, complete in cached:
+            change = _one_value_change(old, filters, self.columns)
+            if change is None:
+                continue
+            key, value, added = change
+            col = self.columns[key]
+            code = self.index.lookup[col].get(value)
+            if code is None:            # matches no row: same set
+                return filters, tops, complete
+            if added:
+                order, offsets = self.index.postings[col]
+                rows = order[offsets[code]:offsets[code + 1]]
+                rows = rows[self.index.subset_mask(rows, *self.spec({**filters, key: []}))]
+                new = self._select(rows)
+                derived = {}
+                for name, pos in tops.items():
+                    both = np.union1d(pos, new[name])
+                    merged = both[top_positions(self.scores[name][both], self.depth)]
+                    if not complete and len(pos):
+                        # rows of the old set below its last listed one are unknown
+                        hit = np.flatnonzero(merged == pos[-1])
+                        if len(hit):
+                            merged = merged[: hit[0] + 1]
+                    derived[name] = merged
+                # a complete list holds the whole old set
+                complete = complete and len(next(iter(tops.values()))) + len(rows) <= self.depth
+            else:
+                derived = {name: pos[self.index.codes[col][pos] != code] for name, pos in tops.items()}
+            if complete or all(len(pos) >= self.min_depth for pos in derived.values()):
+                return filters, derived, complete
+        return None
@@ -0,0 +1,76 @@
+"""Type-ahead search over the distinct names of a text column (company,
+project), for server-side dropdown options and the Projects table search.
+
+Built once per dataset version. Names are matched case-insensitively: a
+query matches names starting with it (binary search on the sorted folded
+names) and, from 3 characters on, names containing it (intersection of the
+query's trigram posting lists, then a substring check on the candidates).
+Prefix matches are listed first, each group alphabetically.
+"""
+
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+def _trigram_keys(codepoints):
+    """One uint64 per trigram of a uint32 code point array (code points < 2**21)."""
+    c = codepoints.astype(np.uint64)
+    return (c[:-2] << np.uint64(42)) | (c[1:-1] << np.uint64(21)) | c[2:]
+
+class NameIndex:
+    def __init__(self, values):
+        # Same names as the sidebar lists: str form of non-missing, non-blank values
+        uniques = pd.Series(pd.unique(pd.Series(values).dropna())).astype(str)
+        self.names = np.array(sorted(v for v in uniques if v.strip() != ""), dtype=object)
+        self.folded = [n.casefold() for n in self.names]
+        order = sorted(range(len(self.names)), key=self.folded.__getitem__)
+        self._keys = [self.folded[i] for i in order]
+        self._ids = np.asarray(order, dtype=np.int64)
+
+        # Trigram postings, built on all names at once: the folded names joined
+        # by NULs as one code point array, one (trigram, name id) pair per
+        # position that does not span a separator, sorted and deduplicated
+        n = max(len(self.folded), 1)
+        text = np.frombuffer("\0".join(self.folded + [""]).encode("utf-32-le"), dtype=np.uint32)
+        lengths = np.fromiter(map(len, self.folded), dtype=np.int64, count=len(self.folded))
+        owner = np.repeat(np.arange(len(self.folded), dtype=np.int64), lengths + 1)
+        grams = np.empty(0, dtype=np.uint64)
+        if len(text) >= 3:
+            ok = (text[:-2] != 0) & (text[1:-1] != 0) & (text[2:] != 0)
+            grams, owner = _trigram_keys(text)[ok], owner[:len(text) - 2][ok]
+        codes, self._grams = pd.factorize(grams, sort=True)
+        pairs = np.sort(codes.astype(np.int64) * n + owner[:len(codes)])
+        pairs = pairs[np.append(True, pairs[1:] != pairs[:-1])] if len(pairs) else pairs
+        self._posting_ids = pairs % n
+        self._offsets = np.searchsorted(pairs // n, np.arange(len(self._grams) + 1))
+
+    def _posting(self, gram):
+        key = _trigram_keys(np.frombuffer(gram.encode("utf-32-le"), dtype=np.uint32))[0]
+        i = np.searchsorted(self._grams, key)
+        if i == len(self._grams) or self._grams[i] != key:
+            return None
+        return self._posting_ids[self._offsets[i]:self._offsets[i + 1]]
+
+    def search(self, query, limit=None):
+        """Names matching `query` (prefix matches first); at most `limit`."""
+        q = str(query or "").casefold()
+        if not q.strip():
+            return []
+        lo = bisect_left(self._keys, q)
+        hi = bisect_left(self._keys, q + "\U0010ffff")
+        prefix = np.sort(self._ids[lo:hi])
+        if len(q) < 3 or (limit is not None and len(prefix) >= limit):
+            return self.names[prefix[:limit]].tolist()
+        grams = {q[i:i + 3] for i in range(len(q) - 2)}
+        lists = sorted((self._posting(g) for g in grams), key=lambda p: -1 if p is None else len(p))
+        if lists[0] is None:
+            candidates = np.empty(0, dtype=np.int64)
+        else:
+            candidates = lists[0]
+            for ids in lists[1:]:
+                candidates = np.intersect1d(candidates, ids, assume_unique=True)
+        inner = [i for i in candidates if q in self.folded[i]]
+        inner = np.setdiff1d(np.asarray(inner, dtype=np.int64), prefix, assume_unique=True)
+        ids = np.concatenate([prefix, inner])
+        return self.names[ids[:limit]].tolist()
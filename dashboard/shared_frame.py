@@ -0,0 +1,69 @@
+"""Memory-mapped copy of the display-ready frame, shared by gunicorn workers.
+
+With `DATASET_MMAP_DIR` set, the coerced frame is written once per source
+file version as an uncompressed Arrow IPC file in that directory and every
+process reads it through a memory map. Numeric columns (without nulls) are
+zero-copy, read-only views of the mapped file, so all workers on a host share
+one copy in the page cache instead of each holding its own. String columns
+are still materialized per process (pandas object dtype).
+
+The first process to need a version builds and publishes it (atomic rename);
+the others, and later reloads, just map the file. Older versions of the same
+source are deleted on publish; processes that still map them keep them
+readable until they drop the frame.
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+
+def frame_path(directory, key):
+    """File for the dataset version `key` = (path, mtime_ns, size)."""
+    source = hashlib.sha1(str(key[0]).encode("utf-8")).hexdigest()[:12]
+    version = hashlib.sha1(repr(tuple(key)).encode("utf-8")).hexdigest()[:12]
+    return Path(directory) / f"{source}-{version}.arrow"
+
+def _to_table(df):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # from_pandas turns NaN into nulls, which to_pandas has to fill again (a
+    # copy); plain numeric arrays keep NaN as a value and map zero-copy.
+    # Nullable extension dtypes (Int64, boolean) keep the type from_pandas gave them
+    for i, name in enumerate(df.columns):
+        dtype = df[name].dtype
+        if isinstance(dtype, np.dtype) and dtype.kind in "fiub":
+            table = table.set_column(i, table.schema.field(i), pa.array(df[name].to_numpy()))
+    return table
+
+def write_frame(df, path):
+    path = Path(path)
+    table = _to_table(df)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-", suffix=".arrow")
+    try:
+        with os.fdopen(fd, "wb") as f, pa.ipc.new_file(f, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+def read_frame(path):
+    table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+    return table.to_pandas(split_blocks=True)
+
+def load_shared(directory, key, build):
+    """The frame for dataset version `key`, mapped from `directory`; built
+    with `build()` and published there by the first process that needs it."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = frame_path(directory, key)
+    if not path.exists():
+        write_frame(build(), path)
+        prefix = path.name.split("-")[0] + "-"
+        for old in directory.glob(prefix + "*.arrow"):
+            if old != path:
+                old.unlink(missing_ok=True)
+    return read_frame(path)
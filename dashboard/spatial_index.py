@@ -0,0 +1,83 @@
+"""Spatial index and zoom-dependent clustering for the Map tab.
+
+Built once per dataset load over `latitude_1` / `longitude_1`: valid points
+are projected to Web Mercator (x, y in [0, 1)) and kept sorted by x, so a
+viewport query is a binary search on x plus a y test on the candidates.
+Clusters are the cells of a grid aligned with the map tiles at the current
+zoom, CLUSTER_BITS levels finer than a tile (256 px / 2**3 = 32 px cells), so
+the number of clusters is bounded by the viewport size, not the point count.
+"""
+
+import numpy as np
+import pandas as pd
+
+CLUSTER_BITS = 3
+MAX_LAT = 85.05112878     # Web Mercator limit
+
+def mercator(lat, lon):
+    lat = np.clip(lat, -MAX_LAT, MAX_LAT)
+    x = (lon + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(np.radians(lat)) + 1.0 / np.cos(np.radians(lat))) / np.pi) / 2.0
+    return x, y
+
+class SpatialIndex:
+    def __init__(self, lat, lon):
+        lat = pd.to_numeric(pd.Series(lat), errors="coerce").to_numpy(dtype=np.float64)
+        lon = pd.to_numeric(pd.Series(lon), errors="coerce").to_numpy(dtype=np.float64)
+        valid = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180))
+        x, y = mercator(lat[valid], lon[valid])
+        order = np.argsort(x, kind="stable")
+        self.rows, self.x, self.y = valid[order], x[order], y[order]
+        self.lat, self.lon = lat, lon
+        # row position -> slot in the x-sorted arrays (-1 = not geocoded)
+        self.slot = np.full(len(lat), -1, dtype=np.int64)
+        self.slot[self.rows] = np.arange(len(self.rows))
+
+    def window(self, positions=None, bbox=None):
+        """Geocoded row positions (sorted) among `positions` (default: all)
+        inside bbox = (west, south, east, north), default: everywhere."""
+        if bbox is None:
+            slots = np.arange(len(self.rows))
+        else:
+            west, south, east, north = bbox
+            x0, y1 = mercator(south, west)
+            x1, y0 = mercator(north, east)
+            if west <= east:
+                slots = np.arange(np.searchsorted(self.x, x0, "left"), np.searchsorted(self.x, x1, "right"))
+            else:   # crosses the antimeridian
+                slots = np.concatenate([np.arange(np.searchsorted(self.x, x0, "left"), len(self.x)),
+                                        np.arange(0, np.searchsorted(self.x, x1, "right"))])
+            slots = slots[(self.y[slots] >= y0) & (self.y[slots] <= y1)]
+        rows = self.rows[slots]
+        if positions is not None:
+            rows = rows[np.isin(rows, positions)]
+        return np.sort(rows)
+
+    def clusters(self, rows, zoom, cost=None, labels=None):
+        """Aggregate `rows` per grid cell at `zoom`.
+
+        cost:   per-row values aligned with `rows` (summed; missing = 0)
+        labels: per-row category aligned with `rows` (most frequent one reported)
+        Returns a DataFrame: lat, lon (centroid), count, cost, label."""
+        if len(rows) == 0:
+            return pd.DataFrame(columns=["lat", "lon", "count", "cost", "label"])
+        level = max(int(np.floor(zoom)), 0) + CLUSTER_BITS
+        scale = float(2 ** level)
+        slots = self.slot[rows]
+        cx = np.minimum((self.x[slots] * scale).astype(np.int64), int(scale) - 1)
+        cy = np.minimum((self.y[slots] * scale).astype(np.int64), int(scale) - 1)
+        cells, inverse = np.unique(cx * int(scale) + cy, return_inverse=True)
+        inverse = inverse.ravel()
+        count = np.bincount(inverse, minlength=len(cells))
+        out = pd.DataFrame({
+            "lat": np.bincount(inverse, weights=self.lat[rows], minlength=len(cells)) / count,
+            "lon": np.bincount(inverse, weights=self.lon[rows], minlength=len(cells)) / count,
+            "count": count,
+        })
+        weights = np.zeros(len(rows)) if cost is None else np.nan_to_num(np.asarray(cost, dtype=np.float64))
+        out["cost"] = np.bincount(inverse, weights=weights, minlength=len(cells))
+        if labels is not None:
+            codes, uniques = pd.factorize(pd.Series(labels).astype(object).fillna("Unknown"))
+            pairs = np.bincount(inverse * len(uniques) + codes, minlength=len(cells) * len(uniques))
+            out["label"] = np.asarray(uniques, dtype=object)[pairs.reshape(len(cells), len(uniques)).argmax(axis=1)]
+        return out
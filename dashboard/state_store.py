@@ -0,0 +1,129 @@
+"""Server-side store for the filtered state shared between callbacks.
+
+Instead of shipping the filtered frame through `dcc.Store` as JSON, the Store
+holds a compact state (filter values + a token). The token is a hash of the
+dataset key and the filter values; it maps to the selected row positions in a
+server-side cache. Any worker can resolve a state: on a cache miss the rows
+are recomputed from the filter values and cached again.
+
+Backends:
+    memory                in-process LRU (default)
+    disk:<directory>      row arrays as .npy files, shared by all workers on a host
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+def state_token(dataset_key, filters):
+    payload = json.dumps([list(dataset_key), filters], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:20]
+
+class LruBackend:
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            if token not in self._items:
+                return False, None
+            self._items.move_to_end(token)
+            return True, self._items[token]
+
+    def put(self, token, rows):
+        with self._lock:
+            self._items[token] = rows
+            self._items.move_to_end(token)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+class DiskBackend:
+    """Row arrays as `<token>.npy`; an all-rows selection is stored as an empty
+    `<token>.all` marker. Writes are atomic (temp file + rename).
+
+    Eviction scans the directory, so it runs once every `evict_every` puts
+    rather than on each one; between sweeps the directory may exceed
+    `max_entries` by that many entries per worker."""
+
+    def __init__(self, directory, max_entries=4096, evict_every=64):
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self._puts = 0
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        if (self.dir / f"{token}.all").exists():
+            return True, None
+        try:
+            return True, np.load(self.dir / f"{token}.npy", allow_pickle=False)
+        except (FileNotFoundError, ValueError, OSError):
+            return False, None
+
+    def put(self, token, rows):
+        if rows is None:
+            (self.dir / f"{token}.all").touch()
+        else:
+            fd, tmp = tempfile.mkstemp(dir=self.dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, rows, allow_pickle=False)
+            os.replace(tmp, self.dir / f"{token}.npy")
+        with self._lock:
+            self._puts += 1
+            due = self._puts % self.evict_every == 0
+        if due:
+            self._evict()
+
+    def _evict(self):
+        files = []
+        with os.scandir(self.dir) as entries:
+            for e in entries:
+                if e.name.endswith((".npy", ".all")):
+                    try:
+                        files.append((e.stat().st_mtime, e.path))
+                    except FileNotFoundError:       # evicted by another worker
+                        pass
+        if len(files) <= self.max_entries:
+            return
+        files.sort()
+        for _, path in files[: len(files) - self.max_entries]:
+            Path(path).unlink(missing_ok=True)
+
+def backend_from_spec(spec):
+    spec = (spec or "memory").strip()
+    if spec == "memory":
+        return LruBackend()
+    if spec.startswith("disk:"):
+        return DiskBackend(spec[len("disk:"):])
+    raise ValueError(f"Unknown filter state backend: {spec!r}")
+
+class FilteredStateStore:
+    def __init__(self, backend=None):
+        self.backend = backend or LruBackend()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def rows(self, dataset_key, filters, compute):
+        """Row positions for `filters` on the dataset `dataset_key`
+        (None = all rows), computing and caching them on a miss."""
+        token = state_token(dataset_key, filters)
+        found, rows = self.backend.get(token)
+        if found:
+            with self._lock:
+                self.hits += 1
+            return token, rows
+        with self._lock:
+            self.misses += 1
+        rows = compute()
+        self.backend.put(token, rows)
+        return token, rows
@@ -0,0 +1,71 @@
+"""Server-side pages of the filtered rows for the Projects table.
+
+Each sortable column gets one stable row order per direction over the whole
+dataset version, built on first use (missing values last either way, ties
+in row order, like a stable `sort_values`). A page of the filtered rows is
+then read off that order: the order is scanned in chunks, keeping the
+selected rows, until the page is filled, so early pages of a large selection
+only touch a prefix of it. Only the visible page's rows are ever sliced.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+_CHUNK = 65536
+
+def _sort_key(col):
+    """Integer ranks of `col` (ties equal), with missing values = -1."""
+    if col.dtype.kind in "fiub":
+        values = pd.to_numeric(col, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        _, ranks = np.unique(values, return_inverse=True)
+        ranks = ranks.ravel().astype(np.int64)
+        ranks[np.isnan(values)] = -1
+        return ranks
+    # Text (object / categorical): ordered by the shown str form
+    codes, _ = pd.factorize(col.astype(str).where(col.notna(), None), sort=True)
+    return codes.astype(np.int64)
+
+class SortedPages:
+    def __init__(self, frame):
+        self.frame = frame
+        self._orders = {}
+        self._lock = threading.Lock()
+
+    def order(self, col, descending=False):
+        key = (col, descending)
+        order = self._orders.get(key)
+        if order is None:
+            with self._lock:
+                order = self._orders.get(key)
+                if order is None:
+                    ranks = _sort_key(self.frame[col])
+                    top = ranks.max(initial=-1) + 1
+                    # missing (-1) sorts after every value in both directions
+                    key_values = np.where(ranks < 0, top, top - 1 - ranks if descending else ranks)
+                    order = np.argsort(key_values, kind="stable")
+                    self._orders[key] = order
+        return order
+
+    def page(self, rows, page, size, sort_col=None, descending=False):
+        """Row positions on page `page` (0-based) of `size` rows.
+
+        rows: selected row positions in frame order (None = all rows)."""
+        start, stop = page * size, (page + 1) * size
+        if sort_col is None:
+            return np.arange(len(self.frame))[start:stop] if rows is None else rows[start:stop]
+        order = self.order(sort_col, descending)
+        if rows is None:
+            return order[start:stop]
+        selected = np.zeros(len(self.frame), dtype=bool)
+        selected[rows] = True
+        found, chunks = 0, []
+        for lo in range(0, len(order), _CHUNK):
+            chunk = order[lo:lo + _CHUNK]
+            chunk = chunk[selected[chunk]]
+            chunks.append(chunk)
+            found += len(chunk)
+            if found >= stop:
+                break
+        return np.concatenate(chunks)[start:stop] if chunks else np.empty(0, dtype=np.int64)
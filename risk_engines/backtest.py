@@ -0,0 +1,280 @@
+"""Backtest of the MPI risk engine on the yearly MPI snapshots (2017-2024).
+
+For every snapshot year Y, the projects listed that year and not yet under
+construction are rebuilt as an engine input as of Y, the way
+`mpi_2024_input.xlsx` was built for 2024: `start_year` and `start_status` from
+the first year listed, `reporting_years = Y - start_year + 1`, `project_cost`
+the largest cost reported up to Y. `cost_percentile` is the cost's percentile
+among all projects listed up to Y (the 2024 input's own percentiles came from
+a population that is not in the history file). Only records up to Y are used.
+
+The realized outcome is joined from the later snapshots: the first later year
+listed "Under Construction" (`years_to_construction`, `constructed`), else
+censored at the last year the project is listed. `built_3y` (the event the
+engine's probabilities are for) is 1 when construction starts within 3
+years, else 0, for the years where Y + 3 is covered by the history (a project
+dropped from the inventory counts as not built), and missing for later years.
+
+Reported, per year and pooled (`backtest()` returns each as a frame):
+- metrics: Brier score and AUC of `blended_prob` / `p_bayes` / `p_cox` for
+  `built_3y`; Harrell's C of the Cox `risk_score` (and `blended_prob`) on
+  time to construction;
+- reliability: observed rate of `built_3y` per 0.1 bin of `blended_prob`;
+- stability: Spearman correlation and top-decile overlap of `power_ranking`
+  between consecutive years, over projects listed in both.
+
+Note the coefficients were fitted on this history, so this is an in-sample
+check. Years are built and scored in parallel. Each year's snapshot is cached
+with its coefficient-independent encoding (`risk_model.encode_frame`), keyed
+on the history file's hash, so a rerun after a coefficient change only
+redoes the scoring.
+
+    python risk_engines/backtest.py --out-dir backtest/ --workers 4 \\
+        --bayes bayes_lr_regenerated_coefficients.csv --cox cox_coefficients_with_references.csv
+"""
+
+import argparse
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import mpi_risk_engine_v02 as engine
+from risk_model import RiskModel, _file_sha256, encode_frame
+
+HISTORY_XLSX = Path(__file__).resolve().parents[1] / "data" / "mpi_dataset_all_2017-2024.xlsx"
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / ".backtest_cache"
+BUILT_STATUS = "Under Construction"
+HORIZON_YEARS = 3
+RELIABILITY_BINS = np.linspace(0.0, 1.0, 11)
+PROB_COLS = ["blended_prob", "p_bayes", "p_cox"]
+
+# Bump when build_snapshot() changes, so cached snapshots are rebuilt
+SNAPSHOT_VERSION = 1
+
+# ============================================================
+# Snapshots as of each year, with realized outcomes
+# ============================================================
+def load_history(path=HISTORY_XLSX):
+    history = pd.read_excel(path)
+    history["Unique_ID"] = history["Unique_ID"].astype(np.int64)
+    history = history.sort_values(["Unique_ID", "status_year"], kind="stable")
+    return history.drop_duplicates(["Unique_ID", "status_year"]).reset_index(drop=True)
+
+def build_snapshot(history, year):
+    """Engine input as of `year` (plus outcome columns), ready to encode."""
+    past = history[history["status_year"] <= year]
+    first = past.groupby("Unique_ID").first()
+    max_cost = past.groupby("Unique_ID")["cost_current"].max()
+    cur = past[(past["status_year"] == year) & (past["status_current"] != BUILT_STATUS)]
+    uid = cur["Unique_ID"]
+
+    start = first["status_year"].reindex(uid).to_numpy()
+    cost = max_cost.reindex(uid).to_numpy()
+    costs = np.sort(max_cost.dropna().to_numpy())
+    pct = np.where(np.isnan(cost), np.nan, np.searchsorted(costs, cost, side="right") / max(len(costs), 1))
+    snap = pd.DataFrame({
+        "Unique ID": uid.to_numpy(),
+        "company": cur["company_proponent"].to_numpy(),
+        "project": cur["project_name"].to_numpy(),
+        "province": cur["province_territory"].to_numpy(),
+        "company_type": cur["company_type"].to_numpy(),
+        "start_year": start,
+        "end_year": year,
+        "reporting_years": year - start + 1,
+        "start_status": first["status_current"].reindex(uid).to_numpy(),
+        "end_status": cur["status_current"].to_numpy(),
+        "current_survival": 1,
+        "end_success": 0,
+        "project_cost": cost,
+        "cost_percentile": np.round(pct, 3),
+        "latitude_1": cur["latitude_1"].to_numpy(),
+        "longitude_1": cur["longitude_1"].to_numpy(),
+        "sector": cur["sector"].to_numpy(),
+        "group": cur["group"].to_numpy(),
+        "cleantech": cur["cleantech"].to_numpy(),
+        "abbreviation": cur["abbreviation"].to_numpy(),
+    })
+
+    for c in ("company", "project"):
+        snap[c] = snap[c].where(snap[c].isna(), snap[c].astype(str))   # a few names are numbers
+
+    # Outcomes, from the later snapshots
+    later = history[history["status_year"] > year]
+    built = later[later["status_current"] == BUILT_STATUS].groupby("Unique_ID")["status_year"].min()
+    last_seen = history.groupby("Unique_ID")["status_year"].max()
+    built_year = built.reindex(uid).to_numpy(dtype=np.float64)
+    constructed = ~np.isnan(built_year)
+    snap["snapshot_year"] = year
+    snap["constructed"] = constructed.astype(np.int8)
+    snap["years_to_construction"] = np.where(constructed, built_year, last_seen.reindex(uid).to_numpy()) - year
+    covered = year + HORIZON_YEARS <= history["status_year"].max()
+    built_3y = constructed & (snap["years_to_construction"].to_numpy() <= HORIZON_YEARS)
+    snap["built_3y"] = built_3y.astype(np.float64) if covered else np.nan
+    return snap
+
+# ============================================================
+# Per-year work (parallel): cached snapshot + encoding, then scoring
+# ============================================================
+_WORK = {}
+
+def _init_worker(history, bayes_lr_map, cox_coef_map, cache):
+    _WORK.update(history=history, model=RiskModel.from_maps(bayes_lr_map, cox_coef_map), cache=cache)
+
+def _encoded_snapshot(year):
+    path = None if _WORK["cache"] is None else _WORK["cache"] / f"{year}.pkl"
+    if path is not None and path.exists():
+        return pd.read_pickle(path)
+    snap = engine.add_cost_quintile_bayes(build_snapshot(_WORK["history"], year))
+    cached = {"snapshot": snap, "enc": encode_frame(snap)}
+    if path is not None:
+        tmp = path.with_suffix(".tmp")
+        pd.to_pickle(cached, tmp)
+        tmp.replace(path)
+    return cached
+
+def _score_year(year):
+    cached = _encoded_snapshot(year)
+    snap = cached["snapshot"].copy()
+    _WORK["model"].score_rows(snap, cached["enc"])
+    return engine.rescale_priority(snap).drop(columns="_cost_quintile_bayes")
+
+def score_snapshots(bayes_lr_map, cox_coef_map, history_path=HISTORY_XLSX, years=None, workers=1,
+                    cache_dir=DEFAULT_CACHE_DIR):
+    """All snapshot years scored with the given coefficients, one long frame."""
+    cache = None
+    if cache_dir is not None:
+        cache = Path(cache_dir) / f"{_file_sha256(history_path)[:16]}-v{SNAPSHOT_VERSION}"
+        cache.mkdir(parents=True, exist_ok=True)
+        manifest = cache / "years.json"
+    history = None
+    if years is None:
+        if cache is not None and manifest.exists():
+            years = json.loads(manifest.read_text())
+        else:
+            history = load_history(history_path)
+            years = sorted(history["status_year"].unique().tolist())
+            if cache is not None:
+                manifest.write_text(json.dumps(years))
+    if history is None and (cache is None or any(not (cache / f"{y}.pkl").exists() for y in years)):
+        history = load_history(history_path)
+
+    initargs = (history, bayes_lr_map, cox_coef_map, cache)
+    if workers > 1:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=initargs) as pool:
+            scored = list(pool.map(_score_year, years))
+    else:
+        _init_worker(*initargs)
+        try:
+            scored = [_score_year(y) for y in years]
+        finally:
+            _WORK.clear()
+    return pd.concat(scored, ignore_index=True)
+
+# ============================================================
+# Metrics
+# ============================================================
+def brier(p, y):
+    return float(np.mean((p - y) ** 2)) if len(y) else np.nan
+
+def auc(score, y):
+    """Area under the ROC curve (Mann-Whitney, ties count half)."""
+    n1 = int(y.sum())
+    n0 = len(y) - n1
+    if n1 == 0 or n0 == 0:
+        return np.nan
+    ranks = pd.Series(score).rank().to_numpy()
+    return float((ranks[y == 1].sum() - n1 * (n1 + 1) / 2) / (n1 * n0))
+
+def harrell_c(risk, time, event):
+    """Harrell's concordance: among pairs where one project is known to start
+    construction first, the share where it has the higher risk (ties half)."""
+    concordant, comparable = 0.0, 0
+    for i in np.flatnonzero(event):
+        later = (time > time[i]) | ((time == time[i]) & ~event)
+        comparable += int(later.sum())
+        concordant += (risk[later] < risk[i]).sum() + 0.5 * (risk[later] == risk[i]).sum()
+    return concordant / comparable if comparable else np.nan
+
+def _metrics(rows):
+    labelled = rows[rows["built_3y"].notna()]
+    y = labelled["built_3y"].to_numpy()
+    out = {"projects": len(rows), "labelled_3y": len(labelled),
+           "built_3y_rate": float(y.mean()) if len(y) else np.nan}
+    for c in PROB_COLS:
+        out[f"brier_{c}"] = brier(labelled[c].to_numpy(), y)
+    for c in PROB_COLS + ["power_ranking"]:
+        out[f"auc_{c}"] = auc(labelled[c].to_numpy(), y)
+    followed = rows[rows["years_to_construction"] > 0]
+    time = followed["years_to_construction"].to_numpy()
+    event = followed["constructed"].to_numpy().astype(bool)
+    out["events"] = int(event.sum())
+    for c in ("risk_score", "blended_prob"):
+        out[f"harrell_c_{c}"] = harrell_c(followed[c].to_numpy(), time, event)
+    return out
+
+def metrics(scores):
+    """One row per snapshot year plus "all" (pooled)."""
+    out = {str(y): _metrics(rows) for y, rows in scores.groupby("snapshot_year")}
+    out["all"] = _metrics(scores)
+    return pd.DataFrame.from_dict(out, orient="index").rename_axis("snapshot_year")
+
+def reliability(scores, col="blended_prob"):
+    """Reliability curve per 0.1 bin of `col`, pooled over years."""
+    labelled = scores[scores["built_3y"].notna()]
+    bins = pd.cut(labelled[col], RELIABILITY_BINS, include_lowest=True)
+    grouped = labelled.groupby(bins, observed=False)
+    return pd.DataFrame({"projects": grouped.size(), "mean_predicted": grouped[col].mean(),
+                         "observed_rate": grouped["built_3y"].mean()}).rename_axis(f"{col}_bin")
+
+def rank_stability(scores, col="power_ranking"):
+    """Year-over-year agreement of `col` for projects listed in both years."""
+    years = sorted(scores["snapshot_year"].unique())
+    by_year = {y: scores.loc[scores["snapshot_year"] == y].set_index("Unique ID")[col] for y in years}
+    rows = []
+    for a, b in zip(years, years[1:]):
+        both = pd.concat([by_year[a], by_year[b]], axis=1, join="inner", keys=["a", "b"])
+        ranks = both.rank()                 # Spearman = Pearson on ranks
+        k = max(1, len(both) // 10)
+        top_a, top_b = both["a"].nlargest(k).index, both["b"].nlargest(k).index
+        rows.append({"from_year": a, "to_year": b, "projects": len(both),
+                     "spearman": ranks["a"].corr(ranks["b"]),
+                     "top_decile_overlap": len(top_a.intersection(top_b)) / k})
+    return pd.DataFrame(rows)
+
+def backtest(bayes_lr_map, cox_coef_map, history_path=HISTORY_XLSX, years=None, workers=1,
+             cache_dir=DEFAULT_CACHE_DIR):
+    """{"scores", "metrics", "reliability", "stability"} for the snapshot years."""
+    scores = score_snapshots(bayes_lr_map, cox_coef_map, history_path, years, workers, cache_dir)
+    return {"scores": scores, "metrics": metrics(scores), "reliability": reliability(scores),
+            "stability": rank_stability(scores)}
+
+def main():
+    ap = argparse.ArgumentParser(description="Backtest the MPI risk engine on the 2017-2024 snapshots")
+    ap.add_argument("--history", default=str(HISTORY_XLSX))
+    ap.add_argument("--bayes", default=engine.BAYES_COEFF_PATH)
+    ap.add_argument("--cox", default=engine.COX_COEFF_PATH)
+    ap.add_argument("--years", type=int, nargs="+")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR))
+    ap.add_argument("--no-cache", action="store_true")
+    ap.add_argument("--out-dir", help="writes scores.parquet, metrics.csv, reliability.csv, stability.csv")
+    args = ap.parse_args()
+
+    maps = engine.load_coefficient_maps(args.bayes, args.cox)
+    out = backtest(*maps, args.history, args.years, args.workers, None if args.no_cache else args.cache_dir)
+    if args.out_dir:
+        out_dir = Path(args.out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        out["scores"].to_parquet(out_dir / "scores.parquet", index=False)
+        for name in ("metrics", "reliability", "stability"):
+            out[name].to_csv(out_dir / f"{name}.csv", index=name != "stability")
+        print("Wrote:", out_dir)
+    with pd.option_context("display.width", 200, "display.max_columns", 30):
+        for name in ("metrics", "reliability", "stability"):
+            print(f"\n{name}:\n{out[name].round(3).to_string()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Backtest on the 2017-2024 snapshots: cold run (read the history, build
+and encode every snapshot) vs warm reruns off the snapshot cache, including a
+rerun after a coefficient change, serial and in parallel.
+
+Checks first that the rebuilt 2024 snapshot matches `mpi_2024_input.xlsx` on
+the columns it defines, that the cached scoring equals `engine.score()` on
+every snapshot, that AUC / Harrell's C match a brute-force pair count, and
+that the output does not depend on the worker count or the cache.
+
+    python risk_engines/benchmarks/bench_backtest.py
+"""
+
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from common import engine, load_input, load_maps, timed
+import backtest
+
+def brute_auc(score, y):
+    pos, neg = score[y == 1], score[y == 0]
+    diff = pos[:, None] - neg[None, :]
+    return ((diff > 0).sum() + 0.5 * (diff == 0).sum()) / diff.size
+
+def brute_c(risk, time, event):
+    num = den = 0.0
+    for i in range(len(time)):
+        for j in range(len(time)):
+            if event[i] and (time[i] < time[j] or (time[i] == time[j] and not event[j])):
+                den += 1
+                num += 1.0 if risk[i] > risk[j] else 0.5 if risk[i] == risk[j] else 0.0
+    return num / den
+
+def check_equivalence(maps):
+    history = backtest.load_history()
+    snap = backtest.build_snapshot(history, 2024).set_index("Unique ID")
+    ref = load_input().set_index("Unique ID")
+    assert set(snap.index) == set(ref.index)
+    snap = snap.loc[ref.index]
+    for c in ("start_year", "end_year", "reporting_years", "start_status", "end_status"):
+        assert (snap[c] == ref[c]).all(), c
+    assert np.allclose(snap["project_cost"], ref["project_cost"], rtol=1e-8, equal_nan=True)
+    assert (snap["province"] == ref["province"]).mean() > 0.99
+
+    with tempfile.TemporaryDirectory() as tmp:
+        serial = backtest.score_snapshots(*maps, cache_dir=tmp)
+        cached = backtest.score_snapshots(*maps, cache_dir=tmp, workers=2)
+    uncached = backtest.score_snapshots(*maps, cache_dir=None, workers=3)
+    pd.testing.assert_frame_equal(serial, cached, check_exact=True)
+    pd.testing.assert_frame_equal(serial, uncached, check_exact=True)
+    for year, rows in serial.groupby("snapshot_year"):
+        expected = engine.score(backtest.build_snapshot(history, year), *maps)
+        for c in ("p_bayes", "risk_score", "p_cox", "blended_prob", "priority_index", "power_ranking"):
+            assert rows[c].to_numpy().tobytes() == expected[c].to_numpy().tobytes(), (year, c)
+
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        n = int(rng.integers(5, 60))
+        risk = rng.integers(0, 6, n).astype(float)
+        time, event = rng.integers(1, 5, n).astype(float), rng.random(n) < 0.5
+        y = event.astype(int)
+        if 0 < y.sum() < n:
+            assert np.isclose(backtest.auc(risk, y), brute_auc(risk, y))
+        if event.any():
+            assert np.isclose(backtest.harrell_c(risk, time, event), brute_c(risk, time, event))
+    return serial["snapshot_year"].nunique(), len(serial)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, os.cpu_count() or 1}))
+    args = ap.parse_args()
+
+    maps = load_maps()
+    years, rows = check_equivalence(maps)
+    print(f"equivalence: 2024 snapshot = mpi_2024_input; {years} years / {rows:,} scored rows = engine.score(); "
+          f"AUC / Harrell's C = brute force; same output for any workers / cache")
+
+    # A coefficient change: every LR and Cox coefficient nudged
+    bayes_lr_map, cox_coef_map = maps
+    changed = ({k: v * 1.05 for k, v in bayes_lr_map.items()}, {k: v + 0.02 for k, v in cox_coef_map.items()})
+    print(f"\n{'workers':>8} {'no cache (s)':>13} {'cold cache (s)':>15} {'warm (s)':>9} {'new coefs, warm (s)':>20}")
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as tmp:
+            _, t_none = timed(backtest.backtest, *maps, workers=workers, cache_dir=None)
+            _, t_cold = timed(backtest.backtest, *maps, workers=workers, cache_dir=tmp)
+            _, t_warm = timed(backtest.backtest, *maps, workers=workers, cache_dir=tmp)
+            _, t_new = timed(backtest.backtest, *changed, workers=workers, cache_dir=tmp)
+        print(f"{workers:>8} {t_none:>13.2f} {t_cold:>15.2f} {t_warm:>9.2f} {t_new:>20.2f}")
+
+if __name__ == "__main__":
+    main()
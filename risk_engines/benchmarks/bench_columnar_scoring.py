@@ -0,0 +1,54 @@
+"""Columnar vs row-wise (df.apply) scoring.
+
+Checks that the columnar path is bit-for-bit identical to the apply path,
+then times both. The apply path is only timed up to --apply-max rows and
+extrapolated linearly beyond that.
+
+    python risk_engines/benchmarks/bench_columnar_scoring.py --rows 10000 1000000 10000000
+"""
+
+import argparse
+
+import numpy as np
+
+from common import engine, load_maps, synthetic_frame, timed
+
+SCORE_COLS = ["p_bayes", "risk_score", "p_cox", "blended_prob",
+              "priority_index", "urgency_scale_(0-1)", "power_ranking"]
+
+def check_identical(df_a, df_b):
+    for c in SCORE_COLS:
+        a, b = df_a[c].to_numpy(), df_b[c].to_numpy()
+        if a.dtype != b.dtype or a.tobytes() != b.tobytes():
+            raise AssertionError(f"{c}: columnar output differs from apply path")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    ap.add_argument("--apply-max", type=int, default=100_000)
+    args = ap.parse_args()
+
+    bayes_lr_map, cox_coef_map = load_maps()
+    check_n = min(args.apply_max, 50_000)
+    df = synthetic_frame(check_n, seed=1)
+    check_identical(engine.score(df.copy(), bayes_lr_map, cox_coef_map, vectorized=False),
+                    engine.score(df.copy(), bayes_lr_map, cox_coef_map, vectorized=True))
+    print(f"bit-for-bit identical on {check_n:,} synthetic rows")
+
+    print(f"{'rows':>12} {'apply (s)':>12} {'columnar (s)':>13} {'speedup':>9}")
+    per_row_apply = None
+    for n in args.rows:
+        df = synthetic_frame(n, seed=2)
+        _, t_col = timed(engine.score, df.copy(), bayes_lr_map, cox_coef_map, vectorized=True)
+        if n <= args.apply_max:
+            _, t_apply = timed(engine.score, df.copy(), bayes_lr_map, cox_coef_map, vectorized=False)
+            per_row_apply = t_apply / n
+            note = ""
+        else:
+            t_apply = per_row_apply * n if per_row_apply else np.nan
+            note = " (apply extrapolated)"
+        print(f"{n:>12,} {t_apply:>12.2f} {t_col:>13.3f} {t_apply / t_col:>8.0f}x{note}")
+        del df
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Delta re-scoring: full `engine.score()` of the new snapshot (before) vs
+`delta.delta_score()` off the previous run's state (after) for a 1% change set.
+
+Checks first that:
+  - `delta.cost_quintiles` equals the engine's qcut quintiles (ties, NaNs,
+    tiny inputs),
+  - replaying the 2017 -> 2024 snapshots as successive releases, each delta
+    output equals `engine.score()` on that year, and the report accounts for
+    every row whose scores moved,
+  - a synthetic 1% change set (edits, repricings, additions, removals) gives
+    the full-rerun output, and the state survives a Parquet round trip,
+  - a coefficient change rescoring every row.
+
+    python risk_engines/benchmarks/bench_delta.py --rows 1000000
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from common import BAYES_CSV, COX_CSV, engine, load_maps, synthetic_frame, timed
+import backtest
+import delta
+from risk_model import RiskModel
+
+def change_set(df, frac, seed):
+    """`df` with `frac` of its rows edited (half of those repriced), a
+    quarter of that removed and as many added, in shuffled order."""
+    rng = np.random.default_rng(seed)
+    n = len(df)
+    k = max(1, int(n * frac))
+    new = df.copy()
+    edit = rng.choice(n, k, replace=False)
+    new.loc[edit[: k // 2], "province"] = rng.choice(["BC", "AB", "QC"], k // 2)
+    new.loc[edit[k // 2:], "project_cost"] *= rng.lognormal(0.0, 1.0, k - k // 2)
+    new = new.drop(index=rng.choice(n, max(1, k // 4), replace=False))
+    added = synthetic_frame(max(1, k // 4), seed=seed + 1)
+    added["Unique ID"] = np.arange(len(added)) + df["Unique ID"].max() + 1
+    return pd.concat([new, added], ignore_index=True)
+
+def unique_ids(df):
+    df["Unique ID"] = np.arange(len(df))
+    return df
+
+def check_equivalence(model, maps, history):
+    rng = np.random.default_rng(0)
+    for n in (1, 2, 3, 7, 100, 10_000):
+        cost = pd.Series(rng.choice([1.0, 2.0, 2.0, np.nan, 5.0], n) if n < 100 else rng.lognormal(0, 1, n))
+        cost[rng.random(n) < 0.05] = np.nan
+        if cost.notna().sum() < 2:
+            continue
+        expected = engine.add_cost_quintile_bayes(cost.to_frame("project_cost"))["_cost_quintile_bayes"].array
+        assert delta.cost_quintiles(cost).equals(expected), n
+
+    state = None
+    for year in sorted(history["status_year"].unique()):
+        snap = backtest.build_snapshot(history, year)
+        scored, report, new_state = delta.delta_score(snap.copy(), model, state)
+        expected = engine.score(snap.copy(), *maps)
+        pd.testing.assert_frame_equal(scored, expected, check_exact=True)
+        if state is not None:
+            prev = state.set_index("Unique ID")
+            common = expected["Unique ID"].isin(prev.index).to_numpy()
+            cur = expected.loc[common].set_index("Unique ID")
+            moved = np.zeros(len(cur), dtype=bool)
+            for c in delta.SCORE_COLUMNS:
+                a, b = cur[c].to_numpy(), prev.loc[cur.index, c].to_numpy()
+                moved |= (a != b) & ~(np.isnan(a) & np.isnan(b))
+            listed = set(report.loc[report["moved"] != "", "Unique ID"])
+            assert listed == set(cur.index[moved]), year
+            assert set(report.loc[report["change"] == "added", "Unique ID"]) == set(expected.loc[~common, "Unique ID"])
+        state = new_state
+
+    df = unique_ids(synthetic_frame(20_000, seed=3))
+    _, _, state = delta.delta_score(df.copy(), model)
+    new = change_set(df, 0.01, seed=4)
+    with tempfile.TemporaryDirectory() as tmp:
+        delta.save_state(state, Path(tmp) / "state.parquet")
+        loaded = delta.load_state(Path(tmp) / "state.parquet")
+    scored, report, _ = delta.delta_score(new.copy(), model, loaded)
+    pd.testing.assert_frame_equal(scored, engine.score(new.copy(), *maps), check_exact=True)
+    assert report["rescored"].sum() < len(new) // 10
+
+    bayes = pd.read_csv(BAYES_CSV)
+    bayes["LR"] *= 1.01
+    with tempfile.TemporaryDirectory() as tmp:
+        bayes.to_csv(Path(tmp) / "bayes.csv", index=False)
+        changed = RiskModel.from_csv(Path(tmp) / "bayes.csv", COX_CSV)
+        scored, report, _ = delta.delta_score(new.copy(), changed, loaded)
+        maps_changed = engine.load_coefficient_maps(Path(tmp) / "bayes.csv", COX_CSV)
+    pd.testing.assert_frame_equal(scored, engine.score(new.copy(), *maps_changed), check_exact=True)
+    assert report["rescored"].sum() == len(new) and (report["change"] == "added").sum() == len(new)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--change", type=float, default=0.01, help="fraction of rows edited")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    maps = load_maps()
+    model = RiskModel.from_csv(BAYES_CSV, COX_CSV)
+    history = backtest.load_history()
+    check_equivalence(model, maps, history)
+    print("equivalence: delta output = engine.score() on each 2017-2024 release and on synthetic change sets; "
+          "report lists exactly the rows whose scores moved")
+
+    print("\nreleases replayed as deltas (MPI 2017-2024):")
+    state, rows = None, []
+    for year in sorted(history["status_year"].unique()):
+        scored, report, state = delta.delta_score(backtest.build_snapshot(history, year), model, state)
+        rows.append({"year": year, **delta.summarize(report, len(scored))})
+    print(pd.DataFrame(rows).set_index("year").drop(columns="reason_rescale").to_string())
+
+    def best(fn, *a):
+        return min(timed(fn, *a)[1] for _ in range(args.repeat))
+
+    base = unique_ids(synthetic_frame(args.rows, seed=1))
+    _, _, state = delta.delta_score(base.copy(), model)
+    new = change_set(base, args.change, seed=2)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "state.parquet"
+        t_save = best(delta.save_state, state, path)
+        t_load = best(delta.load_state, path)
+        state = delta.load_state(path)
+        t_full = best(lambda: engine.score(new.copy(), *maps))
+        t_model = best(lambda: model.score(new.copy()))
+        t_copy = best(new.copy)
+        t_delta = best(lambda: delta.delta_score(new.copy(), model, state))
+        _, report, _ = delta.delta_score(new.copy(), model, state)
+    s = delta.summarize(report, len(new))
+    print(f"\n{len(new):,} rows, {args.change:.0%} change set: {s['added']:,} added, {s['removed']:,} removed, "
+          f"{s['changed']:,} changed ({s['reason_inputs']:,} inputs, {s['reason_cost_quintile']:,} quintile shifts), "
+          f"{s['rescored']:,} rescored, {s['scores_moved']:,} rows with scores moved")
+    print(f"  full engine.score():   {(t_full - t_copy) * 1e3:8.1f} ms")
+    print(f"  full RiskModel.score(): {(t_model - t_copy) * 1e3:7.1f} ms")
+    print(f"  delta_score():         {(t_delta - t_copy) * 1e3:8.1f} ms  ({(t_full - t_copy) / (t_delta - t_copy):.2f}x)")
+    print(f"  + load state {t_load * 1e3:.1f} ms, save state {t_save * 1e3:.1f} ms")
+
+if __name__ == "__main__":
+    main()
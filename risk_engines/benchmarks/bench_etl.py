@@ -0,0 +1,176 @@
+"""ETL from the raw MPI 2024 release: the hand-prepared path (read
+`mpi_2024_input.xlsx` + `engine.score()`) vs `etl.build_input()` +
+`etl.score_input()` from `MPI_2024_Active_Projects_en.xlsx`, cold (no cache),
+after a new release (history and classification cached) and warm.
+
+Checks first that:
+  - `score_input()` equals `engine.score()` on the ETL's input bit for bit,
+    and carries each row's `group_source`,
+  - a cached run returns the same input as an uncached one, and a changed
+    release rebuilds only the release and input stages,
+  - the normalization helpers on edge cases (accents, case, NaN, bad coordinates),
+    and blank / footnote rows in the release sheet are dropped.
+
+Then reports how closely the ETL input agrees with the hand-built
+`mpi_2024_input.xlsx`, and how often the groups inferred for projects the
+history has not seen (the 2024 release against the 2017-2023 history) match
+the hand-assigned ones.
+
+    python risk_engines/benchmarks/bench_etl.py
+"""
+
+import argparse
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from common import BAYES_CSV, COX_CSV, engine, load_maps, timed
+import backtest
+import etl
+from risk_model import RiskModel
+
+HAND_INPUT = etl.DATA_DIR / "mpi_2024_input.xlsx"
+
+def edited_release(path, out):
+    """A copy of the release with one project's cost changed (a new file hash)."""
+    book = openpyxl.load_workbook(path)
+    sheet = book["MPI 2024 Data"]
+    header = [c.value for c in sheet[1]]
+    cell = sheet.cell(row=2, column=header.index("Cost 2024 (CAD) {$M}") + 1)
+    cell.value = (cell.value or 0) + 1
+    book.save(out)
+    return out
+
+def check_equivalence(model, maps, tmp):
+    s = pd.Series(["Hydro-Québec ", "  Métaux   Torngat ltée", np.nan, 1234])
+    assert etl._fold(s).tolist()[:2] == ["Hydro-Quebec", "Metaux Torngat ltee"]
+    assert pd.isna(etl._fold(s).iat[2]) and etl._fold(s).iat[3] == "1234"
+    p = etl._canonical(pd.Series(["Qc", " bc", "NWT", "multi", "Atlantis", np.nan]),
+                       etl.PROVINCES, etl.PROVINCE_ALIASES)
+    assert p.iloc[:5].tolist() == ["QC", "BC", "NT", "Multi", "Atlantis"] and pd.isna(p.iat[5])
+    lat, lon = etl._coordinates(pd.Series([53.5, 0.0, "multiple", 47.1]), pd.Series([-113.4, 0.0, np.nan, -48.7]))
+    assert lat.notna().tolist() == [True, False, False, True] and lon.notna().tolist() == [True, False, False, True]
+
+    raw, year = etl.read_release()
+    notes = pd.DataFrame({"Project ID": [np.nan, "* Costs in millions of CAD"]})
+    padded = pd.concat([raw.iloc[:5], notes, raw.iloc[5:]], ignore_index=True)
+    pd.testing.assert_frame_equal(etl.normalize_release(padded, year), etl.normalize_release(raw, year))
+
+    uncached = etl.build_input(cache_dir=None)
+    scored = etl.score_input(model, uncached)
+    expected = engine.score(uncached["input"].drop(columns="_cost_quintile_bayes"), *maps)
+    pd.testing.assert_frame_equal(scored, expected, check_exact=True)
+    source = uncached["classified"].set_index("Unique_ID")["group_source"]
+    assert scored["group_source"].tolist() == source.loc[scored["Unique ID"]].tolist()
+
+    cache = Path(tmp) / "cache"
+    etl.build_input(cache_dir=cache)
+    warm = etl.build_input(cache_dir=cache)
+    assert warm["log"]["status"].tolist() == ["computed", "cached"]
+    pd.testing.assert_frame_equal(warm["input"], uncached["input"], check_exact=True)
+
+    raw = edited_release(etl.RAW_XLSX, Path(tmp) / "release.xlsx")
+    changed = etl.build_input(raw, cache_dir=cache)
+    status = dict(zip(changed["log"]["stage"], changed["log"]["status"]))
+    assert status == {"hash inputs": "computed", "release": "built", "history": "cached",
+                      "classification": "cached", "input": "built"}, status
+    return uncached
+
+def agreement(built, model, maps):
+    """Per-column agreement of the ETL input with the hand-built input, on the projects in both."""
+    hand = pd.read_excel(HAND_INPUT)
+    ours = built["input"].drop(columns="_cost_quintile_bayes")
+    both = ours.merge(hand, on="Unique ID", suffixes=("", "_hand"))
+    rows = []
+    for c in etl.INPUT_COLUMNS[1:]:
+        a, b = both[c], both[c + "_hand"]
+        if a.dtype.kind in "fi" and b.dtype.kind in "fi":
+            same = np.isclose(a.to_numpy(float), b.to_numpy(float), rtol=1e-9, atol=0.0, equal_nan=True)
+        else:
+            same = (a.astype(str).str.strip() == b.astype(str).str.strip()).to_numpy()
+        rows.append({"column": c, "agree": same.mean()})
+    q = engine.cost_quintile_for_cox
+    same_q = both["cost_percentile"].map(q) == both["cost_percentile_hand"].map(q)
+    rows.append({"column": "cox cost quintile", "agree": same_q.mean()})
+    pct_diff = (both["cost_percentile"] - both["cost_percentile_hand"]).abs().max()
+
+    ours_scored = etl.score_input(model, built).set_index("Unique ID")
+    hand_scored = engine.score(hand, *maps).set_index("Unique ID")
+    ids = both["Unique ID"]
+    prob = np.abs(ours_scored.loc[ids, "blended_prob"].to_numpy() - hand_scored.loc[ids, "blended_prob"].to_numpy())
+    rank = ours_scored.loc[ids, "power_ranking"].rank().corr(hand_scored.loc[ids, "power_ranking"].rank())
+    return (pd.DataFrame(rows), len(ours), len(hand), len(both), pct_diff,
+            (prob < 1e-12).mean(), prob.max(), rank)
+
+def inferred_groups(history):
+    """The 2024 release classified against the 2017-2023 history vs the hand-assigned 2024 groups."""
+    release = etl.normalize_release(*etl.read_release())
+    classification = pd.read_excel(etl.CLASSIFICATION_XLSX)
+    classified = etl.classify(release, history[history["status_year"] < 2024], classification)
+    hand = history[history["status_year"] == 2024].set_index("Unique_ID")
+    new = classified[(classified["group_source"] == "inferred") & classified["Unique_ID"].isin(hand.index)]
+    truth = hand.loc[new["Unique_ID"]]
+    return (len(new), (new["group"].to_numpy() == truth["group"].to_numpy()).mean(),
+            (new["cleantech"].to_numpy() == truth["cleantech"].to_numpy()).mean())
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    maps = load_maps()
+    model = RiskModel.from_csv(BAYES_CSV, COX_CSV)
+    with tempfile.TemporaryDirectory() as tmp:
+        built = check_equivalence(model, maps, tmp)
+    print("equivalence: score_input() = engine.score() on the ETL input; cached = uncached; "
+          "a new release rebuilds only the release and input stages")
+
+    table, n_ours, n_hand, n_both, pct_diff, same_prob, max_prob, rank = agreement(built, model, maps)
+    s = built["stats"]
+    print(f"\nMPI 2024 release: {s['release_rows']} rows, {s['under_construction']} under construction, "
+          f"{s['input_rows']} in the ETL input; hand-built input {n_hand} rows, {n_both} in both")
+    print(table.assign(agree=table["agree"].map("{:.1%}".format)).to_string(index=False))
+    print(f"cost_percentile max difference {pct_diff:.3f}; blended_prob identical for {same_prob:.1%} "
+          f"(max difference {max_prob:.4f}); power_ranking Spearman {rank:.4f}")
+
+    n_new, group_acc, cleantech_acc = inferred_groups(backtest.load_history())
+    print(f"\n2024 release vs the 2017-2023 history: {n_new} projects with inferred groups, "
+          f"{group_acc:.1%} equal to the hand-assigned group, {cleantech_acc:.1%} same cleantech flag")
+
+    def best(fn):
+        return min(timed(fn)[1] for _ in range(args.repeat))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = edited_release(etl.RAW_XLSX, Path(tmp) / "release.xlsx")
+        cache = Path(tmp) / "cache"
+        t_hand = best(lambda: engine.score(pd.read_excel(HAND_INPUT), *maps))
+        t_cold = best(lambda: etl.score_input(model, etl.build_input(cache_dir=None)))
+        cold_log = etl.build_input(cache_dir=None)["log"]
+
+        def new_release():
+            etl.score_input(model, etl.build_input(raw, cache_dir=cache))
+            for p in cache.glob("release-*.pkl"):
+                p.unlink()
+            for p in cache.glob("input-*.pkl"):
+                p.unlink()
+
+        etl.build_input(cache_dir=cache)
+        t_release = best(new_release)
+        etl.build_input(raw, cache_dir=cache)
+        t_warm = best(lambda: etl.score_input(model, etl.build_input(raw, cache_dir=cache)))
+        shutil.rmtree(cache)
+
+    print(f"\nraw release -> scored ({s['input_rows']} rows):")
+    print(f"  hand-built input: read xlsx + engine.score() {t_hand * 1e3:8.1f} ms")
+    print(f"  ETL, no cache:                               {t_cold * 1e3:8.1f} ms")
+    print(f"  ETL, new release (history cached):           {t_release * 1e3:8.1f} ms")
+    print(f"  ETL, every stage cached:                     {t_warm * 1e3:8.1f} ms")
+    print("\ncold stages:")
+    print(cold_log.assign(ms=(cold_log["seconds"] * 1e3).round(1)).drop(columns=["seconds", "status"]).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
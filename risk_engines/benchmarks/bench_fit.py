@@ -0,0 +1,197 @@
+"""Coefficient fitting: the Cox partial likelihood evaluated one event time at
+a time in Python (before) vs `fit.CoxProblem` (after), a full refit, and the
+bootstrap by worker count.
+
+Checks first that:
+  - the vectorized Efron and Breslow log-likelihoods equal the loop reference
+    at random coefficients, the gradient and Hessian match finite differences,
+    and the two tie methods agree when there are no ties,
+  - Newton stops at a zero gradient,
+  - case weights equal replicating the rows (Bayes counts and Cox fit), and
+    the Bayes LRs equal a pandas groupby count,
+  - fractional weights: Efron refuses them, and Breslow with every weight 0.5
+    gives 0.5 x the log L (less the log 0.5 risk-set scaling) and, at half
+    the penalizer, the same fit,
+  - the written CSVs load with `engine.load_coefficient_maps()` and
+    `RiskModel.from_csv()` and score identically through both,
+  - the bootstrap draws do not depend on the number of workers.
+
+Then compares the refit with the shipped coefficients on the 2024 snapshot.
+
+    python risk_engines/benchmarks/bench_fit.py --replicates 1000 --workers 4
+"""
+
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from common import BAYES_CSV, COX_CSV, engine, load_maps, timed
+import backtest
+import fit
+from risk_model import RiskModel
+
+def reference_loglik(X, time, event, beta, ties):
+    """Partial log-likelihood, one event time at a time."""
+    eta = X @ beta
+    ll = 0.0
+    for t in np.unique(time[event > 0]):
+        tied = (time == t) & (event > 0)
+        risk = np.exp(eta[time >= t]).sum()
+        d = np.exp(eta[tied])
+        ll += eta[tied].sum()
+        for l in range(tied.sum()):
+            ll -= np.log(risk - (l / tied.sum() if ties == "efron" else 0.0) * d.sum())
+    return ll
+
+def synthetic_problem(n, p, seed):
+    """Continuous event times (no ties), 60% events."""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, p))
+    time = rng.exponential(np.exp(-X @ rng.normal(0.0, 0.3, p)))
+    return X, time, (rng.random(n) < 0.6).astype(np.float64)
+
+def check_equivalence(training, history, rng):
+    X, time, event = training.X, training.time, training.event
+    for ties in ("efron", "breslow"):
+        problem = fit.CoxProblem(X, time, event, ties=ties)
+        for _ in range(3):
+            beta = rng.normal(0.0, 0.3, X.shape[1])
+            ll, grad, hess = problem.derivatives(beta)
+            assert np.isclose(ll, reference_loglik(X, time, event, beta, ties), rtol=1e-10)
+            assert np.isclose(problem.loglik(beta), ll, rtol=1e-12)
+            e = np.eye(X.shape[1])[:4] * 1e-6
+            num = [(problem.loglik(beta + h) - problem.loglik(beta - h)) / 2e-6 for h in e]
+            assert np.allclose(num, grad[:4], rtol=1e-5, atol=1e-5)
+            num = [(problem.derivatives(beta + h)[1] - problem.derivatives(beta - h)[1]) / 2e-6 for h in e]
+            assert np.allclose(num, hess[:4], rtol=1e-5, atol=1e-5)
+        beta, info = fit.newton(problem, penalizer=0.1)
+        _, grad, _ = problem.derivatives(beta, 0.1)
+        assert info["converged"] and np.abs(grad).max() < 1e-6, (ties, np.abs(grad).max())
+
+    half = np.full(len(time), 0.5)
+    try:
+        fit.CoxProblem(X, time, event, half, ties="efron")
+        raise AssertionError("Efron accepted fractional weights")
+    except ValueError:
+        pass
+    weighted = fit.CoxProblem(X, time, event, half, ties="breslow")
+    plain = fit.CoxProblem(X, time, event, ties="breslow")
+    beta = rng.normal(0.0, 0.3, X.shape[1])
+    assert np.isclose(weighted.loglik(beta), 0.5 * plain.loglik(beta) - 0.5 * np.log(0.5) * event.sum(), rtol=1e-12)
+    assert np.allclose(fit.newton(weighted, penalizer=0.05)[0], fit.newton(plain, penalizer=0.1)[0], atol=1e-9)
+
+    jittered = time + rng.random(len(time)) * 1e-3
+    b_efron, _ = fit.newton(fit.CoxProblem(X, jittered, event, ties="efron"))
+    b_breslow, _ = fit.newton(fit.CoxProblem(X, jittered, event, ties="breslow"))
+    assert np.allclose(b_efron, b_breslow, atol=1e-9)
+
+    bayes_rows, cox_rows = fit.training_frames(history)
+    counts = pd.Series(rng.integers(1, 4, training.n_projects),
+                       index=pd.concat([bayes_rows["Unique ID"], cox_rows["Unique ID"]]).unique())
+    replicated = fit.TrainingSet(bayes_rows.loc[bayes_rows.index.repeat(counts[bayes_rows["Unique ID"]])],
+                                 cox_rows.loc[cox_rows.index.repeat(counts[cox_rows["Unique ID"]])])
+    weights = counts.to_numpy()
+    assert replicated.bayes_features == training.bayes_features
+    assert np.allclose(fit.bayes_log_lr(training, weights), fit.bayes_log_lr(replicated), rtol=1e-12)
+    assert replicated.cox_covariates == training.cox_covariates
+    b_weighted, s_weighted, _ = fit.fit_cox(training, weights)
+    b_replicated, s_replicated, _ = fit.fit_cox(replicated)
+    assert np.allclose(b_weighted, b_replicated, atol=1e-9) and np.allclose(s_weighted, s_replicated, atol=1e-12)
+
+    lr = fit.bayes_table(training, fit.bayes_log_lr(training, alpha=0.5)).set_index("feature_name")["LR"]
+    prov = bayes_rows["province"].map(engine.norm_str)
+    known = prov != "Unknown"
+    k = pd.crosstab(prov[known], bayes_rows.loc[known, "built_3y"])
+    p = (k + 0.5) / (k.sum() + 0.5 * len(k))
+    assert np.allclose(lr[[f"province_{v}" for v in k.index]].to_numpy(), (p[1.0] / p[0.0]).to_numpy(), rtol=1e-12)
+
+    result = fit.fit(history)
+    with tempfile.TemporaryDirectory() as tmp:
+        bayes_path, cox_path, baseline_path = fit.write_coefficients(result, tmp)
+        assert pd.read_csv(bayes_path).columns.tolist() == ["feature_name", "LR"]
+        assert pd.read_csv(cox_path).columns.tolist() == ["covariate", "coef"]
+        maps = engine.load_coefficient_maps(bayes_path, cox_path)
+        model = RiskModel.from_csv(bayes_path, cox_path)
+    snap = backtest.build_snapshot(history, 2024)
+    scored = engine.score(snap.copy(), *maps)
+    pd.testing.assert_frame_equal(model.score(snap.copy()), scored, check_exact=True)
+    assert scored["p_bayes"].between(0, 1).all() and scored["p_cox"].between(0, 1).all()
+
+    serial, _ = fit.bootstrap(training, 8, workers=1, seed=7, chunk=3)
+    parallel, _ = fit.bootstrap(training, 8, workers=2, seed=7, chunk=5)
+    assert np.array_equal(serial, parallel)
+    return result
+
+def compare_shipped(result, history, maps):
+    """The refit vs the shipped coefficients: Cox coefficients on the shared
+    covariates and the 2024 power ranking."""
+    shipped = pd.read_csv(COX_CSV).set_index("covariate")["coef"]
+    ours = result["cox"].set_index("covariate")["coef"]
+    common = ours.index.intersection(shipped.index)
+    with tempfile.TemporaryDirectory() as tmp:
+        bayes_path, cox_path, _ = fit.write_coefficients(result, tmp)
+        refit = engine.load_coefficient_maps(bayes_path, cox_path)
+    snap = backtest.build_snapshot(history, 2024)
+    a = engine.score(snap.copy(), *maps)["power_ranking"]
+    b = engine.score(snap.copy(), *refit)["power_ranking"]
+    bayes_shipped = set(pd.read_csv(BAYES_CSV)["feature_name"])
+    bayes_shared = len(bayes_shipped & set(result["bayes"]["feature_name"]))
+    return (len(common), len(ours), shipped[common].rank().corr(ours[common].rank()),
+            bayes_shared, len(bayes_shipped), a.rank().corr(b.rank()))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--replicates", type=int, default=1000)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--rows", type=int, default=20_000, help="synthetic Cox problem size")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    history = backtest.load_history()
+    training = fit.TrainingSet(*fit.training_frames(history))
+    result = check_equivalence(training, history, rng)
+    print("equivalence: vectorized Efron/Breslow log L = loop reference; Newton gradient 0; "
+          "weights = replicated rows; Efron refuses fractional weights; written CSVs score through engine and RiskModel; "
+          "bootstrap independent of workers")
+
+    info = result["info"]
+    n_cov, n_all, cox_rank, n_bayes, n_shipped, rank = compare_shipped(result, history, load_maps())
+    s0 = result["baseline"].set_index("years")["s0"]
+    print(f"\nrefit on {info['bayes_rows']:,} snapshot rows / {info['cox_projects']:,} projects "
+          f"({info['cox_events']} constructions): S0(3y) {s0.loc[3.0]:.4f} vs shipped S0_3Y {engine.S0_3Y}")
+    print(f"  Cox: {n_cov}/{n_all} covariates in the shipped file, coefficient Spearman {cox_rank:.3f}")
+    print(f"  Bayes: {n_bayes}/{n_shipped} shipped features refit; 2024 power_ranking Spearman {rank:.3f}")
+
+    def best(fn, *a):
+        return min(timed(fn, *a)[1] for _ in range(args.repeat))
+
+    frames = fit.training_frames(history)
+    t_frames = best(fit.training_frames, history)
+    t_encode = best(fit.TrainingSet, *frames)
+    t_bayes = best(fit.bayes_log_lr, training)
+    t_cox = best(fit.fit_cox, training)
+    print(f"\none fit: snapshots {t_frames * 1e3:.1f} ms + encoding {t_encode * 1e3:.1f} ms, "
+          f"Bayes LRs {t_bayes * 1e3:.2f} ms, Cox {t_cox * 1e3:.1f} ms")
+
+    print("\nEfron partial likelihood, loop over event times (log L only) vs CoxProblem.derivatives (L, grad, H):")
+    for label, (X, time, event) in [("MPI first listings", (training.X, training.time, training.event)),
+                                    ("synthetic, no ties", synthetic_problem(args.rows, 20, seed=1))]:
+        beta = rng.normal(0.0, 0.3, X.shape[1])
+        problem = fit.CoxProblem(X, time, event)
+        t_loop = best(reference_loglik, X, time, event, beta, "efron")
+        t_vec = best(problem.derivatives, beta)
+        print(f"  {label} ({len(time):,} x {X.shape[1]}, {len(problem.times):,} event times): "
+              f"{t_loop * 1e3:9.2f} ms -> {t_vec * 1e3:7.2f} ms  ({t_loop / t_vec:.1f}x)")
+
+    beta_hat = fit.fit_cox(training)[0]
+    print(f"\nbootstrap, {args.replicates} replicates:")
+    for workers in sorted({1, args.workers}):
+        (draws, converged), t = timed(fit.bootstrap, training, args.replicates, workers, 0, beta=beta_hat)
+        print(f"  {workers} worker(s): {t:7.2f} s  ({t / args.replicates * 1e3:.1f} ms/replicate, "
+              f"{converged.sum()} converged)")
+
+if __name__ == "__main__":
+    main()
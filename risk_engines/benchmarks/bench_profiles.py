@@ -0,0 +1,114 @@
+"""Profile-deduplicated scoring on the 2017-2024 snapshots: row-wise and
+columnar `engine.score()` vs scoring each distinct covariate profile once
+(`risk_model.encode_profiles` + `RiskModel.score_profiles`) and broadcasting
+back, plus per-row vs per-profile scoring on a large synthetic frame.
+
+Checks first that:
+  - the profile path equals `engine.score()` bit for bit on every snapshot
+    and on a synthetic frame full of edge cases,
+  - every row's profile holds its own normalized labels.
+
+    python risk_engines/benchmarks/bench_profiles.py
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from common import BAYES_CSV, COX_CSV, engine, load_maps, synthetic_frame, timed
+import backtest
+from risk_model import BAYES_BLOCKS, RiskModel, encode_frame, encode_profiles
+
+SCORE_COLS = ["p_bayes", "risk_score", "p_cox", "blended_prob", "priority_index", "power_ranking"]
+
+def assert_same(a, b, label):
+    for c in SCORE_COLS:
+        assert a[c].to_numpy().tobytes() == b[c].to_numpy().tobytes(), (label, c)
+
+def score_by_profile(model, df):
+    """`engine.score()` with p_bayes / risk_score computed once per profile."""
+    df = engine.add_cost_quintile_bayes(df)
+    inverse, profiles = encode_profiles(encode_frame(df))
+    scores = model.score_profiles(profiles)
+    df["p_bayes"] = scores["p_bayes"].to_numpy()[inverse]
+    df["risk_score"] = scores["risk_score"].to_numpy()[inverse]
+    return engine.rescale_priority(engine.blend_scores(df))
+
+def profile_counts(snapshots):
+    rows, seen = [], []
+    for year, snap in snapshots.items():
+        _, profiles = encode_profiles(encode_frame(engine.add_cost_quintile_bayes(snap.copy())))
+        rows.append((year, len(snap), len(profiles)))
+        seen.append(profiles)
+    union = pd.concat(seen).drop_duplicates()
+    return pd.DataFrame(rows, columns=["year", "rows", "profiles"]), len(union)
+
+def check_equivalence(model, maps, snapshots):
+    frames = list(snapshots.items()) + [("synthetic", synthetic_frame(20_000, seed=5))]
+    for label, df in frames:
+        expected = engine.score(df.copy(), *maps)
+        assert_same(model.score(df.copy()), expected, label)
+        enc = encode_frame(engine.add_cost_quintile_bayes(df.copy()))
+        inverse, profiles = encode_profiles(enc)
+        assert not profiles.duplicated().any()
+        for b in BAYES_BLOCKS:
+            codes, labels = enc[b]
+            assert (profiles[b].to_numpy()[inverse] == np.asarray(labels, dtype=object)[codes]).all(), (label, b)
+        assert_same(score_by_profile(model, df.copy()), expected, label)
+
+def score_all(fn, snapshots):
+    return [fn(df.copy()) for df in snapshots.values()]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--synthetic-rows", type=int, default=1_000_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    maps = load_maps()
+    model = RiskModel.from_csv(BAYES_CSV, COX_CSV)
+    history = backtest.load_history()
+    snapshots = {y: backtest.build_snapshot(history, y) for y in sorted(history["status_year"].unique())}
+
+    check_equivalence(model, maps, snapshots)
+    print("equivalence: per-profile scoring = engine.score() on every snapshot and a synthetic frame")
+
+    counts, union = profile_counts(snapshots)
+    print("\nprofiles per snapshot:")
+    print(counts.assign(rows_per_profile=(counts["rows"] / counts["profiles"]).round(2)).to_string(index=False))
+    total = counts["rows"].sum()
+    print(f"all years: {total:,} rows, {union:,} distinct profiles ({total / union:.1f} rows per profile)")
+
+    def best(fn):
+        return min(timed(fn)[1] for _ in range(args.repeat))
+
+    t_row = timed(score_all, lambda df: engine.score(df, *maps, vectorized=False), snapshots)[1]
+    t_col = best(lambda: score_all(lambda df: engine.score(df, *maps), snapshots))
+    t_model = best(lambda: score_all(model.score, snapshots))
+    t_profile = best(lambda: score_all(lambda df: score_by_profile(model, df), snapshots))
+    print(f"\nscoring all {len(snapshots)} snapshots ({total:,} rows):")
+    for name, t in (("row-wise engine.score()", t_row), ("columnar engine.score()", t_col),
+                    ("RiskModel.score()", t_model), ("once per profile", t_profile)):
+        print(f"  {name:25s} {t * 1e3:8.1f} ms  ({t_row / t:5.1f}x vs row-wise, {t_col / t:4.2f}x vs columnar)")
+
+    df = engine.add_cost_quintile_bayes(synthetic_frame(args.synthetic_rows, seed=1))
+    enc = encode_frame(df)
+    _, profiles = encode_profiles(enc)
+
+    def per_row():
+        odds = np.exp(model.bayes_log_odds(df, enc))
+        return odds / (1.0 + odds), np.exp(model.cox_eta(df, enc))
+
+    def per_profile():
+        inverse, profiles = encode_profiles(enc)
+        s = model.score_profiles(profiles)
+        return s["p_bayes"].to_numpy()[inverse], s["risk_score"].to_numpy()[inverse]
+
+    t_rows, t_profiles = best(per_row), best(per_profile)
+    print(f"\nsynthetic {len(df):,} rows ({len(profiles):,} profiles), p_bayes + risk_score from the encoding:")
+    print(f"  per row:     {t_rows * 1e3:7.1f} ms")
+    print(f"  per profile: {t_profiles * 1e3:7.1f} ms  ({t_rows / t_profiles:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""RiskModel cold load (CSVs) vs warm load (.npz + manifest), plus scoring latency.
+
+Checks that `score` and `score_one` match `engine.score`, the latter on raw
+input records too (up to costs whose ties straddle a quintile edge).
+
+    python risk_engines/benchmarks/bench_risk_model.py
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from common import BAYES_CSV, COX_CSV, engine, load_input, load_maps, timed
+from risk_model import RiskModel
+
+SCORE_COLS = ["p_bayes", "risk_score", "p_cox", "blended_prob", "priority_index",
+              "urgency_scale_(0-1)", "power_ranking"]
+
+def best_of(fn, repeat=20):
+    best = np.inf
+    for _ in range(repeat):
+        _, t = timed(fn)
+        best = min(best, t)
+    return best
+
+def main():
+    df = load_input()
+    with tempfile.TemporaryDirectory() as tmp:
+        prefix = Path(tmp) / "model"
+        RiskModel.from_csv(BAYES_CSV, COX_CSV, reference=df).save(prefix)
+
+        t_cold = best_of(lambda: RiskModel.from_csv(BAYES_CSV, COX_CSV))
+        t_warm = best_of(lambda: RiskModel.load(prefix))
+        model = RiskModel.load(prefix)
+
+    expected = engine.score(df.copy(), *load_maps())
+    scored = model.score(df.copy())
+    for c in SCORE_COLS:
+        assert expected[c].to_numpy().tobytes() == scored[c].to_numpy().tobytes(), c
+
+    singles = [model.score_one(r) for r in expected.to_dict("records")]
+    for c in SCORE_COLS:
+        assert np.array_equal(expected[c].to_numpy(), [s[c] for s in singles]), c
+
+    # Raw input records carry no `_cost_quintile_bayes`; they may differ only
+    # on costs whose ties the engine split across a quintile edge.
+    records = df.to_dict("records")
+    singles = [model.score_one(r) for r in records]
+    split = expected.groupby("project_cost")["_cost_quintile_bayes"].nunique()
+    split = df["project_cost"].isin(split.index[split > 1])
+    differ = np.zeros(len(df), dtype=bool)
+    for c in SCORE_COLS:
+        differ |= expected[c].to_numpy() != np.array([s[c] for s in singles])
+    assert not (differ & ~split.to_numpy()).any()
+    print(f"score() and score_one() match engine.score() on {len(df)} rows; raw records differ on "
+          f"{differ.sum()} of {split.sum()} rows whose tied cost straddles a quintile edge")
+
+    t_frame = best_of(lambda: model.score(df.copy()))
+    n = 5_000
+    t0 = time.perf_counter()
+    for i in range(n):
+        model.score_one(records[i % len(records)])
+    t_one = (time.perf_counter() - t0) / n
+
+    print(f"cold load (read CSVs + compile): {t_cold * 1e3:8.2f} ms")
+    print(f"warm load (.npz + manifest):     {t_warm * 1e3:8.2f} ms")
+    print(f"score(df) {len(df)} rows:          {t_frame * 1e3:8.2f} ms")
+    print(f"score_one(record):               {t_one * 1e6:8.1f} us")
+
+if __name__ == "__main__":
+    main()
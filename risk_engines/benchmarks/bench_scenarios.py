@@ -0,0 +1,102 @@
+"""Scenario sweep: re-running the engine once per scenario (before) vs
+`scenarios.write_sweep` with one shared encoding (after), by worker count.
+
+Checks first that the default scenario equals `engine.score()` and that every
+scenario of a random grid (including LR / hazard-ratio perturbations) equals
+a full re-score with the perturbed coefficients and overridden parameters.
+
+    python risk_engines/benchmarks/bench_scenarios.py --rows 100000
+"""
+
+import argparse
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from common import engine, load_input, load_maps, synthetic_frame, timed
+import scenarios
+
+def reference(df, bayes_lr_map, cox_coef_map, spec):
+    """Full re-score of `df` under scenario `spec`, engine code path."""
+    spec = {**scenarios.DEFAULTS, **spec}
+    bayes = scenarios._apply_factors(bayes_lr_map, spec["lr_factors"], log_scale=False)
+    cox = scenarios._apply_factors(cox_coef_map, spec["hr_factors"], log_scale=True)
+    out = engine.score_columnar(engine.add_cost_quintile_bayes(df.copy()), bayes, cox)
+    out["years_remaining"] = (spec["horizon"] - out["reporting_years"]).clip(lower=spec["clip_floor"])
+    out["p_cox"] = 1 - (spec["s0_3y"] ** out["risk_score"])
+    w = spec["bayes_weight"]
+    out["blended_prob"] = w * out["p_bayes"] + (1 - w) * out["p_cox"]
+    out["priority_index"] = out["blended_prob"] / out["years_remaining"]
+    pi_min, pi_max = out["priority_index"].min(), out["priority_index"].max()
+    out["urgency_scale_(0-1)"] = (out["priority_index"] - pi_min) / (pi_max - pi_min) if pi_max > pi_min else 0.0
+    v = spec["power_weight"]
+    out["power_ranking"] = v * out["blended_prob"] + (1 - v) * out["urgency_scale_(0-1)"]
+    return out
+
+def grid():
+    return scenarios.scenario_grid(
+        s0_3y=[0.93, engine.S0_3Y, 0.97], bayes_weight=[0.5, 0.6, 0.7], horizon=[4.0, 5.0, 6.0],
+        clip_floor=[0.25, 0.5], lr_factors=[None, {"sector_*": 1.1}],
+        hr_factors=[None, {"province_AB": 0.8}],
+    )
+
+def check_equivalence(df, maps, n_cases=24, seed=0):
+    default = scenarios.sweep(df, *maps, [{}])
+    expected = engine.score(df.copy(), *maps)
+    for c in scenarios.SCORE_COLS:
+        assert default[c].to_numpy().tobytes() == expected[c].to_numpy().tobytes(), c
+
+    rng = np.random.default_rng(seed)
+    specs = [dict(s, power_weight=float(rng.choice([0.6, 0.4]))) for s in rng.choice(grid(), n_cases)]
+    long = scenarios.sweep(df, *maps, specs, workers=2, id_col="missing")
+    for i, spec in enumerate(specs):
+        got = long[long["scenario"] == i].reset_index(drop=True)
+        assert np.array_equal(got["row"], np.arange(len(df)))
+        want = reference(df, *maps, spec)
+        for c in scenarios.SCORE_COLS:
+            assert np.array_equal(got[c].to_numpy(), want[c].to_numpy(dtype=float), equal_nan=True), (spec, c)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "sweep.parquet"
+        scenarios.write_sweep(path, df, *maps, specs, id_col="missing")
+        written = pd.read_parquet(path)
+        for k in ("lr_factors", "hr_factors"):
+            assert written.pop(k).astype(str).equals(long[k].astype(str))
+        pd.testing.assert_frame_equal(written, long.drop(columns=["lr_factors", "hr_factors"]), check_exact=True)
+    return n_cases
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--reference-scenarios", type=int, default=6, help="scenarios timed for 'before' (extrapolated)")
+    ap.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, os.cpu_count() or 1}))
+    args = ap.parse_args()
+
+    maps = load_maps()
+    for df in (load_input(), synthetic_frame(5_000, seed=3)):
+        print(f"equivalence: {check_equivalence(df, maps)} scenarios on {len(df):,} rows match a full re-score (and the written Parquet)")
+
+    df = synthetic_frame(args.rows, seed=1)
+    specs = grid()
+    _, t_before = timed(lambda: [reference(df, *maps, s) for s in specs[:args.reference_scenarios]])
+    t_before *= len(specs) / args.reference_scenarios
+    print(f"\n{len(specs)} scenarios x {len(df):,} projects, {os.cpu_count()} CPU(s)")
+    print(f"  {'mode':<26} {'time (s)':>9} {'per scenario (ms)':>18}")
+    print(f"  {'re-score per scenario':<26} {t_before:>9.1f} {t_before / len(specs) * 1e3:>18.0f}  (extrapolated)")
+    for workers in args.workers:
+        _, t = timed(lambda: [s for *_, s in scenarios.iter_scores(df, *maps, specs, workers)])
+        print(f"  {f'sweep, {workers} worker(s)':<26} {t:>9.1f} {t / len(specs) * 1e3:>18.1f}  ({t_before / t:.0f}x)")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "sweep.parquet"
+        for workers in args.workers:
+            _, t = timed(scenarios.write_sweep, path, df, *maps, specs, workers)
+            print(f"  {f'+ Parquet, {workers} worker(s)':<26} {t:>9.1f} {t / len(specs) * 1e3:>18.1f}")
+        meta = pq.ParquetFile(path).metadata
+        print(f"  output: {meta.num_rows:,} rows, {meta.num_row_groups} row groups, {path.stat().st_size / 1e6:.0f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Peak memory and wall time: in-memory scoring vs streaming (chunked) scoring.
+
+Generates a synthetic CSV, scores it both ways in separate processes (so each
+peak RSS is measured in isolation) and checks the scored outputs match.
+
+    python risk_engines/benchmarks/bench_streaming.py --rows 2000000 --chunksize 100000
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from common import BAYES_CSV, COX_CSV, synthetic_frame
+
+SCORE_COLS = ["_cost_quintile_bayes", "p_bayes", "risk_score", "p_cox", "blended_prob",
+              "priority_index", "urgency_scale_(0-1)", "power_ranking"]
+
+def peak_rss_mb():
+    # VmHWM resets on exec, unlike ru_maxrss which is inherited from the parent
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith("VmHWM:"):
+            return int(line.split()[1]) / 1024
+    return float("nan")
+
+def worker(mode, src, dst, chunksize):
+    from risk_model import RiskModel
+    import streaming
+
+    model = RiskModel.from_csv(BAYES_CSV, COX_CSV)
+    t0 = time.perf_counter()
+    if mode == "memory":
+        model.score(pd.read_csv(src)).to_csv(dst, index=False)
+    else:
+        streaming.score_stream(src, [streaming.CsvChunkWriter(dst)], model, chunksize)
+    elapsed = time.perf_counter() - t0
+    peak_mb = peak_rss_mb()
+    print(f"{elapsed:.3f} {peak_mb:.1f}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=2_000_000)
+    ap.add_argument("--chunksize", type=int, default=100_000)
+    ap.add_argument("--worker", nargs=3, metavar=("MODE", "SRC", "DST"))
+    args = ap.parse_args()
+
+    if args.worker:
+        worker(*args.worker, args.chunksize)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / "input.csv"
+        df = synthetic_frame(args.rows, seed=3)
+        df["start_year"] = pd.to_numeric(df["start_year"], errors="coerce")
+        df.to_csv(src, index=False)
+        del df
+
+        results = {}
+        for mode in ("memory", "stream"):
+            dst = Path(tmp) / f"{mode}.csv"
+            out = subprocess.run([sys.executable, __file__, "--chunksize", str(args.chunksize),
+                                  "--worker", mode, str(src), str(dst)],
+                                 check=True, capture_output=True, text=True).stdout.split()
+            results[mode] = (float(out[0]), float(out[1]), dst)
+
+        a = pd.read_csv(results["memory"][2], usecols=SCORE_COLS)
+        b = pd.read_csv(results["stream"][2], usecols=SCORE_COLS)
+        pd.testing.assert_frame_equal(a, b, check_exact=True)
+        same_bytes = results["memory"][2].read_bytes() == results["stream"][2].read_bytes()
+
+    print(f"rows={args.rows:,} chunksize={args.chunksize:,}")
+    print(f"{'mode':<8} {'time (s)':>9} {'peak RSS (MB)':>14}")
+    for mode, (t, mb, _) in results.items():
+        print(f"{mode:<8} {t:>9.2f} {mb:>14.1f}")
+    print(f"scores identical: yes; output files byte-identical: {'yes' if same_bytes else 'no'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Multi-horizon survival curves: a dense float64 projects x months matrix
+(before) vs the chunked float32 memory-mapped engine (after, and its cached
+rerun), time and peak memory at --rows projects x --months months.
+
+Checks first that with the engine's baseline the 3-year columns equal
+`engine.score()`, that the curves and expected years match a dense float64
+computation, that the Breslow estimate matches a brute-force sum, and that the
+cache returns the same curves.
+
+    python risk_engines/benchmarks/bench_survival.py --rows 1000000 --months 120
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from common import engine, load_input, load_maps, synthetic_frame
+from risk_model import RiskModel
+import survival
+
+MODES = ["dense", "chunked", "cached"]
+
+def _status_kb(field):
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith(field + ":"):
+            return int(line.split()[1])
+    return 0
+
+def dense(df, model, baseline, months):
+    """The whole matrix in float64 at once, integrals by np.trapezoid."""
+    df = engine.add_cost_quintile_bayes(df.copy())
+    risk = np.exp(model.cox_eta(df))
+    years = survival.month_grid(months)
+    incidence = 1 - baseline.at(years)[None, :] ** risk[:, None]
+    grid = np.concatenate([[0.0], years])
+    full = np.hstack([np.zeros((len(df), 1)), incidence])
+    area = np.trapezoid(full, grid, axis=1)
+    return incidence, years[-1] - area, (years[-1] * incidence[:, -1] - area) / incidence[:, -1]
+
+def check_equivalence(maps):
+    model = RiskModel.from_maps(*maps)
+    for df in (load_input(), synthetic_frame(5_000, seed=2)):
+        expected = engine.score(df.copy(), *maps)
+        curves = survival.survival_curves(df, model)
+        assert curves.summary["p_cox_3y"].to_numpy().tobytes() == expected["p_cox"].to_numpy().tobytes()
+        assert curves.summary["blended_prob_3y"].to_numpy().tobytes() == expected["blended_prob"].to_numpy().tobytes()
+        assert np.allclose(curves.at(3.0)[:, 0], expected["p_cox"], rtol=1e-6, atol=1e-7)
+
+        baseline = survival.BaselineSurvival([1, 2, 4, 7], [0.9, 0.8, 0.7, 0.5])
+        curves = survival.survival_curves(df, model, baseline, chunk_rows=777)
+        incidence, restricted, if_started = dense(df, model, baseline, 120)
+        assert np.allclose(curves.incidence, incidence, rtol=1e-6, atol=1e-7)
+        assert np.allclose(curves.summary["expected_years_restricted"], restricted, rtol=1e-9)
+        assert np.allclose(curves.summary["expected_years_if_started"], if_started, rtol=1e-9)
+        with tempfile.TemporaryDirectory() as tmp:
+            first = survival.survival_curves(df, model, baseline, cache_dir=tmp)
+            again = survival.survival_curves(df, model, baseline, cache_dir=tmp)
+            assert isinstance(again.incidence, np.memmap) and len(list(Path(tmp).glob("*.npy"))) == 1
+            assert np.array_equal(first.incidence, curves.incidence) and np.array_equal(again.incidence, curves.incidence)
+            assert again.summary.equals(curves.summary)
+    assert survival.BaselineSurvival.engine_default().at(3.0)[0] == engine.S0_3Y
+
+    rng = np.random.default_rng(0)
+    time_, event, risk = rng.integers(0, 8, 300).astype(float), rng.random(300) < 0.3, rng.lognormal(0, 0.5, 300)
+    est = survival.BaselineSurvival.breslow(time_, event, risk)
+    hazard = 0.0
+    for t in np.unique(time_[event & (time_ > 0)]):
+        hazard += event[time_ == t].sum() / risk[time_ >= t].sum()
+        assert np.isclose(est.at(t)[0], np.exp(-hazard))
+
+def run_mode(mode, n, months):
+    maps = load_maps()
+    model = RiskModel.from_maps(*maps)
+    df = synthetic_frame(n, seed=1)
+    baseline = survival.BaselineSurvival.engine_default()
+    with tempfile.TemporaryDirectory() as tmp:
+        if mode == "cached":
+            survival.survival_curves(df, model, baseline, months, cache_dir=tmp)
+        rss = _status_kb("VmRSS")
+        Path("/proc/self/clear_refs").write_text("5")      # reset the peak RSS to the current RSS
+        t0 = time.perf_counter()
+        if mode == "dense":
+            out = dense(df, model, baseline, months)
+            size = out[0].nbytes
+        else:
+            curves = survival.survival_curves(df, model, baseline, months, cache_dir=tmp)
+            float(curves.incidence[n // 2].sum())          # one project's curve, off the mapped file
+            size = curves.incidence.nbytes
+        seconds = time.perf_counter() - t0
+        return {"seconds": seconds, "peak_mb": (_status_kb("VmHWM") - rss) / 1024, "matrix_mb": size / 2**20}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--months", type=int, default=120)
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        try:
+            print(json.dumps(run_mode(args.child, args.rows, args.months)))
+        except MemoryError:
+            print(json.dumps({"error": "MemoryError"}))
+        return
+
+    check_equivalence(load_maps())
+    print("equivalence: 3-year columns = engine.score(); curves / expected years = dense float64; "
+          "Breslow = brute force; cache hit = fresh curves")
+    baseline = survival.BaselineSurvival.from_history(*load_maps(), cache_dir=None)
+    print("Breslow S0(t) on the MPI history, t = 1..7 years: " + " ".join(f"{s:.3f}" for s in baseline.survival)
+          + f"  (engine S0_3Y = {engine.S0_3Y})")
+
+    print(f"\n{args.rows:,} projects x {args.months} months")
+    print(f"  {'mode':<10} {'time (s)':>9} {'matrix (MB)':>12} {'peak RSS (MB)':>14}")
+    for mode in MODES:
+        out = subprocess.run([sys.executable, __file__, "--child", mode, "--rows", str(args.rows),
+                              "--months", str(args.months)], capture_output=True, text=True)
+        lines = out.stdout.strip().splitlines()
+        result = json.loads(lines[-1]) if lines else {"error": f"exit {out.returncode}: {out.stderr[-300:]}"}
+        if "error" in result:
+            print(f"  {mode:<10} failed: {result['error']}")
+            continue
+        print(f"  {mode:<10} {result['seconds']:>9.2f} {result['matrix_mb']:>12.0f} {result['peak_mb']:>14.0f}")
+
+if __name__ == "__main__":
+    main()
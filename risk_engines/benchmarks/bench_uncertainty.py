@@ -0,0 +1,123 @@
+"""Monte Carlo uncertainty bands: a naive loop of `RiskModel.score` per draw
+(before) vs the chunked draws x projects engine (after), across worker counts.
+
+Checks first that:
+  - with no uncertainty, every percentile band equals `engine.score()`,
+  - a draw computed by the engine equals `score()` under that draw's parameters,
+  - the same seed gives identical output for any worker count / chunk size.
+
+    python risk_engines/benchmarks/bench_uncertainty.py --draws 10000 --projects 5000
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from common import BAYES_CSV, COX_CSV, engine, load_maps, synthetic_frame, timed
+from risk_model import BAYES_BLOCKS, COX_BLOCKS, RiskModel
+import uncertainty
+
+def model_for_draw(model, params, d):
+    """A copy of `model` with draw `d`'s coefficients."""
+    m = RiskModel.__new__(RiskModel)
+    m.__dict__.update(model.__dict__)
+    m.bayes_table, m.cox_table = {}, {}
+    lo = 0
+    for b in BAYES_BLOCKS:
+        hi = lo + len(model.bayes_table[b])
+        m.bayes_table[b] = params["bayes"][d, lo:hi]
+        lo = hi
+    m.prov_sec_table = params["bayes"][d, lo:]
+    lo = 0
+    for b in COX_BLOCKS:
+        hi = lo + len(model.cox_table[b])
+        m.cox_table[b] = params["cox"][d, lo:hi]
+        lo = hi
+    m.coef_cleantech, m.coef_cost_quintile = params["cox"][d, lo:lo + 2]
+    return m
+
+def naive_draw(model, params, d, df):
+    """Score `df` under draw `d` with the point-estimate code path."""
+    m = model_for_draw(model, params, d)
+    df = engine.add_cost_quintile_bayes(df.copy())
+    odds = np.exp(m.bayes_log_odds(df))
+    p_bayes = odds / (1.0 + odds)
+    p_cox = 1 - params["s0"][d] ** np.exp(m.cox_eta(df))
+    w = params["weight"][d]
+    blended = w * p_bayes + (1 - w) * p_cox
+    out = engine.rescale_priority(pd.DataFrame({
+        "blended_prob": blended,
+        "priority_index": blended / (5.0 - df["reporting_years"]).clip(lower=0.25).to_numpy(dtype=float),
+    }))
+    out["p_bayes"], out["p_cox"] = p_bayes, p_cox
+    return out
+
+def check_equivalence(model, maps, df):
+    fixed = uncertainty.sample_parameters(model, *maps, n_draws=7, s0_log_sd=0, weight_concentration=None)
+    projects, portfolio = uncertainty.simulate(df, model, fixed, chunk_projects=333)
+    expected = engine.score(df.copy(), *maps)
+    for m in uncertainty.METRICS:
+        for q in uncertainty.PERCENTILES:
+            assert np.array_equal(projects[f"{m}_p{q:02g}"].to_numpy(), expected[m].to_numpy(), equal_nan=True), m
+    assert np.allclose(portfolio["expected_built"], expected["blended_prob"].sum())
+
+    params = uncertainty.sample_parameters(model, *maps, n_draws=64, seed=3,
+                                           default_bayes_se=0.3, default_cox_se=0.2)
+    projects, portfolio = uncertainty.simulate(df, model, params, percentiles=[0, 100], chunk_projects=500)
+    draws = [naive_draw(model, params, d, df) for d in range(64)]
+    for m in uncertainty.METRICS:
+        stacked = np.vstack([o[m].to_numpy() for o in draws])
+        assert np.allclose(projects[f"{m}_p00"], stacked.min(axis=0), rtol=1e-12, atol=0, equal_nan=True), m
+        assert np.allclose(projects[f"{m}_p100"], stacked.max(axis=0), rtol=1e-12, atol=0, equal_nan=True), m
+    assert np.allclose(portfolio["expected_built"], [o["blended_prob"].sum() for o in draws])
+
+    reference = None
+    for workers, chunk in ((1, None), (1, 97), (2, 250), (3, 1000)):
+        out = uncertainty.simulate(df, model, params, workers=workers, chunk_projects=chunk)
+        if reference is None:
+            reference = out
+        for a, b in zip(out, reference):
+            pd.testing.assert_frame_equal(a, b, check_exact=True)
+    again = uncertainty.sample_parameters(model, *maps, n_draws=64, seed=3,
+                                          default_bayes_se=0.3, default_cox_se=0.2)
+    assert all(np.array_equal(params[k], again[k]) for k in params)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--draws", type=int, default=10_000)
+    ap.add_argument("--projects", type=int, default=5_000)
+    ap.add_argument("--naive-draws", type=int, default=100, help="draws timed for the naive loop (extrapolated)")
+    ap.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, os.cpu_count() or 1}))
+    args = ap.parse_args()
+
+    maps = load_maps()
+    model = RiskModel.from_csv(BAYES_CSV, COX_CSV)
+    bayes_se, cox_se = uncertainty.load_standard_errors(BAYES_CSV, COX_CSV)
+    check_equivalence(model, maps, synthetic_frame(2_000, seed=7))
+    print("equivalence: fixed parameters = engine.score(), per-draw scores = score() under the draw, "
+          "identical across workers / chunk sizes")
+
+    df = synthetic_frame(args.projects, seed=1)
+    params, t_sample = timed(uncertainty.sample_parameters, model, *maps, args.draws, 0, bayes_se, cox_se,
+                             0.2, 0.1)
+    print(f"\n{args.draws:,} draws x {args.projects:,} projects (SE columns in the CSVs: "
+          f"{len(bayes_se)} Bayes, {len(cox_se)} Cox; defaults 0.2 / 0.1), {os.cpu_count()} CPU(s)")
+    print(f"  sampling parameters: {t_sample:.2f} s")
+
+    _, t_naive = timed(lambda: [naive_draw(model, params, d, df) for d in range(args.naive_draws)])
+    t_naive *= args.draws / args.naive_draws
+    print(f"  naive score() per draw: {t_naive:8.1f} s (extrapolated from {args.naive_draws} draws)")
+    reference = None
+    for workers in args.workers:
+        out, t = timed(uncertainty.simulate, df, model, params, workers=workers)
+        if reference is None:
+            reference = out
+        assert all(a.equals(b) for a, b in zip(out, reference))
+        print(f"  chunked, {workers} worker(s):  {t:8.1f} s  ({t_naive / t:.0f}x)")
+    print("\nportfolio bands:")
+    print(uncertainty.portfolio_bands(reference[1]).to_string(float_format=lambda v: f"{v:,.1f}"))
+
+if __name__ == "__main__":
+    main()
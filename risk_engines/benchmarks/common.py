@@ -0,0 +1,58 @@
+"""Shared helpers for the risk engine benchmarks.
+
+Run the scripts from the repository root, e.g.
+    python risk_engines/benchmarks/bench_columnar_scoring.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ENGINE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ENGINE_DIR))
+
+import mpi_risk_engine_v02 as engine  # noqa: E402
+
+BAYES_CSV = ENGINE_DIR / "bayes_lr_regenerated_coefficients.csv"
+COX_CSV = ENGINE_DIR / "cox_coefficients_with_references.csv"
+INPUT_XLSX = ENGINE_DIR / "mpi_2024_input.xlsx"
+
+def load_maps():
+    return engine.load_coefficient_maps(BAYES_CSV, COX_CSV)
+
+def load_input():
+    return pd.read_excel(INPUT_XLSX)
+
+def synthetic_frame(n, seed=0, base=None):
+    """Resample the 2024 input to `n` rows and inject the edge cases the
+    scorer has to handle (unknown categories, blanks, NaNs, out-of-range years)."""
+    base = load_input() if base is None else base
+    rng = np.random.default_rng(seed)
+    df = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+
+    df["project_cost"] = df["project_cost"].to_numpy() * rng.lognormal(0.0, 0.5, n)
+    df["cost_percentile"] = rng.uniform(-0.05, 1.05, n)
+    df["start_year"] = rng.integers(2015, 2027, n)
+    df["reporting_years"] = rng.integers(0, 9, n)
+
+    def sprinkle(col, values, frac=0.02):
+        hit = rng.random(n) < frac
+        s = df[col].astype(object)
+        s[hit] = rng.choice(np.array(values, dtype=object), hit.sum())
+        df[col] = s
+
+    sprinkle("province", ["XX", " ON ", "", None, np.nan])
+    sprinkle("sector", ["Space", "", None])
+    sprinkle("group", ["Unlisted", " ", None])
+    sprinkle("cleantech", ["yes", "Maybe", None])
+    sprinkle("start_year", [None, "2019", 2021.0])
+    sprinkle("cost_percentile", [None])
+    return df
+
+def timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - t0
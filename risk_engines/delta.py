@@ -0,0 +1,248 @@
+"""Incremental (delta) re-scoring when a new MPI snapshot arrives.
+
+A full `run()` rescores every project, but between releases most rows (keyed
+by `Unique ID`) keep their scoring inputs. `delta_score()` diffs the new input
+against the state saved with the last scored output and recomputes `p_bayes`
+and `risk_score` only for:
+
+- added IDs,
+- rows whose scoring content changed: a per-row content hash of the
+  normalized cleantech, group, province, sector, start bin and Cox cost
+  quintile (the inputs of both models apart from the dataset-relative Bayes
+  cost quintile),
+- rows whose `_cost_quintile_bayes` moved: the qcut is over the whole dataset,
+  so adding, removing or repricing any project can shift unchanged ones
+  across a bin edge. The quintiles are recomputed for every row each time.
+
+The other dataset-relative step, the `priority_index` min/max rescale into
+`urgency_scale_(0-1)` and `power_ranking`, is a vectorized pass over every
+row. The output equals `engine.score()` on the new input. The report lists each
+added, removed or changed row and each row whose scores moved, with the
+reasons and the columns that moved.
+
+The state (a Parquet file, `<output>.state.parquet` in the CLI) keeps, per ID,
+the content hash, cost quintile, reporting years and scores, plus the
+coefficient fingerprint. Without a state, or with other coefficients, every row
+is rescored.
+
+    python risk_engines/delta.py mpi_2025_input.xlsx --state mpi_scored.state.parquet \\
+        --out-parquet mpi_2025_scored.parquet --report mpi_2025_delta_report.csv
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import mpi_risk_engine_v02 as engine
+from risk_model import RiskModel, encode_frame
+
+ID = "Unique ID"
+STATE_VERSION = 1
+SCORE_COLUMNS = ["p_bayes", "risk_score", "years_remaining", "p_cox", "blended_prob", "priority_index",
+                 "urgency_scale_(0-1)", "power_ranking"]
+STATE_COLUMNS = ["_cost_quintile_bayes", "reporting_years"] + SCORE_COLUMNS
+REASONS = ["inputs", "cost_quintile", "reporting_years", "rescale"]
+
+# (label, input column, normalizer) of the per-row scoring content
+_CONTENT = [
+    ("cleantech", "cleantech", engine.norm_str),
+    ("group", "group", engine.norm_str),
+    ("province", "province", engine.norm_str),
+    ("sector", "sector", engine.norm_str),
+    ("start_bin", "start_year", engine.start_bin_from_year),
+]
+_MIX = np.uint64(0x100000001B3)
+
+# ============================================================
+# Dataset-relative cost quintiles and per-row content hash
+# ============================================================
+def cost_quintiles(cost):
+    """`_cost_quintile_bayes` for `cost`, equal to `engine.add_cost_quintile_bayes`
+    (qcut of first-occurrence ranks into quintiles), as an Int64 array."""
+    cost = np.asarray(cost, dtype=np.float64)
+    valid = ~np.isnan(cost)
+    m = int(valid.sum())
+    if m < 2:
+        # Degenerate bins: leave the behaviour (and errors) to pandas
+        return engine.add_cost_quintile_bayes(pd.DataFrame({"project_cost": cost}))["_cost_quintile_bayes"].array
+    ranks = np.empty(m)
+    ranks[np.argsort(cost[valid], kind="stable")] = np.arange(1, m + 1)
+    edges = pd.Series(np.arange(1, m + 1, dtype=np.float64)).quantile(np.linspace(0, 1, 6)).to_numpy()
+    ids = np.searchsorted(edges, ranks, side="left")
+    ids[ranks == edges[0]] = 1
+    values = np.zeros(len(cost), dtype=np.int64)
+    values[valid] = ids - 1
+    return pd.arrays.IntegerArray(values, ~valid)
+
+def content_hash(df):
+    """Per-row uint64 hash of the normalized scoring content of `df`."""
+    p = engine._column(df, "cost_percentile").astype(float).to_numpy()
+    cq = np.floor(np.minimum(0.9999, np.maximum(0.0, p)) * 5)
+    h = pd.util.hash_array(np.where(np.isnan(cq), -1, cq).astype(np.int64))
+    for label, col, fn in _CONTENT:
+        codes, labels = engine.encode_column(df, col, fn)
+        h = h * _MIX + pd.util.hash_array(np.array([f"{label}={l}" for l in labels], dtype=object))[codes]
+    return h
+
+def _differs(a, b):
+    a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    return (a != b) & ~(np.isnan(a) & np.isnan(b))
+
+# ============================================================
+# State
+# ============================================================
+def make_state(scored, content, model):
+    state = pd.DataFrame({ID: scored[ID].to_numpy(), "content_hash": content,
+                          "_cost_quintile_bayes": scored["_cost_quintile_bayes"].to_numpy(np.float64, na_value=np.nan),
+                          "reporting_years": scored["reporting_years"].to_numpy(dtype=np.float64)})
+    for c in SCORE_COLUMNS:
+        state[c] = scored[c].to_numpy(dtype=np.float64)
+    state.attrs["delta"] = {"version": STATE_VERSION, "fingerprint": model.fingerprint()}
+    return state
+
+def save_state(state, path):
+    table = pa.Table.from_pandas(state, preserve_index=False)
+    meta = {**(table.schema.metadata or {}), b"mpi_delta": json.dumps(state.attrs["delta"]).encode()}
+    tmp = Path(path).with_suffix(".tmp")
+    pq.write_table(table.replace_schema_metadata(meta), tmp)
+    tmp.replace(path)
+
+def load_state(path):
+    if path is None or not Path(path).exists():
+        return None
+    table = pq.read_table(path)
+    state = table.to_pandas()
+    state.attrs["delta"] = json.loads(table.schema.metadata.get(b"mpi_delta", b"{}"))
+    return state
+
+# ============================================================
+# Delta scoring
+# ============================================================
+def delta_score(df, model, state=None):
+    """Score `df` (in place, like `engine.score`) reusing `state`.
+
+    Returns (scored, report, new_state): `scored` equals `engine.score(df, ...)`
+    with the model's coefficients; `report` has one row per added, removed or
+    changed ID and per row whose scores moved."""
+    ids = df[ID]
+    if ids.isna().any() or not ids.is_unique:
+        raise ValueError(f"delta scoring needs a unique, non-missing '{ID}' column")
+    meta = {} if state is None else state.attrs.get("delta", {})
+    if meta.get("version") != STATE_VERSION or meta.get("fingerprint") != model.fingerprint():
+        state = pd.DataFrame({ID: pd.Series(dtype=ids.dtype), "content_hash": pd.Series(dtype=np.uint64),
+                              **{c: pd.Series(dtype=np.float64) for c in STATE_COLUMNS}})
+
+    n = len(df)
+    df["_cost_quintile_bayes"] = cost_quintiles(df["project_cost"].astype(float))
+    content = content_hash(df)
+    pos = pd.Index(state[ID]).get_indexer(ids) if len(state) else np.full(n, -1)
+    known = np.flatnonzero(pos >= 0)
+
+    def old(col):
+        return state[col].to_numpy()[pos[known]]
+
+    flags = {r: np.zeros(n, dtype=bool) for r in REASONS}
+    flags["inputs"][known] = content[known] != old("content_hash")
+    quintile = df["_cost_quintile_bayes"].to_numpy(np.float64, na_value=np.nan)
+    flags["cost_quintile"][known] = _differs(quintile[known], old("_cost_quintile_bayes"))
+    flags["reporting_years"][known] = _differs(df["reporting_years"].to_numpy(np.float64)[known],
+                                               old("reporting_years"))
+    rescore = np.ones(n, dtype=bool)
+    rescore[known] = flags["inputs"][known] | flags["cost_quintile"][known]
+
+    p_bayes = np.empty(n)
+    risk = np.empty(n)
+    reuse = np.flatnonzero(~rescore)
+    p_bayes[reuse] = state["p_bayes"].to_numpy()[pos[reuse]]
+    risk[reuse] = state["risk_score"].to_numpy()[pos[reuse]]
+    if rescore.any():
+        enc = encode_frame(df.iloc[np.flatnonzero(rescore)])
+        odds = np.exp(model.bayes_log_odds(None, enc))
+        p_bayes[rescore] = odds / (1.0 + odds)
+        risk[rescore] = np.exp(model.cox_eta(None, enc))
+    df["p_bayes"] = p_bayes
+    df["risk_score"] = risk
+    scored = engine.rescale_priority(engine.blend_scores(df))
+
+    if len(known):
+        pi_old = state["priority_index"]
+        flags["rescale"][known] = _differs([pi_old.min(), pi_old.max()],
+                                           [scored["priority_index"].min(), scored["priority_index"].max()]).any()
+    report = _report(scored, state, pos, known, flags, rescore)
+    return scored, report, make_state(scored, content, model)
+
+def _report(scored, state, pos, known, flags, rescore):
+    n = len(scored)
+    moved = np.zeros(n, dtype=np.int64)
+    for bit, c in enumerate(SCORE_COLUMNS):
+        d = np.zeros(n, dtype=bool)
+        d[known] = _differs(scored[c].to_numpy(np.float64)[known], state[c].to_numpy()[pos[known]])
+        moved |= d.astype(np.int64) << bit
+    added = pos < 0
+    changed = flags["inputs"] | flags["cost_quintile"] | flags["reporting_years"]
+    rows = np.flatnonzero(added | changed | (moved != 0))
+
+    masks, inverse = np.unique(moved[rows], return_inverse=True)
+    names = np.array([";".join(c for bit, c in enumerate(SCORE_COLUMNS) if m >> bit & 1) for m in masks],
+                     dtype=object)
+    report = pd.DataFrame({
+        ID: scored[ID].to_numpy()[rows],
+        "change": np.where(added[rows], "added", np.where(changed[rows], "changed", "rescaled")),
+        "rescored": rescore[rows],
+        **{r: flags[r][rows] for r in REASONS},
+        "moved": names[inverse] if len(rows) else np.array([], dtype=object),
+    })
+    gone = state[ID].to_numpy()[pd.Index(scored[ID]).get_indexer(state[ID]) < 0] if len(state) else []
+    if len(gone):
+        removed = pd.DataFrame({ID: gone, "change": "removed", "rescored": False, "moved": ""})
+        for r in REASONS:
+            removed[r] = False
+        report = pd.concat([report, removed[report.columns]], ignore_index=True)
+    return report
+
+def summarize(report, rows):
+    """Counts behind a delta report (`rows`: size of the new input)."""
+    change = report["change"].value_counts()
+    out = {"rows": rows, **{k: int(change.get(k, 0)) for k in ("added", "changed", "rescaled", "removed")},
+           "rescored": int(report["rescored"].sum())}
+    out.update({f"reason_{r}": int(report[r].sum()) for r in REASONS})
+    out["scores_moved"] = int((report["moved"] != "").sum())
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="Delta re-scoring of a new MPI snapshot")
+    ap.add_argument("input", help=".xlsx, .csv or .parquet input (as for run())")
+    ap.add_argument("--state", help="state of the last scored output (default: next to --out-parquet)")
+    ap.add_argument("--bayes", default=engine.BAYES_COEFF_PATH)
+    ap.add_argument("--cox", default=engine.COX_COEFF_PATH)
+    ap.add_argument("--model", help="saved RiskModel prefix (overrides --bayes/--cox)")
+    ap.add_argument("--out-parquet", default=engine.OUT_PARQUET)
+    ap.add_argument("--out-feather")
+    ap.add_argument("--out-csv")
+    ap.add_argument("--out-xlsx")
+    ap.add_argument("--report", help="per-row change report (.csv or .parquet)")
+    args = ap.parse_args()
+
+    df = engine.read_input(args.input)
+    model = RiskModel.load(args.model) if args.model else RiskModel.from_csv(args.bayes, args.cox)
+    state_path = args.state or str(Path(args.out_parquet).with_suffix(".state.parquet"))
+
+    scored, report, state = delta_score(df, model, load_state(state_path))
+    outputs = {"parquet": args.out_parquet, "feather": args.out_feather, "csv": args.out_csv, "xlsx": args.out_xlsx}
+    outputs = {k: v for k, v in outputs.items() if v}
+    for path in engine.write_outputs(scored, list(outputs), outputs):
+        print("Wrote:", path)
+    save_state(state, state_path)
+    print("Wrote:", state_path)
+    if args.report:
+        report.to_parquet(args.report) if args.report.endswith(".parquet") else report.to_csv(args.report, index=False)
+        print("Wrote:", args.report)
+    print(json.dumps(summarize(report, len(scored)), indent=2))
+
+if __name__ == "__main__":
+    main()
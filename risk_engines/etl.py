@@ -0,0 +1,332 @@
+"""ETL from a raw NRCan MPI release to the engine input and its scores.
+
+`mpi_2024_input.xlsx` was built by hand from `MPI_2024_Active_Projects_en.xlsx`,
+the sector / group classification and the earlier releases. This module
+rebuilds it in code with vectorized pandas / NumPy, for any release year Y:
+
+1. release: the "MPI <Y> Data" sheet in the history schema. `Project ID` is
+   the history's `Unique_ID`. Names are accent-folded and whitespace-collapsed
+   as in the history, and province, status and sector are matched onto their
+   canonical spellings ("Qc" -> "QC", "In review" -> "In Review"). Coordinates
+   outside Canada (or 0) are dropped.
+2. classification: `group`, `cleantech`, `abbreviation` and `company_type`
+   are assigned by hand, so a project already in the history keeps its latest
+   record. A new project gets the group most often assigned to projects of this
+   release with the same sector and raw type columns (Mining - Group, ENERGY -
+   type, Cleantech - Type, ...), else its sector's most common group. Its
+   cleantech flag and abbreviation come from the classification table, and its
+   company_type from the company's latest record. `group_source` says which
+   applied ("history" / "inferred") and is carried into the input and the
+   scored output, so inferred rows can be reviewed.
+3. input: the release replaces the history's year-Y records and the input is
+   built as in `backtest.build_snapshot`: projects listed in Y and not yet
+   under construction, `start_year` / `start_status` from the first year
+   listed, `project_cost` the largest cost reported. `cost_percentile` is the
+   share of all projects listed up to Y with a lower cost (a missing cost
+   counts as 0), the released datasets' definition. Coordinates fall back to
+   the project's latest valid pair.
+4. scores: `RiskModel.score_rows` on the cached encoding, the same output as
+   `engine.score()` on the input.
+
+Stages 1-3 are cached on disk (`<stage>-<key>.pkl`). The key hashes the files a
+stage reads and the ETL version, so a rerun only rebuilds the stages whose
+inputs changed, and a coefficient change only redoes the scoring.
+
+    built = build_input("MPI_2025_Active_Projects_en.xlsx")
+    scored = score_input(RiskModel.from_csv(...), built)   # = engine.score(built["input"])
+
+    python risk_engines/etl.py data/MPI_2024_Active_Projects_en.xlsx --out mpi_2024_scored.parquet \\
+        --bayes bayes_lr_regenerated_coefficients.csv --cox cox_coefficients_with_references.csv
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import backtest
+import mpi_risk_engine_v02 as engine
+from risk_model import RiskModel, _file_sha256, encode_frame
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+RAW_XLSX = DATA_DIR / "MPI_2024_Active_Projects_en.xlsx"
+CLASSIFICATION_XLSX = DATA_DIR / "mpi_sector_group_classification.xlsx"
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / ".etl_cache"
+
+# Bump when a stage's output changes, so cached stages are rebuilt
+ETL_VERSION = 2
+
+HISTORY_COLUMNS = ["Unique_ID", "status_year", "company_proponent", "project_name", "location",
+                   "province_territory", "status_current", "sector", "cost_current", "latitude_1",
+                   "longitude_1", "company_type", "group", "cleantech", "abbreviation"]
+INPUT_COLUMNS = ["Unique ID", "company", "project", "province", "company_type", "start_year", "end_year",
+                 "reporting_years", "start_status", "end_status", "current_survival", "end_success",
+                 "project_cost", "cost_percentile", "latitude_1", "longitude_1", "sector", "group",
+                 "cleantech", "abbreviation"]
+CLASS_COLUMNS = ["company_type", "group", "cleantech", "abbreviation"]
+
+PROVINCES = ["AB", "BC", "MB", "NB", "NL", "NS", "NT", "NU", "ON", "PE", "QC", "SK", "YK", "Multi"]
+PROVINCE_ALIASES = {"NWT": "NT", "YT": "YK"}
+STATUSES = ["Announced & Planning", "In Review", "Approved", "Under Construction"]
+SECTORS = ["Energy", "Mining", "Forest"]
+# Raw type columns (release sheet -> release stage), used to infer new projects' groups
+TYPE_COLUMNS = {"Mining - Group": "mining_group", "Mining - Critical Minerals": "critical_mineral",
+                "Clean Technology": "clean_technology", "ENERGY - type": "energy_type",
+                "Cleantech - Type": "cleantech_type"}
+# Classification table spellings -> the group labels of the history (and the hand-built input)
+GROUP_ALIASES = {"Natural Gas Power Gen": "NG Power Gen", "O&G - Upstream": "Oil & Gas - Upstream",
+                 "O&G - Downstream": "Oil & Gas - Downstream", "Trans. & Distr.": "Trans & Distr"}
+LAT_RANGE = (41.0, 84.0)
+LON_RANGE = (-142.0, -47.0)     # offshore Newfoundland reaches -48
+
+# ============================================================
+# Vectorized normalization helpers
+# ============================================================
+def _fold(s):
+    """Accent-folded, whitespace-collapsed strings (the history's convention)."""
+    out = s.astype(str).str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+    return out.str.replace(r"\s+", " ", regex=True).str.strip().where(s.notna())
+
+def _canonical(s, vocab, aliases=None):
+    """`s` matched case-insensitively onto `vocab` (or `aliases`); other values are kept, stripped."""
+    lookup = {v.upper(): v for v in vocab} | {k.upper(): v for k, v in (aliases or {}).items()}
+    s = s.astype(str).str.strip().where(s.notna())
+    return s.str.upper().map(lookup).fillna(s)
+
+def _coordinates(lat, lon):
+    lat, lon = pd.to_numeric(lat, errors="coerce"), pd.to_numeric(lon, errors="coerce")
+    valid = lat.between(*LAT_RANGE) & lon.between(*LON_RANGE)
+    return lat.where(valid), lon.where(valid)
+
+def _modal(keys, values):
+    """Most common value per key (ties to the first label), as a Series indexed by key."""
+    counts = pd.DataFrame({"key": keys, "value": values}).value_counts().reset_index()
+    counts = counts.sort_values(["count", "value"], ascending=[False, True], kind="stable")
+    return counts.drop_duplicates("key").set_index("key")["value"]
+
+# ============================================================
+# Stages
+# ============================================================
+def read_release(path=RAW_XLSX):
+    """The release's project sheet ("MPI <Y> Data", else the first) and Y."""
+    book = pd.ExcelFile(path)
+    sheet = next((s for s in book.sheet_names if re.fullmatch(r"MPI \d{4} Data", s)), book.sheet_names[0])
+    raw = book.parse(sheet)
+    years = [int(m.group(1)) for c in raw.columns if (m := re.fullmatch(r"Status (\d{4})", str(c)))]
+    if not years:
+        raise ValueError(f"{path}: no 'Status <year>' column in sheet {sheet!r}")
+    return raw, max(years)
+
+def normalize_release(raw, year):
+    """Release rows in the history schema, plus the raw type columns. Rows without
+    a numeric `Project ID` (blank or footnote rows) are dropped."""
+    ids = pd.to_numeric(raw["Project ID"], errors="coerce")
+    keep = ids.notna().to_numpy()
+    raw, ids = raw[keep].reset_index(drop=True), ids[keep].reset_index(drop=True)
+    cost = next(c for c in raw.columns if str(c).startswith(f"Cost {year}"))
+    lat, lon = _coordinates(raw["Latitude 1"], raw["Longitude 1"])
+    out = pd.DataFrame({
+        "Unique_ID": ids.astype(np.int64),
+        "status_year": year,
+        "company_proponent": _fold(raw["Company/ Proponent"]),
+        "project_name": _fold(raw["Project Name"]),
+        "location": _fold(raw["Location"]),
+        "province_territory": _canonical(raw["P/T"], PROVINCES, PROVINCE_ALIASES),
+        "status_current": _canonical(raw[f"Status {year}"], STATUSES),
+        "sector": _canonical(raw["Sector"], SECTORS),
+        "cost_current": pd.to_numeric(raw[cost], errors="coerce"),
+        "latitude_1": lat,
+        "longitude_1": lon,
+    })
+    for src, dst in TYPE_COLUMNS.items():
+        out[dst] = _fold(raw[src]) if src in raw.columns else np.nan
+    if out["Unique_ID"].duplicated().any():
+        raise ValueError("duplicate Project IDs in the release")
+    return out
+
+def group_table(classification, history):
+    """cleantech / abbreviation per (sector, group): the classification table in the history's group
+    labels, completed from the history for groups the table lacks (Energy / Other)."""
+    group = _fold(classification["Group"]).replace(GROUP_ALIASES)
+    table = pd.DataFrame({
+        "sector": _canonical(classification["Sector"], SECTORS),
+        "group": group,
+        "cleantech": _canonical(classification["Cleantech (Yes/No)"], ["Yes", "No"]),
+        "abbreviation": classification["Abbreviation"].str.strip(),
+    })
+    pairs = history.groupby(["sector", "group", "cleantech", "abbreviation"]).size().rename("count").reset_index()
+    pairs = pairs.sort_values(["count", "cleantech", "abbreviation"], ascending=[False, True, True], kind="stable")
+    return pd.concat([table, pairs.drop(columns="count")], ignore_index=True).drop_duplicates(["sector", "group"])
+
+def classify(release, history, classification):
+    """`release` with the hand-assigned columns: carried from the project's latest history record up
+    to the release year, else inferred (`group_source`)."""
+    year = int(release["status_year"].iat[0])
+    past = history[history["status_year"] <= year]
+    latest = past.groupby("Unique_ID")[CLASS_COLUMNS].last()
+    out = release.join(latest, on="Unique_ID")
+    known = out["group"].notna().to_numpy()
+    out["group_source"] = np.where(known, "history", "inferred")
+
+    company = _fold(past["company_proponent"]).str.lower()
+    by_company = past["company_type"].groupby(company).last()
+    out["company_type"] = out["company_type"].fillna(out["company_proponent"].str.lower().map(by_company))
+
+    if not known.all():
+        key = out["sector"].fillna("").astype(str)
+        for c in TYPE_COLUMNS.values():
+            key = key + "\x1f" + out[c].fillna("").astype(str)
+        by_type = _modal(key[known], out.loc[known, "group"])
+        by_sector = _modal(out.loc[known, "sector"], out.loc[known, "group"])
+        inferred = key.map(by_type).fillna(out["sector"].map(by_sector))
+        out["group"] = out["group"].where(known, inferred)
+
+        table = group_table(classification, history).set_index(["sector", "group"])
+        new = pd.MultiIndex.from_frame(out.loc[~known, ["sector", "group"]])
+        for c in ("cleantech", "abbreviation"):
+            out.loc[~known, c] = table[c].reindex(new).to_numpy()
+    return out
+
+def cost_percentile(history, year, cost):
+    """Share of the projects listed up to `year` whose largest reported cost (0 if none) is below
+    `cost`, rounded to 3 places; missing for a missing cost."""
+    costs = history[history["status_year"] <= year].groupby("Unique_ID")["cost_current"].max()
+    costs = np.sort(costs.fillna(0.0).to_numpy())
+    cost = np.asarray(cost, dtype=float)
+    pct = np.searchsorted(costs, cost, side="left") / max(len(costs), 1)
+    return np.round(np.where(np.isnan(cost), np.nan, pct), 3)
+
+def build_frame(history, classified):
+    """Engine input for the release year: the `mpi_2024_input.xlsx` columns plus `group_source`."""
+    year = int(classified["status_year"].iat[0])
+    combined = pd.concat([history.loc[history["status_year"] < year, HISTORY_COLUMNS],
+                          classified[HISTORY_COLUMNS]], ignore_index=True)
+    combined = combined.sort_values(["Unique_ID", "status_year"], kind="stable", ignore_index=True)
+    snap = backtest.build_snapshot(combined, year)[INPUT_COLUMNS]
+    snap["cost_percentile"] = cost_percentile(combined, year, snap["project_cost"])
+    # Inferred groups are a best guess; the flag travels with the row to every output
+    snap["group_source"] = snap["Unique ID"].map(classified.set_index("Unique_ID")["group_source"]).to_numpy()
+
+    lat, lon = _coordinates(combined["latitude_1"], combined["longitude_1"])
+    valid = lat.notna().to_numpy()
+    coords = pd.DataFrame({"latitude_1": lat[valid], "longitude_1": lon[valid]})
+    coords = coords.groupby(combined.loc[valid, "Unique_ID"].to_numpy()).last()
+    coords = coords.reindex(snap["Unique ID"])
+    snap["latitude_1"] = coords["latitude_1"].to_numpy()
+    snap["longitude_1"] = coords["longitude_1"].to_numpy()
+    return snap
+
+# ============================================================
+# Cached pipeline
+# ============================================================
+def _key(*parts):
+    return hashlib.sha256("|".join(map(str, (ETL_VERSION,) + parts)).encode()).hexdigest()[:16]
+
+def _stage(cache, name, key, build, log):
+    t0, nested = time.perf_counter(), len(log)
+    path = None if cache is None else cache / f"{name}-{key}.pkl"
+    if path is not None and path.exists():
+        value, status = pd.read_pickle(path), "cached"
+    else:
+        value, status = build(), "built"
+        if path is not None:
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            pd.to_pickle(value, tmp)
+            tmp.replace(path)
+    # Time spent in stages `build` ran itself is logged under their names
+    seconds = time.perf_counter() - t0 - sum(s["seconds"] for s in log[nested:])
+    log.append({"stage": name, "status": status, "seconds": seconds})
+    return value
+
+def build_input(raw_path=RAW_XLSX, history_path=backtest.HISTORY_XLSX,
+                classification_path=CLASSIFICATION_XLSX, cache_dir=DEFAULT_CACHE_DIR):
+    """Engine input for the release in `raw_path`, ready to score.
+
+    Returns a dict: "input" (INPUT_COLUMNS, `group_source` and `_cost_quintile_bayes`),
+    "enc" (its `encode_frame`), "classified" (every release row, with
+    `group_source`), "year", "stats" (row counts) and "log" (per stage:
+    cached / built and seconds).
+    """
+    cache = None
+    if cache_dir is not None:
+        cache = Path(cache_dir)
+        cache.mkdir(parents=True, exist_ok=True)
+    log = []
+    t0 = time.perf_counter()
+    k_raw, k_hist, k_cls = (_key(name, _file_sha256(p)) for name, p in
+                            (("release", raw_path), ("history", history_path),
+                             ("classification", classification_path)))
+    log.append({"stage": "hash inputs", "status": "computed", "seconds": time.perf_counter() - t0})
+
+    def inputs():
+        release = _stage(cache, "release", k_raw, lambda: normalize_release(*read_release(raw_path)), log)
+        history = _stage(cache, "history", k_hist, lambda: backtest.load_history(history_path), log)
+        classification = _stage(cache, "classification", k_cls,
+                                lambda: pd.read_excel(classification_path), log)
+        classified = classify(release, history, classification)
+        snap = engine.add_cost_quintile_bayes(build_frame(history, classified))
+        year = int(release["status_year"].iat[0])
+        listed = classified["status_current"] != backtest.BUILT_STATUS
+        earlier = history.loc[history["status_year"] < year, "Unique_ID"]
+        stats = {
+            "release_rows": len(release),
+            "under_construction": int((~listed).sum()),
+            "input_rows": len(snap),
+            "new_projects": int((~classified["Unique_ID"].isin(earlier)).sum()),
+            "inferred_groups": int(((classified["group_source"] == "inferred") & listed).sum()),
+        }
+        return {"input": snap, "enc": encode_frame(snap), "classified": classified, "year": year, "stats": stats}
+
+    built = _stage(cache, "input", _key("input", k_raw, k_hist, k_cls), inputs, log)
+    return {**built, "log": pd.DataFrame(log)}
+
+def score_input(model, built):
+    """Scores of a `build_input` result, equal to `engine.score()` on its input."""
+    df = built["input"].copy()
+    return engine.rescale_priority(model.score_rows(df, built["enc"]))
+
+def main():
+    ap = argparse.ArgumentParser(description="Build the engine input from a raw MPI release and score it")
+    ap.add_argument("raw", nargs="?", default=str(RAW_XLSX), help="MPI_<year>_Active_Projects_en.xlsx")
+    ap.add_argument("--history", default=str(backtest.HISTORY_XLSX))
+    ap.add_argument("--classification", default=str(CLASSIFICATION_XLSX))
+    ap.add_argument("--bayes", default=engine.BAYES_COEFF_PATH)
+    ap.add_argument("--cox", default=engine.COX_COEFF_PATH)
+    ap.add_argument("--model", help="saved RiskModel prefix (overrides --bayes/--cox)")
+    ap.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR))
+    ap.add_argument("--no-cache", action="store_true")
+    ap.add_argument("--input-out", help="engine input (.xlsx, .csv or .parquet), like mpi_2024_input.xlsx")
+    ap.add_argument("--out", help="scored output (.parquet, .feather, .csv or .xlsx)")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    built = build_input(args.raw, args.history, args.classification, None if args.no_cache else args.cache_dir)
+    model = RiskModel.load(args.model) if args.model else RiskModel.from_csv(args.bayes, args.cox)
+    scored = score_input(model, built)
+    elapsed = time.perf_counter() - t0
+
+    if args.input_out:
+        df = built["input"].drop(columns="_cost_quintile_bayes")
+        fmt = args.input_out.lower().rsplit(".", 1)[-1]
+        {"csv": df.to_csv, "parquet": df.to_parquet}.get(fmt, df.to_excel)(args.input_out, index=False)
+        print("Wrote:", args.input_out)
+    if args.out:
+        fmt = args.out.lower().rsplit(".", 1)[-1]
+        engine.write_outputs(scored, [fmt], {fmt: args.out})
+        print("Wrote:", args.out)
+    s = built["stats"]
+    print(f"MPI {built['year']}: {s['release_rows']:,} release rows, {s['under_construction']:,} under construction, "
+          f"{s['input_rows']:,} scored ({s['new_projects']:,} new projects, {s['inferred_groups']:,} groups inferred) "
+          f"in {elapsed:.3f} s")
+    if s["inferred_groups"]:
+        print(f"WARNING: {s['inferred_groups']:,} scored rows have an inferred group (group_source == 'inferred'); "
+              f"inferred groups are a best guess and should be reviewed before the scores are used")
+    print(built["log"].assign(ms=(built["log"]["seconds"] * 1e3).round(1)).drop(columns="seconds").to_string(index=False))
+
+if __name__ == "__main__":
+    main()
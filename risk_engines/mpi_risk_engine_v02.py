@@ -26,8 +26,15 @@ COX_COEFF_PATH   = "/content/cox_coefficients_with_references.csv"
 INPUT_XLSX       = "/content/mpi_2024_input.xlsx" # Corrected path and filename
 OUT_CSV          = "/content/mpi_2024_scored.csv"
 OUT_XLSX         = "/content/mpi_2024_scored.xlsx"
+OUT_PARQUET      = "/content/mpi_2024_scored.parquet"
+OUT_FEATHER      = "/content/mpi_2024_scored.feather"
+
+# Columnar outputs keep these as pandas categoricals (Arrow dictionary columns)
+CATEGORICAL_COLUMNS = ["province", "sector", "group", "start_status", "end_status"]
 
 S0_3Y = 0.9491  # baseline survival at 3 years (confirmed)
+BAYES_WEIGHT = 0.60  # weight of p_bayes in blended_prob (p_cox gets the rest)
+POWER_WEIGHT = 0.60  # weight of blended_prob in power_ranking (urgency gets the rest)
 
 def norm_str(x):
     if pd.isna(x):
@@ -42,25 +49,30 @@ def start_bin_from_year(y):
         return "Unknown"
     return str(y) if 2018 <= y <= 2024 else "Unknown"
 
-def run():
-    df = pd.read_excel(INPUT_XLSX)
+# === Cox: derive cost quintile from cost_percentile (0-1) -> int(p*5) ===
+def cost_quintile_for_cox(p):
+    if pd.isna(p): return None
+    v = float(p)
+    return int(min(0.9999, max(0.0, v))*5)
 
-    bayes_table = pd.read_csv(BAYES_COEFF_PATH)
-    cox_table = pd.read_csv(COX_COEFF_PATH)
+def load_coefficient_maps(bayes_path=BAYES_COEFF_PATH, cox_path=COX_COEFF_PATH):
+    bayes_table = pd.read_csv(bayes_path)
+    cox_table = pd.read_csv(cox_path)
 
     bayes_lr_map = dict(zip(bayes_table["feature_name"], bayes_table["LR"]))
     cox_coef_map = dict(zip(cox_table["covariate"], cox_table["coef"]))
+    return bayes_lr_map, cox_coef_map
 
+def add_cost_quintile_bayes(df):
     # === Bayes: derive cost quintile from project_cost via qcut (dataset-relative) ===
     ranks = df["project_cost"].astype(float).rank(method="first")
     df["_cost_quintile_bayes"] = pd.qcut(ranks, 5, labels=[0,1,2,3,4]).astype("Int64")
+    return df
 
-    # === Cox: derive cost quintile from cost_percentile (0-1) -> int(p*5) ===
-    def cost_quintile_for_cox(p):
-        if pd.isna(p): return None
-        v = float(p)
-        return int(min(0.9999, max(0.0, v))*5)
-
+# ============================================================
+# Row-wise scoring (reference implementation)
+# ============================================================
+def score_rowwise(df, bayes_lr_map, cox_coef_map):
     # --- p_bayes ---
     def compute_p_bayes(row):
         feats = []
@@ -111,29 +123,184 @@ def run():
 
     df["p_bayes"] = df.apply(compute_p_bayes, axis=1)
     df["risk_score"] = df.apply(compute_risk_score, axis=1)
+    return df
+
+# ============================================================
+# Columnar scoring
+# Every categorical column is factorized once, each distinct value is
+# normalized and looked up once, and per-row terms are gathered by code.
+# Terms are accumulated in the same order as the row-wise path so the
+# float results are bit-for-bit identical.
+# ============================================================
+def _column(df, col):
+    if col in df.columns:
+        return df[col]
+    return pd.Series(None, index=df.index, dtype=object)
+
+def encode_column(df, col, fn=norm_str):
+    """Return (codes, labels) with labels[codes] == [fn(v) for v in df[col]]."""
+    codes, uniques = pd.factorize(_column(df, col), use_na_sentinel=True)
+    labels = [fn(u) for u in uniques] + [fn(None)]
+    codes = np.where(codes < 0, len(uniques), codes)
+    return codes, labels
+
+def _cq_label(cq):
+    return str(int(cq)) if pd.notna(cq) else "Unknown"
+
+def _gather(codes, labels, value_of):
+    table = np.array([value_of(l) for l in labels], dtype=np.float64)
+    return table[codes]
+
+def bayes_log_odds(df, bayes_lr_map):
+    log_lr = {f: np.log(lr) for f, lr in bayes_lr_map.items()}
+
+    def with_unknown(prefix):
+        fallback = log_lr.get(f"{prefix}Unknown", 0.0)
+        return lambda l: log_lr.get(f"{prefix}{l}", fallback)
+
+    cle_codes, cle_labels = encode_column(df, "cleantech")
+    cq_codes, cq_labels = encode_column(df, "_cost_quintile_bayes", _cq_label)
+    grp_codes, grp_labels = encode_column(df, "group")
+    prov_codes, prov_labels = encode_column(df, "province")
+    sec_codes, sec_labels = encode_column(df, "sector")
+    sb_codes, sb_labels = encode_column(df, "start_year", start_bin_from_year)
+
+    terms = [
+        _gather(cle_codes, cle_labels,
+                lambda l: log_lr.get(f"cleantech_{l if l in ['Yes','No'] else 'Unknown'}", 0.0)),
+        _gather(cq_codes, cq_labels, lambda l: log_lr.get(f"cost_quintile_{l}", 0.0)),
+        _gather(grp_codes, grp_labels, with_unknown("group_")),
+        _gather(prov_codes, prov_labels, with_unknown("province_")),
+        _gather(sec_codes, sec_labels, with_unknown("sector_")),
+        _gather(sb_codes, sb_labels, with_unknown("start_bin_")),
+    ]
+    # province-sector interaction, looked up per (province, sector) pair
+    ps_table = np.array([[log_lr.get(f"prov_sec_{p}_{s}", 0.0) for s in sec_labels] for p in prov_labels],
+                        dtype=np.float64).reshape(len(prov_labels), len(sec_labels))
+    terms.append(ps_table[prov_codes, sec_codes])
+
+    log_odds = terms[0].copy()
+    for t in terms[1:]:
+        log_odds += t
+    return log_odds
+
+def cox_eta(df, cox_coef_map):
+    cle_codes, cle_labels = encode_column(df, "cleantech")
+    prov_codes, prov_labels = encode_column(df, "province")
+    sec_codes, sec_labels = encode_column(df, "sector")
+
+    coef_cle = cox_coef_map.get("cleantech_flag", 0.0)
+    eta = 0.0 + _gather(cle_codes, cle_labels, lambda l: coef_cle * (1 if l == "Yes" else 0))
+
+    p = _column(df, "cost_percentile").astype(float).to_numpy()
+    cq = np.floor(np.minimum(0.9999, np.maximum(0.0, p)) * 5)
+    eta += np.where(np.isnan(p), 0.0, cox_coef_map.get("cost_quintile", 0.0) * cq)
+
+    eta += _gather(prov_codes, prov_labels, lambda l: cox_coef_map.get(f"province_{l}", 0.0))
+    eta += _gather(sec_codes, sec_labels, lambda l: cox_coef_map.get(f"sector_{l}", 0.0))
+    return eta
+
+def score_columnar(df, bayes_lr_map, cox_coef_map):
+    odds = np.exp(bayes_log_odds(df, bayes_lr_map))
+    df["p_bayes"] = odds / (1.0 + odds)
+    df["risk_score"] = np.exp(cox_eta(df, cox_coef_map))
+    return df
+
+# ============================================================
+# Blending, urgency and power ranking (shared by both paths)
+# ============================================================
+def blend_scores(df):
     df["years_remaining"] = (5.0 - df["reporting_years"]).clip(lower=0.25)
     df["p_cox"] = 1 - (S0_3Y ** df["risk_score"])
-    df["blended_prob"] = 0.60 * df["p_bayes"] + 0.40 * df["p_cox"]
+    df["blended_prob"] = BAYES_WEIGHT * df["p_bayes"] + (1 - BAYES_WEIGHT) * df["p_cox"]
     df["priority_index"] = df["blended_prob"] / df["years_remaining"]
+    return df
 
-    # Rescale within filtered dataset
-    pi_min = df["priority_index"].min()
-    pi_max = df["priority_index"].max()
+def rescale_priority(df, pi_min=None, pi_max=None):
+    # Rescale within filtered dataset (or within the given range, for chunked scoring)
+    if pi_min is None:
+        pi_min = df["priority_index"].min()
+    if pi_max is None:
+        pi_max = df["priority_index"].max()
     df["urgency_scale_(0-1)"] = (df["priority_index"] - pi_min) / (pi_max - pi_min) if pi_max > pi_min else 0.0
 
-    df["power_ranking"] = 0.60 * df["blended_prob"] + 0.40 * df["urgency_scale_(0-1)"]
+    df["power_ranking"] = POWER_WEIGHT * df["blended_prob"] + (1 - POWER_WEIGHT) * df["urgency_scale_(0-1)"]
+    return df
+
+def finalize_scores(df):
+    return rescale_priority(blend_scores(df))
+
+def score(df, bayes_lr_map, cox_coef_map, vectorized=True):
+    df = add_cost_quintile_bayes(df)
+    if vectorized:
+        df = score_columnar(df, bayes_lr_map, cox_coef_map)
+    else:
+        df = score_rowwise(df, bayes_lr_map, cox_coef_map)
+    return finalize_scores(df)
+
+# ============================================================
+# Inputs
+# ============================================================
+def read_input(path):
+    """An engine input from .csv or .parquet, else Excel (as run() reads)."""
+    suffix = str(path).lower().rsplit(".", 1)[-1]
+    return {"csv": pd.read_csv, "parquet": pd.read_parquet}.get(suffix, pd.read_excel)(path)
+
+# ============================================================
+# Outputs
+# Parquet / Feather are the primary formats (the dashboard reads them first);
+# CSV and XLSX remain available as export formats.
+# ============================================================
+OUTPUTS = {
+    "parquet": OUT_PARQUET,
+    "feather": OUT_FEATHER,
+    "csv": OUT_CSV,
+    "xlsx": OUT_XLSX,
+}
+DEFAULT_FORMATS = ("parquet", "feather", "csv", "xlsx")
+
+def with_categoricals(df):
+    out = df.copy()
+    for c in CATEGORICAL_COLUMNS:
+        if c in out.columns:
+            out[c] = out[c].astype("category")
+    return out
+
+def write_outputs(df, formats=DEFAULT_FORMATS, outputs=None):
+    outputs = {**OUTPUTS, **(outputs or {})}
+    written = []
+    columnar = with_categoricals(df) if {"parquet", "feather"} & set(formats) else None
+    for fmt in formats:
+        path = outputs[fmt]
+        if fmt == "parquet":
+            columnar.to_parquet(path, index=False)
+        elif fmt == "feather":
+            columnar.reset_index(drop=True).to_feather(path)
+        elif fmt == "csv":
+            df.to_csv(path, index=False)
+        elif fmt == "xlsx":
+            df.to_excel(path, index=False)
+        else:
+            raise ValueError(f"Unknown output format: {fmt}")
+        written.append(path)
+    return written
+
+def run(vectorized=True, formats=DEFAULT_FORMATS):
+    df = pd.read_excel(INPUT_XLSX)
+
+    bayes_lr_map, cox_coef_map = load_coefficient_maps()
+    df = score(df, bayes_lr_map, cox_coef_map, vectorized=vectorized)
 
     # Save
-    df.to_csv(OUT_CSV, index=False)
-    df.to_excel(OUT_XLSX, index=False)
+    write_outputs(df, formats)
     return df
 
 if __name__ == "__main__":
     out = run()
-    print("Wrote:", OUT_CSV)
-    print("Wrote:", OUT_XLSX)
+    for fmt in DEFAULT_FORMATS:
+        print("Wrote:", OUTPUTS[fmt])
     print("Rows:", len(out))
 
-# List the files in the /content directory
-import os
-os.system("ls /content/")
\ No newline at end of file
+    # List the files in the /content directory
+    import os
+    os.system("ls /content/")
@@ -0,0 +1,382 @@
+"""Compiled, reusable coefficient model for the MPI risk engine.
+
+`RiskModel` is built once from the two coefficient CSVs (or loaded from a
+saved `.npz` + `.json` manifest) and keeps the log-LRs, Cox coefficients and
+category -> index tables in memory, so scoring never touches the CSVs again.
+
+    model = RiskModel.from_csv("bayes_lr_regenerated_coefficients.csv",
+                               "cox_coefficients_with_references.csv",
+                               reference=pd.read_excel("mpi_2024_input.xlsx"))
+    model.save("mpi_risk_model_v02")           # .npz + .json
+    model = RiskModel.load("mpi_risk_model_v02")
+    scored = model.score(df)                   # same output as engine.score()
+    one = model.score_one({"province": "ON", "sector": "Energy", ...})
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import mpi_risk_engine_v02 as engine
+
+MODEL_FORMAT = 1
+
+# Bayes feature blocks in the order the engine accumulates them.
+BAYES_BLOCKS = ["cleantech", "cost_quintile", "group", "province", "sector", "start_bin"]
+COX_BLOCKS = ["province", "sector"]
+
+# Blocks whose unseen categories fall back to the "<block>_Unknown" LR.
+_UNKNOWN_FALLBACK = {"group", "province", "sector", "start_bin"}
+
+def _file_sha256(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+def encode_frame(df):
+    """Factorized scoring inputs of `df` ((codes, labels) per feature block,
+    plus `cost_percentile`). Independent of the coefficients, so it can be
+    cached and scored by any RiskModel; expects `_cost_quintile_bayes`."""
+    return {
+        "cleantech": engine.encode_column(df, "cleantech"),
+        "cost_quintile": engine.encode_column(df, "_cost_quintile_bayes", engine._cq_label),
+        "group": engine.encode_column(df, "group"),
+        "province": engine.encode_column(df, "province"),
+        "sector": engine.encode_column(df, "sector"),
+        "start_bin": engine.encode_column(df, "start_year", engine.start_bin_from_year),
+        "cost_percentile": engine._column(df, "cost_percentile").astype(float).to_numpy(),
+    }
+
+# A covariate profile: the normalized label of each Bayes block plus the Cox
+# cost quintile (-1 = no cost_percentile). p_bayes and risk_score depend on
+# nothing else, so rows sharing a profile share both scores.
+PROFILE_COLUMNS = BAYES_BLOCKS + ["cox_cost_quintile"]
+
+def encode_profiles(enc):
+    """Unique covariate profiles of an `encode_frame` result.
+
+    Returns (inverse, profiles): `profiles` has one row per distinct profile
+    (PROFILE_COLUMNS) and `inverse` maps each input row to its profile."""
+    cq = np.floor(np.minimum(0.9999, np.maximum(0.0, enc["cost_percentile"])) * 5)
+    digits = [(np.where(np.isnan(cq), 0, cq + 1).astype(np.int64), np.arange(-1, 5))]
+    for b in BAYES_BLOCKS:
+        codes, labels = enc[b]
+        label_codes, uniques = pd.factorize(np.asarray(labels, dtype=object))
+        digits.append((label_codes[codes], uniques))
+
+    key = np.zeros(len(cq), dtype=np.int64)
+    radix = 1
+    for row_codes, uniques in digits:
+        radix *= len(uniques)
+        if radix >= 2 ** 62:
+            raise ValueError("too many covariate combinations for a 64-bit profile key")
+        key = key * len(uniques) + row_codes
+    inverse, keys = pd.factorize(key)
+
+    profiles = {}
+    for name, (_, uniques) in reversed(list(zip(PROFILE_COLUMNS[-1:] + BAYES_BLOCKS, digits))):
+        profiles[name] = np.asarray(uniques)[keys % len(uniques)]
+        keys = keys // len(uniques)
+    profiles = pd.DataFrame(profiles)[PROFILE_COLUMNS]
+    return inverse, profiles
+
+class RiskModel:
+    def __init__(self, bayes_lr_map, cox_coef_map, reference=None, sources=None):
+        log_lr = {f: np.log(lr) for f, lr in bayes_lr_map.items()}
+        self.sources = dict(sources or {})
+
+        # --- Bayes: per-block vocabulary + log-LR table (last entry = unseen) ---
+        self.bayes_vocab, self.bayes_table = {}, {}
+        for block in BAYES_BLOCKS:
+            prefix = f"{block}_"
+            if block == "cleantech":
+                vocab = ["Yes", "No"]
+                values = [log_lr.get(f"cleantech_{v}", 0.0) for v in vocab]
+                fallback = log_lr.get("cleantech_Unknown", 0.0)
+            else:
+                vocab = [f[len(prefix):] for f in log_lr if f.startswith(prefix)]
+                values = [log_lr[prefix + v] for v in vocab]
+                fallback = log_lr.get(prefix + "Unknown", 0.0) if block in _UNKNOWN_FALLBACK else 0.0
+            self.bayes_vocab[block] = np.array(vocab, dtype=str)
+            self.bayes_table[block] = np.array(values + [fallback], dtype=np.float64)
+
+        # province-sector interaction, keyed by "<province>_<sector>"
+        ps = [f[len("prov_sec_"):] for f in log_lr if f.startswith("prov_sec_")]
+        self.prov_sec_vocab = np.array(ps, dtype=str)
+        self.prov_sec_table = np.array([log_lr["prov_sec_" + k] for k in ps] + [0.0], dtype=np.float64)
+
+        # --- Cox: per-block coefficients (unseen -> 0.0) + scalar terms ---
+        self.cox_vocab, self.cox_table = {}, {}
+        for block in COX_BLOCKS:
+            prefix = f"{block}_"
+            vocab = [c[len(prefix):] for c in cox_coef_map if c.startswith(prefix)]
+            self.cox_vocab[block] = np.array(vocab, dtype=str)
+            self.cox_table[block] = np.array([cox_coef_map[prefix + v] for v in vocab] + [0.0], dtype=np.float64)
+        self.coef_cleantech = float(cox_coef_map.get("cleantech_flag", 0.0))
+        self.coef_cost_quintile = float(cox_coef_map.get("cost_quintile", 0.0))
+        self.s0_3y = engine.S0_3Y
+        self._build_index()
+
+        # --- Optional reference statistics for single-record scoring ---
+        self.cost_thresholds = np.array([], dtype=np.float64)
+        self.priority_range = np.array([], dtype=np.float64)
+        if reference is not None:
+            self._fit_reference(reference)
+
+    # ------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------
+    @classmethod
+    def from_maps(cls, bayes_lr_map, cox_coef_map, reference=None):
+        return cls(bayes_lr_map, cox_coef_map, reference=reference)
+
+    @classmethod
+    def from_csv(cls, bayes_path=engine.BAYES_COEFF_PATH, cox_path=engine.COX_COEFF_PATH, reference=None):
+        bayes_lr_map, cox_coef_map = engine.load_coefficient_maps(bayes_path, cox_path)
+        sources = {"bayes_sha256": _file_sha256(bayes_path), "cox_sha256": _file_sha256(cox_path)}
+        return cls(bayes_lr_map, cox_coef_map, reference=reference, sources=sources)
+
+    def fingerprint(self):
+        """Hash of the coefficients (vocabularies, tables, scalar terms, S0): it
+        changes with the coefficient CSVs however the model was built or loaded."""
+        h = hashlib.sha256(np.array([self.s0_3y, self.coef_cleantech, self.coef_cost_quintile]).tobytes())
+        for name, vocab, table in self._sections():
+            if name not in ("cost_thresholds", "priority_range"):
+                h.update(name.encode() + b"\0" + "\0".join(vocab.tolist()).encode() + b"\0" + table.tobytes())
+        return h.hexdigest()
+
+    def _build_index(self):
+        self.bayes_index = {b: {c: i for i, c in enumerate(v.tolist())} for b, v in self.bayes_vocab.items()}
+        self.cox_index = {b: {c: i for i, c in enumerate(v.tolist())} for b, v in self.cox_vocab.items()}
+        self.prov_sec_index = {c: i for i, c in enumerate(self.prov_sec_vocab.tolist())}
+
+    def _fit_reference(self, reference):
+        """Store the dataset-relative cut points of `reference` so that
+        `score_one` can place a single record on the same scales."""
+        costs = np.sort(reference["project_cost"].astype(float).dropna().to_numpy())
+        if len(costs):
+            # qcut over ranks 1..m: the last rank of bin k sits at floor(edge_k)
+            edges = np.quantile(np.arange(1, len(costs) + 1, dtype=np.float64), [0.2, 0.4, 0.6, 0.8])
+            self.cost_thresholds = costs[np.floor(edges).astype(int) - 1]
+        scored = self.score(reference.copy())
+        pi = scored["priority_index"]
+        self.priority_range = np.array([pi.min(), pi.max()], dtype=np.float64)
+
+    # ------------------------------------------------------------
+    # Serialization (.npz arrays + .json manifest)
+    # All vocabularies are packed into one string array and all tables into
+    # one float array; the manifest records each section's slice lengths.
+    # ------------------------------------------------------------
+    def _sections(self):
+        empty = np.array([], dtype=str)
+        for b in BAYES_BLOCKS:
+            yield f"bayes__{b}", self.bayes_vocab[b], self.bayes_table[b]
+        yield "prov_sec", self.prov_sec_vocab, self.prov_sec_table
+        for b in COX_BLOCKS:
+            yield f"cox__{b}", self.cox_vocab[b], self.cox_table[b]
+        yield "cost_thresholds", empty, self.cost_thresholds
+        yield "priority_range", empty, self.priority_range
+
+    def save(self, path):
+        path = Path(path)
+        npz_path, manifest_path = path.with_suffix(".npz"), path.with_suffix(".json")
+        sections = list(self._sections())
+        np.savez(npz_path,
+                 labels=np.concatenate([v for _, v, _ in sections]).astype(str),
+                 values=np.concatenate([t for _, _, t in sections]).astype(np.float64))
+        manifest = {
+            "format": MODEL_FORMAT,
+            "engine": "mpi_risk_engine_v02",
+            "s0_3y": self.s0_3y,
+            "coef_cleantech": self.coef_cleantech,
+            "coef_cost_quintile": self.coef_cost_quintile,
+            "sections": [[name, len(v), len(t)] for name, v, t in sections],
+            "sources": self.sources,
+            "npz_sha256": _file_sha256(npz_path),
+        }
+        manifest_path.write_text(json.dumps(manifest, indent=2))
+        return npz_path, manifest_path
+
+    @classmethod
+    def load(cls, path):
+        path = Path(path)
+        manifest = json.loads(path.with_suffix(".json").read_text())
+        if manifest.get("format") != MODEL_FORMAT:
+            raise ValueError(f"Unsupported model format: {manifest.get('format')}")
+        with np.load(path.with_suffix(".npz"), allow_pickle=False) as z:
+            labels, values = z["labels"], z["values"]
+
+        sections, i, j = {}, 0, 0
+        for name, n_labels, n_values in manifest["sections"]:
+            sections[name] = (labels[i:i + n_labels], values[j:j + n_values])
+            i, j = i + n_labels, j + n_values
+
+        model = cls.__new__(cls)
+        model.bayes_vocab = {b: sections[f"bayes__{b}"][0] for b in BAYES_BLOCKS}
+        model.bayes_table = {b: sections[f"bayes__{b}"][1] for b in BAYES_BLOCKS}
+        model.prov_sec_vocab, model.prov_sec_table = sections["prov_sec"]
+        model.cox_vocab = {b: sections[f"cox__{b}"][0] for b in COX_BLOCKS}
+        model.cox_table = {b: sections[f"cox__{b}"][1] for b in COX_BLOCKS}
+        model.cost_thresholds = sections["cost_thresholds"][1]
+        model.priority_range = sections["priority_range"][1]
+        model.s0_3y = manifest["s0_3y"]
+        model.coef_cleantech = manifest["coef_cleantech"]
+        model.coef_cost_quintile = manifest["coef_cost_quintile"]
+        model.sources = manifest.get("sources", {})
+        model._build_index()
+        return model
+
+    # ------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------
+    def _indices(self, index, table, codes, labels):
+        fallback = len(table) - 1
+        idx = np.array([index.get(l, fallback) for l in labels], dtype=np.intp)
+        return idx[codes]
+
+    def _gather(self, index, table, codes, labels):
+        return table[self._indices(index, table, codes, labels)]
+
+    def bayes_indices(self, df, enc=None):
+        """Per-row positions in each Bayes block's table (and "prov_sec").
+
+        enc: `encode_frame(df)`, if already computed (df is then unused)."""
+        enc = encode_frame(df) if enc is None else enc
+        idx = {b: self._indices(self.bayes_index[b], self.bayes_table[b], *enc[b]) for b in BAYES_BLOCKS}
+
+        prov_codes, prov_labels = enc["province"]
+        sec_codes, sec_labels = enc["sector"]
+        pair_labels = [f"{p}_{s}" for p in prov_labels for s in sec_labels]
+        idx["prov_sec"] = self._indices(self.prov_sec_index, self.prov_sec_table,
+                                        prov_codes * len(sec_labels) + sec_codes, pair_labels)
+        return idx
+
+    def bayes_log_odds(self, df, enc=None):
+        idx = self.bayes_indices(df, enc)
+        terms = [self.bayes_table[b][idx[b]] for b in BAYES_BLOCKS] + [self.prov_sec_table[idx["prov_sec"]]]
+
+        log_odds = terms[0].copy()
+        for t in terms[1:]:
+            log_odds += t
+        return log_odds
+
+    def cox_covariates(self, df, enc=None):
+        """Per-row Cox covariates: the 0/1 cleantech flag, the cost quintile
+        (NaN = no term) and positions in each Cox block's table."""
+        enc = encode_frame(df) if enc is None else enc
+        cle_codes, cle_labels = enc["cleantech"]
+        cov = {"cleantech_flag": np.array([1 if l == "Yes" else 0 for l in cle_labels])[cle_codes]}
+        p = enc["cost_percentile"]
+        cov["cost_quintile"] = np.floor(np.minimum(0.9999, np.maximum(0.0, p)) * 5)
+        for b in COX_BLOCKS:
+            cov[b] = self._indices(self.cox_index[b], self.cox_table[b], *enc[b])
+        return cov
+
+    def cox_eta(self, df, enc=None):
+        cov = self.cox_covariates(df, enc)
+        eta = 0.0 + self.coef_cleantech * cov["cleantech_flag"]
+        cq = cov["cost_quintile"]
+        eta += np.where(np.isnan(cq), 0.0, self.coef_cost_quintile * cq)
+        for b in COX_BLOCKS:
+            eta += self.cox_table[b][cov[b]]
+        return eta
+
+    def score_rows(self, df, enc=None):
+        """Per-row scores up to `priority_index`; expects `_cost_quintile_bayes`."""
+        odds = np.exp(self.bayes_log_odds(df, enc))
+        df["p_bayes"] = odds / (1.0 + odds)
+        df["risk_score"] = np.exp(self.cox_eta(df, enc))
+        return engine.blend_scores(df)
+
+    def score_profiles(self, profiles):
+        """p_bayes and risk_score for each row of an `encode_profiles` frame."""
+        enc = {b: engine.encode_column(profiles, b, str) for b in BAYES_BLOCKS}
+        q = profiles["cox_cost_quintile"].to_numpy(dtype=np.float64)
+        enc["cost_percentile"] = np.where(q < 0, np.nan, (q + 0.5) / 5)
+        odds = np.exp(self.bayes_log_odds(None, enc))
+        return pd.DataFrame({"p_bayes": odds / (1.0 + odds), "risk_score": np.exp(self.cox_eta(None, enc))},
+                            index=profiles.index)
+
+    def score(self, df):
+        """Score a frame exactly like `engine.score(df, ...)` (dataset-relative)."""
+        df = engine.add_cost_quintile_bayes(df)
+        return engine.rescale_priority(self.score_rows(df))
+
+    def score_one(self, record):
+        """Score a single project dict without pandas.
+
+        The cost quintile and urgency scale are dataset-relative; they are
+        taken from the reference dataset the model was compiled with
+        (`_cost_quintile_bayes` in `record` overrides the quintile).
+
+        Ties: `engine.add_cost_quintile_bayes` ranks costs by first occurrence,
+        so when equal costs straddle a quintile edge the engine splits them by
+        row order. A record with that cost gets the lower quintile (the one
+        its first occurrence in the reference fell into); pass
+        `_cost_quintile_bayes` to reproduce a specific row exactly.
+        """
+        cle = engine.norm_str(record.get("cleantech"))
+        prov = engine.norm_str(record.get("province"))
+        sec = engine.norm_str(record.get("sector"))
+
+        cq = record.get("_cost_quintile_bayes")
+        if cq is None and len(self.cost_thresholds):
+            cost = record.get("project_cost")
+            if not pd.isna(cost):
+                cq = int(np.count_nonzero(float(cost) > self.cost_thresholds))
+
+        labels = {
+            "cleantech": cle,
+            "cost_quintile": engine._cq_label(cq),
+            "group": engine.norm_str(record.get("group")),
+            "province": prov,
+            "sector": sec,
+            "start_bin": engine.start_bin_from_year(record.get("start_year")),
+        }
+        log_odds = 0.0
+        for b in BAYES_BLOCKS:
+            table = self.bayes_table[b]
+            log_odds += table[self.bayes_index[b].get(labels[b], len(table) - 1)]
+        log_odds += self.prov_sec_table[self.prov_sec_index.get(f"{prov}_{sec}", len(self.prov_sec_table) - 1)]
+        odds = np.exp(log_odds)
+        p_bayes = float(odds / (1.0 + odds))
+
+        eta = 0.0 + self.coef_cleantech * (1 if cle == "Yes" else 0)
+        p = record.get("cost_percentile")
+        if not pd.isna(p):
+            eta += self.coef_cost_quintile * engine.cost_quintile_for_cox(p)
+        for b, label in (("province", prov), ("sector", sec)):
+            table = self.cox_table[b]
+            eta += table[self.cox_index[b].get(label, len(table) - 1)]
+        risk_score = float(np.exp(eta))
+
+        ry = record.get("reporting_years")
+        years_remaining = max(5.0 - float(ry), 0.25) if not pd.isna(ry) else np.nan
+        p_cox = float(1 - np.power(self.s0_3y, risk_score))
+        blended = engine.BAYES_WEIGHT * p_bayes + (1 - engine.BAYES_WEIGHT) * p_cox
+        out = {
+            "p_bayes": p_bayes,
+            "risk_score": risk_score,
+            "years_remaining": years_remaining,
+            "p_cox": p_cox,
+            "blended_prob": blended,
+            "priority_index": blended / years_remaining,
+        }
+        if len(self.priority_range):
+            pi_min, pi_max = self.priority_range
+            urgency = (out["priority_index"] - pi_min) / (pi_max - pi_min) if pi_max > pi_min else 0.0
+            out["urgency_scale_(0-1)"] = urgency
+            out["power_ranking"] = engine.POWER_WEIGHT * blended + (1 - engine.POWER_WEIGHT) * urgency
+        return out
+
+if __name__ == "__main__":
+    import sys
+
+    here = Path(__file__).parent
+    out_path = sys.argv[1] if len(sys.argv) > 1 else str(here / "mpi_risk_model_v02")
+    model = RiskModel.from_csv(here / "bayes_lr_regenerated_coefficients.csv",
+                               here / "cox_coefficients_with_references.csv",
+                               reference=pd.read_excel(here / "mpi_2024_input.xlsx"))
+    for p in model.save(out_path):
+        print("Wrote:", p)
@@ -0,0 +1,259 @@
+"""Scenario / sensitivity sweeps over the MPI risk engine.
+
+A scenario overrides any of the engine's fixed parameters:
+
+    s0_3y         3-year baseline survival of the Cox model  (engine: S0_3Y)
+    bayes_weight  weight of p_bayes in blended_prob           (0.60; p_cox gets the rest)
+    power_weight  weight of blended_prob in power_ranking     (0.60; urgency gets the rest)
+    horizon       years_remaining = horizon - reporting_years (5.0)
+    clip_floor    ... clipped below at clip_floor             (0.25)
+    lr_factors    {feature pattern: factor} multiplying Bayes LRs, e.g. {"province_AB": 1.2}
+    hr_factors    {covariate pattern: factor} multiplying Cox hazard ratios exp(coef)
+
+(patterns as in fnmatch, e.g. "sector_*"). The dataset is encoded once (the
+per-row category positions of RiskModel); a scenario then only rebuilds the
+coefficient tables when it perturbs them and redoes the final arithmetic,
+per distinct covariate profile where possible. Scenarios are fanned out over
+a process pool and written as long-format Parquet, one row per scenario x
+project, with the scenario's parameters alongside the scores. The default
+scenario reproduces `engine.score()` exactly.
+
+    python risk_engines/scenarios.py mpi_2024_input.xlsx --out mpi_2024_scenarios.parquet \\
+        --s0-3y 0.93 0.9491 0.97 --bayes-weight 0.5 0.6 --horizon 4 5 --lr-factor "sector_*=1.1"
+"""
+
+import argparse
+import itertools
+import json
+from concurrent.futures import ProcessPoolExecutor
+from fnmatch import fnmatchcase
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import mpi_risk_engine_v02 as engine
+from risk_model import BAYES_BLOCKS, COX_BLOCKS, RiskModel
+
+DEFAULTS = {
+    "s0_3y": engine.S0_3Y,
+    "bayes_weight": engine.BAYES_WEIGHT,
+    "power_weight": engine.POWER_WEIGHT,
+    "horizon": 5.0,
+    "clip_floor": 0.25,
+    "lr_factors": None,
+    "hr_factors": None,
+}
+SCORE_COLS = ["p_bayes", "p_cox", "blended_prob", "years_remaining", "priority_index",
+              "urgency_scale_(0-1)", "power_ranking"]
+
+def scenario_grid(**axes):
+    """Every combination of the given parameter values (other parameters at
+    their defaults), e.g. scenario_grid(s0_3y=[0.93, 0.95], horizon=[4, 5])."""
+    unknown = set(axes) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"unknown scenario parameters: {sorted(unknown)}")
+    keys = list(axes)
+    return [{**DEFAULTS, **dict(zip(keys, values))} for values in itertools.product(*(axes[k] for k in keys))]
+
+def _apply_factors(coef_map, factors, log_scale):
+    """Copy of `coef_map` with matching entries multiplied by their factor
+    (on the log scale, the log of the factor is added)."""
+    out = dict(coef_map)
+    for pattern, factor in (factors or {}).items():
+        hits = [k for k in out if fnmatchcase(k, pattern)]
+        if not hits:
+            raise ValueError(f"no coefficient matches {pattern!r}")
+        for k in hits:
+            out[k] = out[k] + np.log(factor) if log_scale else out[k] * factor
+    return out
+
+# ============================================================
+# Encoding (once per dataset)
+# ============================================================
+def encode(df, model):
+    """Per-row covariate profiles (table positions) shared by all scenarios."""
+    df = df.copy(deep=False)
+    if "_cost_quintile_bayes" not in df.columns:
+        df = engine.add_cost_quintile_bayes(df)
+    idx = model.bayes_indices(df)
+    bayes_keys = np.column_stack([idx[b] for b in BAYES_BLOCKS] + [idx["prov_sec"]])
+    bayes_profiles, bayes_of = np.unique(bayes_keys, axis=0, return_inverse=True)
+
+    cov = model.cox_covariates(df)
+    cox_keys = np.column_stack([cov[b] for b in COX_BLOCKS]
+                               + [cov["cleantech_flag"], np.nan_to_num(cov["cost_quintile"], nan=-1.0)])
+    cox_profiles, cox_of = np.unique(cox_keys, axis=0, return_inverse=True)
+    return {
+        "bayes_profiles": bayes_profiles, "bayes_of": bayes_of.ravel(),
+        "cox_profiles": cox_profiles, "cox_of": cox_of.ravel(),
+        "reporting_years": df["reporting_years"].to_numpy(dtype=np.float64),
+    }
+
+# ============================================================
+# Scenario evaluation
+# ============================================================
+_WORK = {}
+
+def _init_worker(design, bayes_lr_map, cox_coef_map):
+    _WORK.update(design=design, maps=(bayes_lr_map, cox_coef_map),
+                 model=RiskModel.from_maps(bayes_lr_map, cox_coef_map))
+
+def _model_for(spec):
+    if not spec.get("lr_factors") and not spec.get("hr_factors"):
+        return _WORK["model"]
+    bayes_lr_map, cox_coef_map = _WORK["maps"]
+    return RiskModel.from_maps(_apply_factors(bayes_lr_map, spec.get("lr_factors"), log_scale=False),
+                               _apply_factors(cox_coef_map, spec.get("hr_factors"), log_scale=True))
+
+def score_scenario(spec):
+    """Score columns (arrays, in row order) for one scenario."""
+    spec = {**DEFAULTS, **spec}
+    design, model = _WORK["design"], _model_for(spec)
+
+    # Bayes, per profile, in the engine's term order
+    profiles = design["bayes_profiles"]
+    tables = [model.bayes_table[b] for b in BAYES_BLOCKS] + [model.prov_sec_table]
+    log_odds = tables[0][profiles[:, 0]].copy()
+    for j in range(1, len(tables)):
+        log_odds += tables[j][profiles[:, j]]
+    odds = np.exp(log_odds)
+    p_bayes = (odds / (1.0 + odds))[design["bayes_of"]]
+
+    # Cox, per profile
+    profiles = design["cox_profiles"]
+    cq = profiles[:, -1]
+    eta = 0.0 + model.coef_cleantech * profiles[:, -2]
+    eta += np.where(cq < 0, 0.0, model.coef_cost_quintile * cq)
+    for j, b in enumerate(COX_BLOCKS):
+        eta += model.cox_table[b][profiles[:, j].astype(np.intp)]
+    p_cox = (1 - spec["s0_3y"] ** np.exp(eta))[design["cox_of"]]
+
+    w = spec["bayes_weight"]
+    years = np.maximum(spec["horizon"] - design["reporting_years"], spec["clip_floor"])
+    blended = w * p_bayes + (1 - w) * p_cox
+    priority = blended / years
+
+    valid = priority[~np.isnan(priority)]
+    pi_min, pi_max = (valid.min(), valid.max()) if len(valid) else (np.nan, np.nan)
+    urgency = (priority - pi_min) / (pi_max - pi_min) if pi_max > pi_min else np.zeros(len(priority))
+    v = spec["power_weight"]
+    power = v * blended + (1 - v) * urgency
+    return dict(zip(SCORE_COLS, (p_bayes, p_cox, blended, years, priority, urgency, power)))
+
+def _label(factors):
+    return json.dumps(factors, sort_keys=True) if factors else ""
+
+PARAM_COLS = ["s0_3y", "bayes_weight", "power_weight", "horizon", "clip_floor"]
+
+def iter_scores(df, bayes_lr_map, cox_coef_map, scenarios, workers=1):
+    """(scenario number, full spec, score columns) for each scenario, in order."""
+    model = RiskModel.from_maps(bayes_lr_map, cox_coef_map)
+    design = encode(df, model)
+    batch = max(1, 2 * workers)
+
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                   initargs=(design, bayes_lr_map, cox_coef_map))
+        run = pool.map
+    else:
+        _init_worker(design, bayes_lr_map, cox_coef_map)
+        run = map
+    try:
+        # Submitted a few at a time so finished scenarios do not pile up in memory
+        for lo in range(0, len(scenarios), batch):
+            specs = [{**DEFAULTS, **s} for s in scenarios[lo:lo + batch]]
+            yield from zip(range(lo, lo + len(specs)), specs, run(score_scenario, specs))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        _WORK.clear()
+
+def _ids(df, id_col):
+    if id_col in df.columns:
+        return id_col, df[id_col].to_numpy()
+    return "row", np.arange(len(df))
+
+def sweep(df, bayes_lr_map, cox_coef_map, scenarios, workers=1, id_col="Unique ID"):
+    """All scenarios x projects as one long frame: `scenario`, the scenario
+    parameters, `id_col` (or `row` when absent) and the score columns."""
+    id_name, ids = _ids(df, id_col)
+    frames = []
+    for i, spec, scores in iter_scores(df, bayes_lr_map, cox_coef_map, scenarios, workers):
+        out = {"scenario": np.full(len(df), i, dtype=np.int32)}
+        out.update({k: np.full(len(df), spec[k], dtype=np.float64) for k in PARAM_COLS})
+        out["lr_factors"] = pd.Categorical([_label(spec["lr_factors"])] * len(df))
+        out["hr_factors"] = pd.Categorical([_label(spec["hr_factors"])] * len(df))
+        out[id_name] = ids
+        out.update(scores)
+        frames.append(pd.DataFrame(out))
+    out = pd.concat(frames, ignore_index=True)
+    for k in ("lr_factors", "hr_factors"):
+        out[k] = out[k].astype("category")
+    return out
+
+def write_sweep(path, df, bayes_lr_map, cox_coef_map, scenarios, workers=1, id_col="Unique ID"):
+    """Stream the sweep (columns as in `sweep()`) to a Parquet file, one row
+    group per scenario."""
+    id_name, ids = _ids(df, id_col)
+    ids = pa.array(ids)
+    codes = pa.array(np.zeros(len(df), dtype=np.int32))
+    writer = None
+    try:
+        for i, spec, scores in iter_scores(df, bayes_lr_map, cox_coef_map, scenarios, workers):
+            cols = {"scenario": pa.array(np.full(len(df), i, dtype=np.int32))}
+            cols.update({k: pa.array(np.full(len(df), spec[k], dtype=np.float64)) for k in PARAM_COLS})
+            for k in ("lr_factors", "hr_factors"):
+                cols[k] = pa.DictionaryArray.from_arrays(codes, pa.array([_label(spec[k])]))
+            cols[id_name] = ids
+            cols.update({k: pa.array(v) for k, v in scores.items()})
+            table = pa.table(cols)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def _factor_spec(text):
+    """"province_AB=1.2,sector_*=0.9" -> {"province_AB": 1.2, "sector_*": 0.9}"""
+    out = {}
+    for part in text.split(","):
+        pattern, _, factor = part.rpartition("=")
+        out[pattern.strip()] = float(factor)
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="Scenario / sensitivity sweep over the MPI risk engine")
+    ap.add_argument("input", help=".xlsx, .csv or .parquet input (as for run())")
+    ap.add_argument("--out", required=True, help="long-format .parquet output")
+    ap.add_argument("--bayes", default=engine.BAYES_COEFF_PATH)
+    ap.add_argument("--cox", default=engine.COX_COEFF_PATH)
+    ap.add_argument("--s0-3y", type=float, nargs="+", default=[DEFAULTS["s0_3y"]])
+    ap.add_argument("--bayes-weight", type=float, nargs="+", default=[DEFAULTS["bayes_weight"]])
+    ap.add_argument("--power-weight", type=float, nargs="+", default=[DEFAULTS["power_weight"]])
+    ap.add_argument("--horizon", type=float, nargs="+", default=[DEFAULTS["horizon"]])
+    ap.add_argument("--clip-floor", type=float, nargs="+", default=[DEFAULTS["clip_floor"]])
+    ap.add_argument("--lr-factor", action="append", default=[],
+                    help="PATTERN=FACTOR[,...]: one more level of LR perturbation (repeatable)")
+    ap.add_argument("--hr-factor", action="append", default=[],
+                    help="PATTERN=FACTOR[,...]: one more level of hazard-ratio perturbation (repeatable)")
+    ap.add_argument("--workers", type=int, default=1)
+    args = ap.parse_args()
+
+    df = engine.read_input(args.input)
+    bayes_lr_map, cox_coef_map = engine.load_coefficient_maps(args.bayes, args.cox)
+    scenarios = scenario_grid(
+        s0_3y=args.s0_3y, bayes_weight=args.bayes_weight, power_weight=args.power_weight,
+        horizon=args.horizon, clip_floor=args.clip_floor,
+        lr_factors=[None] + [_factor_spec(s) for s in args.lr_factor],
+        hr_factors=[None] + [_factor_spec(s) for s in args.hr_factor],
+    )
+    write_sweep(args.out, df, bayes_lr_map, cox_coef_map, scenarios, args.workers)
+    print("Wrote:", args.out)
+    print(f"{len(scenarios)} scenarios x {len(df):,} projects = {len(scenarios) * len(df):,} rows")
+
+if __name__ == "__main__":
+    main()
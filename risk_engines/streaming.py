@@ -0,0 +1,225 @@
+"""Streaming (chunked) scoring for large MPI inputs.
+
+Reads the input in chunks, scores each chunk with a compiled `RiskModel` and
+appends the result to the outputs, so peak memory is bounded by the chunk size
+rather than the input size. The two dataset-relative steps are handled
+exactly, giving the same scores as the in-memory `run()`:
+
+1. `_cost_quintile_bayes` (qcut over cost ranks) needs every cost, so a first
+   pass reads only the `project_cost` column and assigns quintiles globally.
+2. `urgency_scale_(0-1)` needs the global min/max of `priority_index`, so the
+   second pass scores chunks, tracks the range and spills each scored chunk to
+   a temporary directory; the third pass rescales the spilled chunks and
+   writes them out.
+
+    python risk_engines/streaming.py input.csv --out-parquet scored.parquet --out-csv scored.csv
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas._libs.parsers import STR_NA_VALUES
+
+import mpi_risk_engine_v02 as engine
+from risk_model import RiskModel
+
+DEFAULT_CHUNKSIZE = 100_000
+
+# ============================================================
+# Chunked readers (CSV, Parquet row groups, Excel via openpyxl read-only)
+# ============================================================
+def _excel_value(v):
+    # Match pd.read_excel(engine="openpyxl"): integral floats come back as ints
+    # and the default NA strings ("", "NA", "#N/A", ...) become missing values
+    if isinstance(v, float) and v.is_integer():
+        return int(v)
+    if isinstance(v, str) and v in STR_NA_VALUES:
+        return None
+    return v
+
+def _iter_xlsx(path, chunksize, columns=None):
+    import openpyxl
+
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = [str(h) for h in next(rows)]
+        idx = [header.index(c) for c in columns] if columns else list(range(len(header)))
+        names = [header[i] for i in idx]
+        buf = []
+        for r in rows:
+            if r is None or all(v is None for v in r):
+                continue
+            buf.append([_excel_value(r[i]) if i < len(r) else None for i in idx])
+            if len(buf) == chunksize:
+                yield pd.DataFrame(buf, columns=names)
+                buf = []
+        if buf:
+            yield pd.DataFrame(buf, columns=names)
+    finally:
+        wb.close()
+
+def _iter_parquet(path, chunksize, columns=None):
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(path)
+    for batch in pf.iter_batches(batch_size=chunksize, columns=columns):
+        yield batch.to_pandas()
+
+def iter_chunks(path, chunksize=DEFAULT_CHUNKSIZE, columns=None):
+    suffix = Path(path).suffix.lower()
+    if suffix == ".csv":
+        yield from pd.read_csv(path, chunksize=chunksize, usecols=columns)
+    elif suffix == ".parquet":
+        yield from _iter_parquet(path, chunksize, columns)
+    elif suffix in (".xlsx", ".xlsm"):
+        yield from _iter_xlsx(path, chunksize, columns)
+    else:
+        raise ValueError(f"Unsupported input format for streaming: {path}")
+
+# ============================================================
+# Incremental writers
+# ============================================================
+class CsvChunkWriter:
+    def __init__(self, path):
+        self.path, self.header = Path(path), True
+
+    def write(self, df):
+        df.to_csv(self.path, mode="w" if self.header else "a", header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        pass
+
+class XlsxChunkWriter:
+    """Append rows to a write-only openpyxl workbook (constant memory)."""
+
+    def __init__(self, path):
+        import openpyxl
+
+        self.path = Path(path)
+        self.wb = openpyxl.Workbook(write_only=True)
+        self.ws = self.wb.create_sheet("Sheet1")
+        self.header = True
+
+    def write(self, df):
+        if self.header:
+            self.ws.append([str(c) for c in df.columns])
+            self.header = False
+        for row in df.astype(object).itertuples(index=False, name=None):
+            self.ws.append([None if pd.isna(v) else v for v in row])
+
+    def close(self):
+        self.wb.save(self.path)
+
+class ArrowChunkWriter:
+    """Append chunks to a Parquet file or Feather (Arrow IPC) file.
+
+    Parquet keeps the categorical columns as dictionary columns (one dictionary
+    per row group). The Arrow IPC file format cannot replace dictionaries
+    between batches, so Feather output stores them as plain strings."""
+
+    def __init__(self, path, fmt="parquet"):
+        self.path, self.fmt = Path(path), fmt
+        self.schema, self.writer = None, None
+
+    def _open(self, table):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        fields = []
+        for f in table.schema:
+            if pa.types.is_dictionary(f.type):
+                value_type = pa.string() if pa.types.is_null(f.type.value_type) else f.type.value_type
+                f = pa.field(f.name, pa.dictionary(pa.int32(), value_type) if self.fmt == "parquet" else value_type)
+            elif pa.types.is_null(f.type):
+                f = pa.field(f.name, pa.string())
+            fields.append(f)
+        self.schema = pa.schema(fields, metadata=table.schema.metadata)
+        if self.fmt == "parquet":
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+        else:
+            self.writer = pa.ipc.new_file(self.path, self.schema)
+
+    def write(self, df):
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(engine.with_categoricals(df), preserve_index=False)
+        if self.writer is None:
+            self._open(table)
+        self.writer.write_table(table.cast(self.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+# ============================================================
+# Passes
+# ============================================================
+def cost_quintiles(path, chunksize=DEFAULT_CHUNKSIZE):
+    """Pass 1: global `_cost_quintile_bayes` from the `project_cost` column only."""
+    costs = [c["project_cost"] for c in iter_chunks(path, chunksize, columns=["project_cost"])]
+    cost = pd.concat(costs, ignore_index=True) if costs else pd.Series(dtype=float)
+    return engine.add_cost_quintile_bayes(cost.to_frame())["_cost_quintile_bayes"]
+
+def score_stream(input_path, writers, model, chunksize=DEFAULT_CHUNKSIZE, spill_dir=None):
+    quintiles = cost_quintiles(input_path, chunksize)
+
+    with tempfile.TemporaryDirectory(dir=spill_dir) as tmp:
+        # Pass 2: score rows, track the priority range, spill scored chunks
+        spilled, pi_min, pi_max, start = [], np.nan, np.nan, 0
+        for i, chunk in enumerate(iter_chunks(input_path, chunksize)):
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            chunk["_cost_quintile_bayes"] = quintiles.array[start:start + len(chunk)]
+            chunk = model.score_rows(chunk)
+            pi_min = np.fmin(pi_min, chunk["priority_index"].min())
+            pi_max = np.fmax(pi_max, chunk["priority_index"].max())
+            spill = Path(tmp) / f"chunk_{i:06d}.pkl"
+            chunk.to_pickle(spill)
+            spilled.append(spill)
+            start += len(chunk)
+
+        # Pass 3: rescale with the global range and append to every output
+        for spill in spilled:
+            chunk = engine.rescale_priority(pd.read_pickle(spill), pi_min, pi_max)
+            for w in writers:
+                w.write(chunk)
+            spill.unlink()
+    for w in writers:
+        w.close()
+    return start
+
+def main():
+    ap = argparse.ArgumentParser(description="Chunked MPI risk scoring")
+    ap.add_argument("input", help=".csv, .parquet or .xlsx input")
+    ap.add_argument("--out-csv")
+    ap.add_argument("--out-xlsx")
+    ap.add_argument("--out-parquet")
+    ap.add_argument("--out-feather")
+    ap.add_argument("--bayes", default=engine.BAYES_COEFF_PATH)
+    ap.add_argument("--cox", default=engine.COX_COEFF_PATH)
+    ap.add_argument("--model", help="saved RiskModel prefix (overrides --bayes/--cox)")
+    ap.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    args = ap.parse_args()
+
+    model = RiskModel.load(args.model) if args.model else RiskModel.from_csv(args.bayes, args.cox)
+    writers = []
+    if args.out_csv:
+        writers.append(CsvChunkWriter(args.out_csv))
+    if args.out_xlsx:
+        writers.append(XlsxChunkWriter(args.out_xlsx))
+    if args.out_parquet:
+        writers.append(ArrowChunkWriter(args.out_parquet, "parquet"))
+    if args.out_feather:
+        writers.append(ArrowChunkWriter(args.out_feather, "feather"))
+    rows = score_stream(args.input, writers, model, args.chunksize)
+    for out in (args.out_csv, args.out_xlsx, args.out_parquet, args.out_feather):
+        if out:
+            print("Wrote:", out)
+    print("Rows:", rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""Multi-horizon survival curves for the Cox part of the MPI risk engine.
+
+The engine only uses the 3-year baseline survival `S0_3Y`. `BaselineSurvival`
+holds S0(t) at any set of horizons (annual, monthly, ...), from:
+
+- a CSV with `years` (or `months`) and `s0` columns (`from_csv`),
+- the engine's single 3-year value (`engine_default`, a constant baseline hazard),
+- a Breslow estimate on the yearly MPI snapshots (`from_history`): time from
+  a project's first listing to its first year "Under Construction".
+
+Between the table's horizons the cumulative hazard -log S0(t) is linear
+(constant hazard); past the last one it keeps the last slope; S0(0) = 1.
+
+`survival_curves()` returns, for every project, the cumulative incidence
+F(t) = 1 - S0(t) ** risk_score on a monthly grid as a projects x months
+float32 matrix, computed in row chunks and, with a cache directory, appended
+to a `.npy` file that is returned memory-mapped (so 1M projects x 120 months
+costs 480 MB of disk, not RAM), and a per-project summary:
+
+- `expected_years_restricted`: expected years to construction start, capped
+  at the grid's last horizon (integral of the survival curve),
+- `expected_years_if_started`: the same for projects that start within it,
+- `p_cox_<k>y` and `blended_prob_<k>y` per horizon k. The Bayes probability is
+  a 3-year one; other horizons assume its hazard is constant,
+  p_bayes(t) = 1 - (1 - p_bayes) ** (t / 3). At 3 years both equal the engine.
+
+With `cache_dir`, the matrix and summary are cached per dataset version:
+keyed on a hash of the projects' scores, the baseline and the grid, so a new
+dataset version or coefficient set gets its own entry and a rerun on the same
+one just maps the file.
+
+    python risk_engines/survival.py mpi_2024_input.xlsx --months 120 --baseline history \\
+        --out-summary curves_summary.parquet --cache-dir curves_cache/
+"""
+
+import argparse
+import hashlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import backtest
+import mpi_risk_engine_v02 as engine
+from risk_model import RiskModel
+
+BASE_HORIZON = 3.0          # years of S0_3Y and of p_bayes
+DEFAULT_CHUNK_ROWS = 16384
+
+# ============================================================
+# Baseline survival table
+# ============================================================
+class BaselineSurvival:
+    def __init__(self, years, survival):
+        years = np.asarray(years, dtype=np.float64)
+        survival = np.asarray(survival, dtype=np.float64)
+        order = np.argsort(years)
+        self.years, self.survival = years[order], survival[order]
+        if len(self.years) == 0 or self.years[0] <= 0:
+            raise ValueError("baseline horizons must be positive")
+        if np.any(np.diff(self.survival) > 0) or np.any((self.survival <= 0) | (self.survival > 1)):
+            raise ValueError("baseline survival must be in (0, 1] and non-increasing")
+
+    @classmethod
+    def engine_default(cls):
+        """The engine's S0_3Y with a constant baseline hazard."""
+        return cls([BASE_HORIZON], [engine.S0_3Y])
+
+    @classmethod
+    def from_csv(cls, path):
+        table = pd.read_csv(path)
+        years = table["years"] if "years" in table.columns else table["months"] / 12.0
+        return cls(years.to_numpy(), table["s0"].to_numpy())
+
+    def to_csv(self, path):
+        pd.DataFrame({"years": self.years, "s0": self.survival}).to_csv(path, index=False)
+
+    @classmethod
+    def breslow(cls, time, event, risk):
+        """Breslow estimate from follow-up `time` (years), `event` (0/1) and
+        relative risk exp(eta): H0(t) = sum over event times s <= t of
+        d(s) / (sum of risk of those still at risk at s)."""
+        time, event, risk = (np.asarray(a, dtype=np.float64) for a in (time, event, risk))
+        times = np.unique(time[(event > 0) & (time > 0)])
+        order = np.argsort(time)
+        t_sorted, r_sorted = time[order], risk[order]
+        at_risk = np.cumsum(r_sorted[::-1])[::-1]          # risk sum of subjects with time >= t_sorted[i]
+        at_risk_t = at_risk[np.searchsorted(t_sorted, times, side="left")]
+        deaths = np.array([np.sum(event[time == t]) for t in times])
+        return cls(times, np.exp(-np.cumsum(deaths / at_risk_t)))
+
+    @classmethod
+    def from_history(cls, bayes_lr_map, cox_coef_map, **backtest_kwargs):
+        """Breslow estimate on the MPI history, each project from its first
+        listing (risk from the coefficients, as of that listing)."""
+        scores = backtest.score_snapshots(bayes_lr_map, cox_coef_map, **backtest_kwargs)
+        first = scores[scores["reporting_years"] == 1]
+        return cls.breslow(first["years_to_construction"], first["constructed"], first["risk_score"])
+
+    def cumulative_hazard(self, years):
+        """-log S0 at `years`, linear between the table's horizons."""
+        years = np.asarray(years, dtype=np.float64)
+        knots = np.concatenate([[0.0], self.years])
+        hazard = np.concatenate([[0.0], -np.log(self.survival)])
+        out = np.interp(years, knots, hazard)
+        if len(knots) > 1:
+            slope = (hazard[-1] - hazard[-2]) / (knots[-1] - knots[-2])
+            past = years > knots[-1]
+            out[past] = hazard[-1] + slope * (years[past] - knots[-1])
+        return out
+
+    def at(self, years):
+        """S0 at `years` (the table's own values at its horizons)."""
+        years = np.atleast_1d(np.asarray(years, dtype=np.float64))
+        out = np.exp(-self.cumulative_hazard(years))
+        pos = np.searchsorted(self.years, years).clip(max=len(self.years) - 1)
+        exact = self.years[pos] == years
+        out[exact] = self.survival[pos[exact]]
+        return out
+
+# ============================================================
+# Curves
+# ============================================================
+class SurvivalCurves:
+    """`years` (grid, H), `incidence` (projects x H float32, possibly a
+    read-only memmap) and `summary` (per-project frame, df's index)."""
+
+    def __init__(self, years, incidence, summary):
+        self.years, self.incidence, self.summary = years, incidence, summary
+
+    def at(self, years):
+        """Incidence columns for the grid horizons closest to `years`."""
+        return self.incidence[:, [int(np.abs(self.years - y).argmin()) for y in np.atleast_1d(years)]]
+
+def month_grid(months=120, step=1):
+    return np.arange(step, months + 1, step, dtype=np.float64) / 12.0
+
+def _cache_key(risk, p_bayes, baseline, years, horizons):
+    h = hashlib.sha256()
+    for a in (risk, p_bayes, baseline.years, baseline.survival, years, np.asarray(horizons, dtype=np.float64)):
+        h.update(a.tobytes())
+    return h.hexdigest()[:20]
+
+def survival_curves(df, model, baseline=None, months=120, step_months=1, horizons=range(1, 11),
+                    chunk_rows=DEFAULT_CHUNK_ROWS, cache_dir=None):
+    """Curves and summary for the projects in `df` (matrix in memory unless
+    `cache_dir` is given)."""
+    baseline = baseline or BaselineSurvival.engine_default()
+    years = month_grid(months, step_months)
+    horizons = [float(h) for h in horizons]
+
+    df = df.copy(deep=False)
+    if "_cost_quintile_bayes" not in df.columns:
+        df = engine.add_cost_quintile_bayes(df)
+    risk = np.exp(model.cox_eta(df))
+    odds = np.exp(model.bayes_log_odds(df))
+    p_bayes = odds / (1.0 + odds)
+
+    path = None
+    if cache_dir is not None:
+        key = _cache_key(risk, p_bayes, baseline, years, horizons)
+        path = Path(cache_dir) / f"curves_{key}.npy"
+        summary_path = path.with_suffix(".parquet")
+        if path.exists() and summary_path.exists():
+            summary = pd.read_parquet(summary_path)
+            summary.index = df.index
+            return SurvivalCurves(years, np.load(path, mmap_mode="r"), summary)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    n = len(df)
+    if path is None:
+        incidence, out = np.empty((n, len(years)), dtype=np.float32), None
+    else:
+        # Chunks are appended to the .npy file, not kept mapped: resident memory stays one chunk
+        tmp = path.with_suffix(".tmp.npy")
+        out = open(tmp, "wb")
+        np.lib.format.write_array_header_1_0(out, {"descr": "<f4", "fortran_order": False, "shape": (n, len(years))})
+    log_s0 = -baseline.cumulative_hazard(years)
+    dt = np.diff(np.concatenate([[0.0], years]))
+    restricted = np.empty(n)
+    if_started = np.empty(n)
+    for lo in range(0, n, chunk_rows):
+        r = risk[lo:lo + chunk_rows, None]
+        f = -np.expm1(r * log_s0)                    # 1 - S0(t) ** risk
+        if out is None:
+            incidence[lo:lo + chunk_rows] = f
+        else:
+            out.write(f.astype(np.float32).tobytes())
+        # Trapezoid integral of F over [0, t_max], with F(0) = 0
+        area_f = 0.5 * ((f * dt).sum(axis=1) + (f[:, :-1] * dt[1:]).sum(axis=1))
+        restricted[lo:lo + chunk_rows] = years[-1] - area_f
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if_started[lo:lo + chunk_rows] = (years[-1] * f[:, -1] - area_f) / f[:, -1]
+
+    summary = {"expected_years_restricted": restricted, "expected_years_if_started": if_started}
+    s0_h = baseline.at(horizons)
+    w = engine.BAYES_WEIGHT
+    for h, s0 in zip(horizons, s0_h):
+        p_cox = 1 - s0 ** risk
+        p_b = p_bayes if h == BASE_HORIZON else 1 - (1 - p_bayes) ** (h / BASE_HORIZON)
+        summary[f"p_cox_{h:g}y"] = p_cox
+        summary[f"blended_prob_{h:g}y"] = w * p_b + (1 - w) * p_cox
+    summary = pd.DataFrame(summary, index=df.index)
+
+    if path is not None:
+        out.close()
+        tmp.replace(path)
+        summary.reset_index(drop=True).to_parquet(summary_path)
+        incidence = np.load(path, mmap_mode="r")
+    return SurvivalCurves(years, incidence, summary)
+
+def main():
+    ap = argparse.ArgumentParser(description="Multi-horizon survival curves for the MPI risk engine")
+    ap.add_argument("input", help=".xlsx, .csv or .parquet input (as for run())")
+    ap.add_argument("--bayes", default=engine.BAYES_COEFF_PATH)
+    ap.add_argument("--cox", default=engine.COX_COEFF_PATH)
+    ap.add_argument("--baseline", default="engine",
+                    help='"engine" (S0_3Y, constant hazard), "history" (Breslow on the MPI history) or a CSV')
+    ap.add_argument("--save-baseline", help="write the baseline table used to this CSV")
+    ap.add_argument("--months", type=int, default=120)
+    ap.add_argument("--step-months", type=int, default=1)
+    ap.add_argument("--horizons", type=float, nargs="+", default=list(range(1, 11)), help="years")
+    ap.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    ap.add_argument("--cache-dir", help="keeps the curve matrix (.npy) and summary per dataset version")
+    ap.add_argument("--out-summary", help="per-project summary (.parquet or .csv)")
+    args = ap.parse_args()
+
+    df = engine.read_input(args.input)
+    maps = engine.load_coefficient_maps(args.bayes, args.cox)
+    if args.baseline == "engine":
+        baseline = BaselineSurvival.engine_default()
+    elif args.baseline == "history":
+        baseline = BaselineSurvival.from_history(*maps)
+    else:
+        baseline = BaselineSurvival.from_csv(args.baseline)
+    if args.save_baseline:
+        baseline.to_csv(args.save_baseline)
+
+    curves = survival_curves(df, RiskModel.from_maps(*maps), baseline, args.months, args.step_months,
+                             args.horizons, args.chunk_rows, args.cache_dir)
+    if args.out_summary:
+        out = args.out_summary
+        curves.summary.to_parquet(out) if out.endswith(".parquet") else curves.summary.to_csv(out)
+        print("Wrote:", out)
+    print(f"{len(df):,} projects x {len(curves.years)} horizons; baseline S0 at 1..10 years: "
+          + " ".join(f"{s:.3f}" for s in baseline.at(np.arange(1, 11))))
+    print(curves.summary.describe().T[["mean", "25%", "50%", "75%"]].round(3).to_string())
+
+if __name__ == "__main__":
+    main()
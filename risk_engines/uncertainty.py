@@ -0,0 +1,312 @@
+"""Monte Carlo uncertainty bands for the MPI risk engine.
+
+The engine scores are point estimates. `simulate()` re-scores the projects
+under `n_draws` joint draws of the model's inputs:
+
+- coefficients: each Bayes log-LR and Cox coefficient ~ Normal(estimate, SE).
+  The SEs come from a standard-error column of the coefficient CSVs when
+  present (`se_log_lr` / `se` in the Bayes file, on the log-LR scale;
+  `se(coef)` / `se` in the Cox file), else `default_bayes_se` /
+  `default_cox_se` (0 = fixed). Categories without a coefficient stay fixed.
+- baseline survival: the 3-year baseline cumulative hazard -log(S0_3Y) is
+  lognormal around its estimate with log-sd `s0_log_sd`.
+- blend weight: the Bayes weight of `blended_prob` (0.60) ~ Beta with that
+  mean and concentration `weight_concentration` (None = fixed).
+
+and reports, per project, the mean and percentile bands of `p_bayes`,
+`p_cox`, `blended_prob` and `power_ranking`, plus per draw the portfolio
+aggregates: expected number of projects built, expected capital built and
+capital at risk (expected cost of the projects that do not proceed).
+
+All draws are sampled up front from one seeded generator, so results depend
+on the seed only, not on chunking or the number of processes. Projects are
+scored in chunks as draws x projects matrices (rows sharing all covariates
+computed once per chunk), across a process pool. `power_ranking` rescales
+`priority_index` by its min/max over all projects in each draw, so a first
+pass collects that range per draw and a second pass computes the bands.
+
+    python risk_engines/uncertainty.py mpi_2024_input.xlsx --draws 10000 --workers 4 \\
+        --out-projects mpi_2024_bands.parquet --out-portfolio mpi_2024_portfolio.csv
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import mpi_risk_engine_v02 as engine
+from risk_model import BAYES_BLOCKS, COX_BLOCKS, RiskModel, _UNKNOWN_FALLBACK
+
+PERCENTILES = (5, 50, 95)
+METRICS = ["p_bayes", "p_cox", "blended_prob", "power_ranking"]
+
+# Standard-error columns recognized in the coefficient CSVs (case-insensitive)
+BAYES_SE_COLUMNS = ("se_log_lr", "log_lr_se", "se")
+COX_SE_COLUMNS = ("se(coef)", "se_coef", "se")
+
+# Elements per draws x projects matrix in a chunk (about 20 MB as float64)
+CHUNK_ELEMENTS = 2_500_000
+# Portfolio sums are taken over fixed blocks of projects, then over the blocks
+# in order, so they do not depend on the chunk size (a multiple of this)
+SUM_BLOCK = 256
+
+# ============================================================
+# Parameter draws
+# ============================================================
+def _read_se(path, key, names):
+    table = pd.read_csv(path)
+    cols = {c.lower(): c for c in table.columns}
+    for name in names:
+        if name in cols:
+            return dict(zip(table[key], pd.to_numeric(table[cols[name]], errors="coerce")))
+    return {}
+
+def load_standard_errors(bayes_path=engine.BAYES_COEFF_PATH, cox_path=engine.COX_COEFF_PATH):
+    """({feature: SE of log LR}, {covariate: SE of coef}); empty when a file has no SE column."""
+    return _read_se(bayes_path, "feature_name", BAYES_SE_COLUMNS), _read_se(cox_path, "covariate", COX_SE_COLUMNS)
+
+def _bayes_layout(model, features):
+    """Flat vector of all Bayes table entries (block tables, then prov_sec) and
+    the coefficient each entry comes from (None = constant)."""
+    values, names = [], []
+    for b in BAYES_BLOCKS:
+        values.append(model.bayes_table[b])
+        names += [f"{b}_{v}" for v in model.bayes_vocab[b].tolist()]
+        names.append(f"{b}_Unknown" if b == "cleantech" or b in _UNKNOWN_FALLBACK else None)
+    values.append(model.prov_sec_table)
+    names += ["prov_sec_" + k for k in model.prov_sec_vocab.tolist()] + [None]
+    return np.concatenate(values), [n if n in features else None for n in names]
+
+def _cox_layout(model, features):
+    """Flat Cox vector: block tables, then the cleantech and cost quintile coefficients."""
+    values, names = [], []
+    for b in COX_BLOCKS:
+        values.append(model.cox_table[b])
+        names += [f"{b}_{v}" for v in model.cox_vocab[b].tolist()] + [None]
+    values.append(np.array([model.coef_cleantech, model.coef_cost_quintile]))
+    names += ["cleantech_flag", "cost_quintile"]
+    return np.concatenate(values), [n if n in features else None for n in names]
+
+def _perturb(rng, values, names, se_map, default_se, n_draws):
+    """n_draws x len(values): one normal draw per distinct coefficient, added
+    to every entry that comes from it."""
+    features = sorted({n for n in names if n is not None})
+    se = np.array([se_map.get(f, np.nan) for f in features], dtype=np.float64)
+    se = np.where(np.isnan(se), default_se, se)
+    z = rng.standard_normal((n_draws, len(features))) * se
+    out = np.repeat(values[None, :], n_draws, axis=0)
+    col = {f: j for j, f in enumerate(features)}
+    slots = [i for i, n in enumerate(names) if n is not None]
+    out[:, slots] += z[:, [col[names[i]] for i in slots]]
+    return out
+
+def sample_parameters(model, bayes_lr_map, cox_coef_map, n_draws, seed=0, bayes_se=None, cox_se=None,
+                      default_bayes_se=0.0, default_cox_se=0.0, s0_log_sd=0.1, weight_concentration=100.0):
+    """All parameter draws, from one generator seeded with `seed`."""
+    rng = np.random.default_rng(seed)
+    bayes_values, bayes_names = _bayes_layout(model, set(bayes_lr_map))
+    cox_values, cox_names = _cox_layout(model, set(cox_coef_map))
+    params = {
+        "bayes": _perturb(rng, bayes_values, bayes_names, bayes_se or {}, default_bayes_se, n_draws),
+        "cox": _perturb(rng, cox_values, cox_names, cox_se or {}, default_cox_se, n_draws),
+    }
+    z = rng.standard_normal(n_draws)
+    if s0_log_sd > 0:
+        params["s0"] = np.exp(np.log(model.s0_3y) * np.exp(s0_log_sd * z))
+    else:
+        params["s0"] = np.full(n_draws, model.s0_3y)
+    if weight_concentration:
+        w = engine.BAYES_WEIGHT
+        params["weight"] = rng.beta(w * weight_concentration, (1 - w) * weight_concentration, n_draws)
+    else:
+        params["weight"] = np.full(n_draws, engine.BAYES_WEIGHT)
+    return params
+
+# ============================================================
+# Project encoding (once per dataset)
+# ============================================================
+def encode_projects(model, df):
+    """Per-project positions in the flat Bayes / Cox vectors plus the
+    non-sampled inputs (years remaining, cost)."""
+    df = df.copy(deep=False)
+    if "_cost_quintile_bayes" not in df.columns:
+        df = engine.add_cost_quintile_bayes(df)
+    idx = model.bayes_indices(df)
+    offsets = np.cumsum([0] + [len(model.bayes_table[b]) for b in BAYES_BLOCKS])
+    bayes = np.column_stack([idx[b] + offsets[i] for i, b in enumerate(BAYES_BLOCKS)]
+                            + [idx["prov_sec"] + offsets[-1]])
+
+    cov = model.cox_covariates(df)
+    cox_offsets = np.cumsum([0] + [len(model.cox_table[b]) for b in COX_BLOCKS])
+    cox = np.column_stack([cov[b] + cox_offsets[i] for i, b in enumerate(COX_BLOCKS)])
+    years = (5.0 - df["reporting_years"]).clip(lower=0.25).astype(float).to_numpy()
+    cost = pd.to_numeric(df["project_cost"], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+    return {"bayes": bayes, "cox": cox, "cox_scalars": cox_offsets[-1],
+            "cleantech": cov["cleantech_flag"].astype(np.float64), "cost_quintile": cov["cost_quintile"],
+            "years_remaining": years, "cost": cost}
+
+# ============================================================
+# Chunk evaluation (draws x projects)
+# ============================================================
+_WORK = {}
+
+def _init_worker(params, design):
+    _WORK["params"], _WORK["design"] = params, design
+
+def _scores(lo, hi):
+    """Scores for projects lo:hi as draws x columns matrices: p_bayes and p_cox
+    per distinct covariate profile (with each project's profile), then
+    blended_prob and priority_index per project."""
+    params, design = _WORK["params"], _WORK["design"]
+    # Bayes: log-odds summed in the engine's term order
+    profiles, bayes_of = np.unique(design["bayes"][lo:hi], axis=0, return_inverse=True)
+    log_odds = params["bayes"][:, profiles[:, 0]].copy()
+    for j in range(1, profiles.shape[1]):
+        log_odds += params["bayes"][:, profiles[:, j]]
+    odds = np.exp(log_odds)
+    p_bayes = odds / (1.0 + odds)
+
+    cox, k = params["cox"], design["cox_scalars"]
+    cq = design["cost_quintile"][lo:hi]
+    keys = np.column_stack([design["cox"][lo:hi], design["cleantech"][lo:hi], np.nan_to_num(cq, nan=-1.0)])
+    profiles, cox_of = np.unique(keys, axis=0, return_inverse=True)
+    eta = 0.0 + cox[:, [k]] * profiles[:, -2]
+    pq = profiles[:, -1]
+    eta += np.where(pq < 0, 0.0, cox[:, [k + 1]] * pq)
+    for j in range(len(COX_BLOCKS)):
+        eta += cox[:, profiles[:, j].astype(np.intp)]
+    p_cox = 1 - params["s0"][:, None] ** np.exp(eta)
+
+    bayes_of, cox_of = bayes_of.ravel(), cox_of.ravel()
+    w = params["weight"][:, None]
+    blended = w * p_bayes[:, bayes_of] + (1 - w) * p_cox[:, cox_of]
+    return (p_bayes, bayes_of), (p_cox, cox_of), blended, blended / design["years_remaining"][lo:hi]
+
+def _summary(m, percentiles):
+    """Mean + percentiles over the draws of each column of `m`."""
+    m = np.ascontiguousarray(m.T)        # partition along contiguous rows
+    return np.vstack([m.mean(axis=1), *np.percentile(m, percentiles, axis=1)])
+
+def _priority_range(bounds):
+    """Pass 1: per-draw min / max of priority_index over projects lo:hi."""
+    *_, priority = _scores(*bounds)
+    with np.errstate(all="ignore"):
+        return np.nanmin(priority, axis=1, initial=np.inf), np.nanmax(priority, axis=1, initial=-np.inf)
+
+def _bands(args):
+    """Pass 2: per-project mean + percentiles of each metric, per-draw portfolio sums."""
+    (lo, hi), pi_min, pi_max, percentiles = args
+    (p_bayes, bayes_of), (p_cox, cox_of), blended, priority = _scores(lo, hi)
+    span = (pi_max - pi_min)[:, None]
+    with np.errstate(all="ignore"):
+        urgency = np.where(span > 0, (priority - pi_min[:, None]) / span, 0.0)
+    power = engine.POWER_WEIGHT * blended + (1 - engine.POWER_WEIGHT) * urgency
+    stats = np.vstack([_summary(p_bayes, percentiles)[:, bayes_of], _summary(p_cox, percentiles)[:, cox_of],
+                       _summary(blended, percentiles), _summary(power, percentiles)])
+
+    cost = _WORK["design"]["cost"][lo:hi]
+    blocks = range(0, hi - lo, SUM_BLOCK)
+    built = np.column_stack([blended[:, b:b + SUM_BLOCK].sum(axis=1) for b in blocks])
+    capital = np.column_stack([(blended[:, b:b + SUM_BLOCK] * cost[b:b + SUM_BLOCK]).sum(axis=1) for b in blocks])
+    return stats, built, capital
+
+def _chunks(n_projects, n_draws, chunk_projects=None):
+    size = chunk_projects or CHUNK_ELEMENTS // max(n_draws, 1)
+    size = -(-max(size, 1) // SUM_BLOCK) * SUM_BLOCK
+    return [(lo, min(lo + size, n_projects)) for lo in range(0, n_projects, size)]
+
+# ============================================================
+# Driver
+# ============================================================
+def simulate(df, model, params, percentiles=PERCENTILES, workers=1, chunk_projects=None):
+    """Bands per project and aggregates per draw for the projects in `df`.
+
+    Returns (projects, portfolio): projects has one row per row of `df` (same
+    index) with `<metric>_mean` and `<metric>_p<q>` columns; portfolio has one
+    row per draw (sampled S0_3Y and blend weight, expected_built,
+    expected_capital_built, capital_at_risk). `chunk_projects` (rounded up to
+    a multiple of SUM_BLOCK) defaults to about CHUNK_ELEMENTS per matrix."""
+    design = encode_projects(model, df)
+    n_draws, n = len(params["s0"]), len(df)
+    chunks = _chunks(n, n_draws, chunk_projects)
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(params, design))
+        run = pool.map
+    else:
+        _init_worker(params, design)
+        run = map
+    try:
+        pi_min, pi_max = np.full(n_draws, np.inf), np.full(n_draws, -np.inf)
+        for lo_, hi_ in run(_priority_range, chunks):
+            pi_min, pi_max = np.minimum(pi_min, lo_), np.maximum(pi_max, hi_)
+        pi_min[np.isinf(pi_min)], pi_max[np.isinf(pi_max)] = np.nan, np.nan
+        results = list(run(_bands, [(c, pi_min, pi_max, list(percentiles)) for c in chunks]))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        _WORK.clear()
+
+    columns = [f"{m}_{s}" for m in METRICS for s in ["mean"] + [f"p{q:02g}" for q in percentiles]]
+    stats = np.hstack([r[0] for r in results]) if results else np.empty((len(columns), 0))
+    projects = pd.DataFrame(stats.T, index=df.index, columns=columns)
+
+    built, capital = np.zeros(n_draws), np.zeros(n_draws)
+    for _, chunk_built, chunk_capital in results:
+        for j in range(chunk_built.shape[1]):
+            built += chunk_built[:, j]
+            capital += chunk_capital[:, j]
+    portfolio = pd.DataFrame({
+        "s0_3y": params["s0"],
+        "bayes_weight": params["weight"],
+        "expected_built": built,
+        "expected_capital_built": capital,
+        "capital_at_risk": design["cost"].sum() - capital,
+    })
+    portfolio.index.name = "draw"
+    return projects, portfolio
+
+def portfolio_bands(portfolio, percentiles=PERCENTILES):
+    """Mean and percentiles over the draws of each portfolio aggregate."""
+    cols = ["expected_built", "expected_capital_built", "capital_at_risk"]
+    out = pd.DataFrame({"mean": portfolio[cols].mean()})
+    for q in percentiles:
+        out[f"p{q:02g}"] = portfolio[cols].quantile(q / 100)
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="Monte Carlo uncertainty bands for the MPI risk engine")
+    ap.add_argument("input", help=".xlsx, .csv or .parquet input (as for run())")
+    ap.add_argument("--bayes", default=engine.BAYES_COEFF_PATH)
+    ap.add_argument("--cox", default=engine.COX_COEFF_PATH)
+    ap.add_argument("--draws", type=int, default=10_000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--percentiles", type=float, nargs="+", default=list(PERCENTILES))
+    ap.add_argument("--default-bayes-se", type=float, default=0.0, help="log-LR SE where the CSV has none")
+    ap.add_argument("--default-cox-se", type=float, default=0.0, help="Cox coef SE where the CSV has none")
+    ap.add_argument("--s0-log-sd", type=float, default=0.1, help="log-sd of the baseline cumulative hazard")
+    ap.add_argument("--weight-concentration", type=float, default=100.0, help="Beta concentration (0 = fixed)")
+    ap.add_argument("--out-projects", help="per-project bands (.parquet or .csv)")
+    ap.add_argument("--out-portfolio", help="per-draw portfolio aggregates (.parquet or .csv)")
+    args = ap.parse_args()
+
+    df = engine.read_input(args.input)
+    bayes_lr_map, cox_coef_map = engine.load_coefficient_maps(args.bayes, args.cox)
+    model = RiskModel.from_csv(args.bayes, args.cox)
+    bayes_se, cox_se = load_standard_errors(args.bayes, args.cox)
+    params = sample_parameters(model, bayes_lr_map, cox_coef_map, args.draws, args.seed, bayes_se, cox_se,
+                               args.default_bayes_se, args.default_cox_se, args.s0_log_sd, args.weight_concentration)
+    projects, portfolio = simulate(df, model, params, args.percentiles, args.workers)
+
+    for frame, path in ((projects, args.out_projects), (portfolio, args.out_portfolio)):
+        if path:
+            frame.to_parquet(path) if path.endswith(".parquet") else frame.to_csv(path)
+            print("Wrote:", path)
+    print(f"{args.draws:,} draws x {len(df):,} projects "
+          f"(SEs: {len(bayes_se)} Bayes, {len(cox_se)} Cox from the CSVs)")
+    print(portfolio_bands(portfolio, args.percentiles).to_string(float_format=lambda v: f"{v:,.2f}"))
+
+if __name__ == "__main__":
+    main()